@@ -4,14 +4,72 @@
 """
 
 import os
+import time
 
+_IMPORT_STARTED = time.perf_counter()
+
+import click
 from flask import Flask, render_template
 
+import archive
+import counters
+import jobs
+import media
+import memprofile
+import related
+import revisions
+import sitemap
+import startup
+import static_export
+import suggest
+import trending
+import warmup
 from extensions import csrf, db, login_manager
 
+# 模块级依赖的导入耗时，计入启动报告的 import 阶段
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+
+def upgrade_schema() -> list:
+    """为旧数据库补齐模型中新增的表、列与索引，返回所做变更的说明。需在应用上下文中调用。
+
+    新增的列都带有服务端默认值（或可为空），可直接 ``ALTER TABLE ... ADD COLUMN``。
+    """
+    from sqlalchemy.schema import CreateColumn
+
+    changes = []
+    inspector = db.inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in columns:
+                    continue
+                ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+                conn.execute(db.text(f'ALTER TABLE "{table.name}" ADD COLUMN {ddl}'))
+                changes.append(f"Added column {table.name}.{column.name}")
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(conn)
+                    changes.append(f"Created index {index.name}")
+    db.create_all()
+    changes += [f"Created table {name}" for name in sorted(set(db.metadata.tables) - existing_tables)]
+    return changes
+
+
+def create_app(test_config=None):
+    """创建并配置 Flask 应用实例（应用工厂）。
+
+    Args:
+        test_config: 可选的配置映射，在默认配置之后、扩展初始化之前生效
+    """
+    factory_started = time.perf_counter()
+    timer = startup.StartupTimer(import_seconds=_IMPORT_SECONDS)
 
-def create_app():
-    """创建并配置 Flask 应用实例（应用工厂）。"""
     app = Flask(__name__)
 
     # 确保 instance 文件夹存在
@@ -21,12 +79,35 @@ def create_app():
     db_path = os.path.join(app.instance_path, "blog.db")
     app.config.from_mapping(
         SECRET_KEY="dev-secret-key-change-in-production",
-        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path}",
+        SQLALCHEMY_DATABASE_URI=os.environ.get("DATABASE_URL", f"sqlite:///{db_path}"),
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        POSTS_PER_PAGE=10,
+        COMMENTS_PER_PAGE=20,
+        TAG_CLOUD_SIZE=30,
+        # 超过该字节数的正文压缩后存入 post_body 表
+        POST_BODY_COMPRESS_THRESHOLD=2048,
     )
+    if test_config is not None:
+        app.config.from_mapping(test_config)
+
+    # 字节码缓存需在任何模板加载之前启用
+    startup.init_app(app, timer)
+    # 尽早注册请求钩子，使内存统计覆盖其余 before_request 钩子
+    memprofile.init_app(app)
 
     # 初始化扩展
     db.init_app(app)
+    counters.init_app(app)
+    archive.init_app(app)
+    jobs.init_app(app)
+    media.init_app(app)
+    trending.init_app(app)
+    revisions.init_app(app)
+    related.init_app(app)
+    sitemap.init_app(app)
+    static_export.init_app(app)
+    suggest.init_app(app)
+    warmup.init_app(app)
     login_manager.init_app(app)
     csrf.init_app(app)
 
@@ -40,25 +121,115 @@ def create_app():
 
         return User.query.get(int(user_id))
 
-    # 注册蓝图
+    # 注册蓝图（延迟导入的耗时单独计入 import 阶段）
+    imports_started = time.perf_counter()
     from auth import auth_bp
-
-    app.register_blueprint(auth_bp, url_prefix="/auth")
-
     from blog import blog_bp
+    from models import Comment, Post, Tag, User
 
-    app.register_blueprint(blog_bp, url_prefix="/blog")
+    lazy_import_seconds = time.perf_counter() - imports_started
+    timer.add("import", lazy_import_seconds)
 
-    from models import Post, User
+    app.register_blueprint(auth_bp, url_prefix="/auth")
+    app.register_blueprint(blog_bp, url_prefix="/blog")
 
     @app.route("/")
     def index():
         posts = Post.query.order_by(Post.timestamp.desc()).all()
-        return render_template("index.html", posts=posts)
+        popular = trending.get_trending().top_posts()
+        tag_cloud = (
+            Tag.query.filter(Tag.post_count > 0)
+            .order_by(Tag.post_count.desc(), Tag.name)
+            .limit(app.config["TAG_CLOUD_SIZE"])
+            .all()
+        )
+        return render_template(
+            "index.html", posts=posts, popular=popular, tag_cloud=tag_cloud, archive=archive.archive_months()
+        )
 
     @app.cli.command("init-db")
     def init_db_command():
         db.create_all()
         print("Initialized the database.")
 
+    @app.cli.command("upgrade-db")
+    @click.pass_context
+    def upgrade_db_command(ctx):
+        """升级已有数据库：补齐新增的表、列与索引，并重新统计反规范化计数。"""
+        changes = upgrade_schema()
+        for change in changes:
+            print(change)
+        print(f"Upgraded the database schema ({len(changes)} changes).")
+        # 新增的计数列默认值为 0，按现有数据重新统计
+        ctx.invoke(recount_posts_command)
+        ctx.invoke(recount_comments_command)
+        ctx.invoke(archive.recount_command)
+
+    @app.cli.command("recount-posts")
+    def recount_posts_command():
+        """按 post 表重新计算每个用户的反规范化文章数。"""
+        counts = (
+            db.select(db.func.count(Post.id))
+            .where(Post.user_id == User.id)
+            .scalar_subquery()
+        )
+        db.session.execute(db.update(User).values(post_count=counts))
+        db.session.commit()
+        print("Recounted posts for all users.")
+
+    @app.cli.command("recount-comments")
+    def recount_comments_command():
+        """按 comment 表重新计算每篇文章的反规范化评论数。"""
+        counts = (
+            db.select(db.func.count(Comment.id))
+            .where(Comment.post_id == Post.id)
+            .scalar_subquery()
+        )
+        db.session.execute(db.update(Post).values(comment_count=counts))
+        db.session.commit()
+        print("Recounted comments for all posts.")
+
+    @app.cli.command("compress-bodies")
+    @click.option("--batch-size", default=500, show_default=True, help="每个事务处理的文章数。")
+    def compress_bodies_command(batch_size):
+        """迁移已有文章：补齐摘要，并把超过阈值的内联正文转为压缩存储。"""
+        # 旧数据库缺少的列、索引与表
+        upgrade_schema()
+
+        migrated = bytes_before = bytes_after = 0
+        last_id = 0
+        while True:
+            batch = (
+                Post.query.options(db.undefer(Post._body))
+                .filter(Post.id > last_id, Post.body_compressed.is_(False))
+                .order_by(Post.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                break
+            for post in batch:
+                raw_size = len(post._body.encode("utf-8"))
+                post.body = post._body
+                if post.body_compressed:
+                    migrated += 1
+                    bytes_before += raw_size
+                    bytes_after += len(post.compressed_body.data)
+            db.session.commit()
+            last_id = batch[-1].id
+
+        saved = bytes_before - bytes_after
+        ratio = saved / bytes_before * 100 if bytes_before else 0.0
+        print(
+            f"Compressed {migrated} post bodies: {bytes_before} -> {bytes_after} bytes "
+            f"(saved {saved} bytes, {ratio:.1f}%)."
+        )
+
+    suggest.build_on_start(app)
+
+    # factory 阶段不含其中已计入 import 阶段的延迟导入
+    timer.add("factory", time.perf_counter() - factory_started - lazy_import_seconds)
+
+    # 预热耗时单独计入 warmup 阶段
+    warmup.warmup_on_start(app)
     return app
@@ -0,0 +1,70 @@
+"""按月归档：月份文章数汇总与月份页的时间区间。
+
+按 ``Post.timestamp`` 分组统计每个请求都要扫描 post 表。这里在发布、删除文章时于
+同一事务内维护 ``monthly_post_count``（每月一行），归档侧栏只读取该表；月份页
+``/blog/archive/<year>/<month>`` 以 ``[月初, 下月初)`` 区间在 timestamp 索引上
+做范围查询并键集分页。
+
+文章发布时间不会被编辑修改，因此文章不会在月份之间移动。升级已有数据库或汇总与
+post 表不一致时，执行 ``flask archive recount`` 重新统计。
+"""
+
+from datetime import datetime
+
+from flask import current_app
+from flask.cli import AppGroup
+
+from extensions import db
+from models import MonthlyPostCount, Post
+
+
+def month_range(year: int, month: int):
+    """返回月份的 ``[月初, 下月初)`` 区间；月份不合法时返回 None。"""
+    if not 1 <= month <= 12 or not 1 <= year < 9999:
+        return None
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+
+def archive_months(limit=None) -> list:
+    """有文章的月份及其文章数，按时间倒序；limit 默认取 ARCHIVE_SIDEBAR_MONTHS。"""
+    if limit is None:
+        limit = current_app.config["ARCHIVE_SIDEBAR_MONTHS"]
+    return (
+        MonthlyPostCount.query.filter(MonthlyPostCount.post_count > 0)
+        .order_by(MonthlyPostCount.year.desc(), MonthlyPostCount.month.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def month_post_count(year: int, month: int) -> int:
+    row = db.session.get(MonthlyPostCount, (year, month))
+    return row.post_count if row else 0
+
+
+archive_cli = AppGroup("archive", help="按月归档相关命令。")
+
+
+@archive_cli.command("recount")
+def recount_command():
+    """按 post 表重新统计每月文章数。"""
+    year = db.extract("year", Post.timestamp)
+    month = db.extract("month", Post.timestamp)
+    rows = db.session.execute(
+        db.select(year, month, db.func.count(Post.id))
+        .where(Post.timestamp.is_not(None))
+        .group_by(year, month)
+    ).all()
+    db.session.execute(db.delete(MonthlyPostCount))
+    db.session.add_all(MonthlyPostCount(year=y, month=m, post_count=count) for y, m, count in rows)
+    db.session.commit()
+    print(f"Recounted posts for {len(rows)} months.")
+
+
+def init_app(app) -> None:
+    """设置默认配置并注册命令。"""
+    # 首页归档侧栏列出的月份数
+    app.config.setdefault("ARCHIVE_SIDEBAR_MONTHS", 24)
+    app.cli.add_command(archive_cli)
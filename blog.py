@@ -1,13 +1,31 @@
-"""文章相关路由：创建、详情、编辑、删除。"""
+"""文章相关路由：创建、详情、编辑、删除、评论、修订历史、作者主页、标签页、月份归档、标题补全。"""
 
-from flask import Blueprint, render_template, redirect, url_for, flash, abort, request
+from datetime import datetime
+
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, abort, request, jsonify
 from flask_login import login_required, current_user
-from forms import PostForm
-from models import Post, db
+from sqlalchemy.orm.exc import StaleDataError
+from archive import month_post_count, month_range
+from counters import get_view_counter
+from forms import CommentForm, PostForm
+from models import Comment, MonthlyPostCount, Post, PostRevision, PostTag, Tag, User, db
+from jobs import enqueue
+from media import attach_images
+from pagination import keyset_paginate
+from related import related_posts
+from revisions import reconstruct, record_revision
+from suggest import get_suggest_service, get_title_index
+from trending import get_trending
+from warmup import is_warmup_request
 
 blog_bp = Blueprint('blog', __name__)
 
 
+def _get_post_with_body_or_404(post_id):
+    """加载文章并同时取出内联正文；压缩正文仍在访问 post.body 时按需加载。"""
+    return Post.query.options(db.undefer(Post._body)).get_or_404(post_id)
+
+
 @blog_bp.route('/create', methods=['GET', 'POST'])
 @login_required
 def create_post():
@@ -19,12 +37,27 @@ def create_post():
         abort(400)
 
     if form.validate_on_submit():
-        post = Post(title=form.title.data, body=form.body.data, user_id=current_user.id)
+        # 显式确定发布时间，月份汇总、标签冗余时间戳都以此为准
+        post = Post(title=form.title.data, body=form.body.data, user_id=current_user.id, timestamp=datetime.now())
         try:
             db.session.add(post)
+            attach_images(post, form.uploaded_images(), current_user.id)
+            post.set_tags(form.tag_names())
+            record_revision(post)
+            User.adjust_post_count(current_user.id, 1)
+            MonthlyPostCount.adjust(post.timestamp, 1)
+            # 派生数据交给后台任务，与文章同事务入队；先 flush 以取得文章 ID
+            db.session.flush()
+            enqueue('related.update', post_id=post.id)
+            enqueue('sitemap.invalidate', post_id=post.id)
             db.session.commit()
+            get_title_index().add(post.id, post.title)
             flash('文章发布成功！', 'success')
             return redirect(url_for('index'))
+        except ValueError as exc:
+            # 图片在保存时才发现超过大小上限等
+            db.session.rollback()
+            flash(str(exc), 'danger')
         except Exception:
             db.session.rollback()
             flash('文章发布失败，请稍后重试。', 'danger')
@@ -35,16 +68,83 @@ def create_post():
 @blog_bp.route('/post/<int:post_id>')
 def post_detail(post_id):
     """文章详情。"""
-    post = Post.query.get_or_404(post_id)
+    post = _get_post_with_body_or_404(post_id)
     form = PostForm()  # 仅用于 CSRF token
-    return render_template('post_detail.html', post=post, form=form, title=post.title)
+
+    # 浏览次数先记在内存中，由计数器批量写回，请求本身不写库
+    counter = get_view_counter()
+    if current_app.config['VIEW_TRACKING_ENABLED'] and not is_warmup_request(request.environ):
+        counter.record(post.id)
+        get_trending().record(post.id)
+    views = post.view_count + counter.pending(post.id)
+
+    # 评论按 (post_id, created) 索引键集分页，总数取自 post.comment_count
+    comments = keyset_paginate(
+        Comment.query.filter_by(post_id=post.id),
+        Comment.created,
+        Comment.id,
+        request.args.get('comments_before'),
+        current_app.config['COMMENTS_PER_PAGE'],
+    )
+    return render_template(
+        'post_detail.html', post=post, form=form, views=views,
+        comments=comments, comment_form=CommentForm(),
+        related=related_posts(post.id), title=post.title,
+    )
+
+
+@blog_bp.route('/post/<int:post_id>/comment', methods=['POST'])
+@login_required
+def create_comment(post_id):
+    """发表评论，并在同一事务内维护文章评论数。"""
+    post = Post.query.get_or_404(post_id)
+    form = CommentForm()
+    if form.validate_on_submit():
+        try:
+            db.session.add(Comment(post_id=post.id, user_id=current_user.id, body=form.body.data))
+            Post.adjust_comment_count(post.id, 1)
+            db.session.commit()
+            flash('评论发表成功！', 'success')
+        except Exception:
+            db.session.rollback()
+            flash('评论发表失败，请稍后重试。', 'danger')
+    else:
+        for errors in form.errors.values():
+            for error in errors:
+                flash(error, 'danger')
+    return redirect(url_for('blog.post_detail', post_id=post.id, _anchor='comments'))
+
+
+@blog_bp.route('/comment/<int:comment_id>/delete', methods=['POST'])
+@login_required
+def delete_comment(comment_id):
+    """删除评论（评论作者或文章作者，POST）。"""
+    comment = Comment.query.get_or_404(comment_id)
+    post = db.session.get(Post, comment.post_id)
+    if current_user.id not in (comment.user_id, post.user_id):
+        abort(403)
+
+    try:
+        db.session.delete(comment)
+        Post.adjust_comment_count(post.id, -1)
+        db.session.commit()
+        flash('评论已删除。', 'success')
+    except Exception:
+        db.session.rollback()
+        flash('删除评论失败，请稍后重试。', 'danger')
+    return redirect(url_for('blog.post_detail', post_id=post.id, _anchor='comments'))
 
 
 @blog_bp.route('/post/<int:post_id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_post(post_id):
-    """编辑文章（仅作者）。"""
-    post = Post.query.get_or_404(post_id)
+    """编辑文章（仅作者）。
+
+    采用乐观并发控制：表单携带加载时的版本号，提交时版本已变化、或
+    ``UPDATE ... WHERE version = ?`` 未命中任何行，都视为冲突，返回 409
+    并展示最新内容，不持有任何锁。
+    """
+    post = _get_post_with_body_or_404(post_id)
 
     # 如果当前用户不是作者，禁止编辑
     if post.user_id != current_user.id:
@@ -56,14 +156,36 @@ def edit_post(post_id):
     if request.method == 'GET':
         form.title.data = post.title
         form.body.data = post.body
+        form.tags.data = ', '.join(tag.name for tag in post.tags)
+        form.version.data = post.version
 
     if form.validate_on_submit():
-        post.title = form.title.data
-        post.body = form.body.data
+        # 未携带版本号的提交（非本站表单）只受 UPDATE 时的版本校验保护
+        loaded_version = form.loaded_version()
+        if loaded_version is not None and loaded_version != post.version:
+            return _edit_conflict(form, post)
+
+        previous_title, previous_body = post.title, post.body
         try:
+            post.version = post.version + 1
+            post.title = form.title.data
+            post.body = form.body.data
+            attach_images(post, form.uploaded_images(), current_user.id)
+            post.set_tags(form.tag_names())
+            if (post.title, post.body) != (previous_title, previous_body):
+                record_revision(post, previous_body)
+            enqueue('related.update', post_id=post.id)
             db.session.commit()
+            get_title_index().update(post.id, previous_title, post.title)
             flash('文章更新成功！', 'success')
             return redirect(url_for('blog.post_detail', post_id=post.id))
+        except StaleDataError:
+            # 读取版本号之后、提交之前有其他编辑先提交
+            db.session.rollback()
+            return _edit_conflict(form, _get_post_with_body_or_404(post_id))
+        except ValueError as exc:
+            db.session.rollback()
+            flash(str(exc), 'danger')
         except Exception:
             db.session.rollback()
             flash('文章更新失败，请稍后重试。', 'danger')
@@ -71,6 +193,14 @@ def edit_post(post_id):
     return render_template('edit_post.html', form=form, post=post, title='编辑文章')
 
 
+def _edit_conflict(form, latest):
+    """渲染编辑冲突页：保留用户提交的内容，展示最新版本，并以最新版本号作为下次提交的基准。"""
+    form.version.data = latest.version
+    return render_template(
+        'edit_post.html', form=form, post=latest, conflict=latest, title='编辑冲突'
+    ), 409
+
+
 @blog_bp.route('/post/<int:post_id>/delete', methods=['POST'])
 @login_required
 def delete_post(post_id):
@@ -82,8 +212,19 @@ def delete_post(post_id):
         abort(403)
 
     try:
+        post.set_tags([])
+        PostRevision.query.filter_by(post_id=post.id).delete()
+        Comment.query.filter_by(post_id=post.id).delete()
         db.session.delete(post)
+        User.adjust_post_count(post.user_id, -1)
+        if post.timestamp is not None:
+            MonthlyPostCount.adjust(post.timestamp, -1)
+        enqueue('related.update', post_id=post_id)
+        enqueue('sitemap.invalidate', post_id=post_id)
+        title = post.title
         db.session.commit()
+        get_trending().discard(post_id)
+        get_title_index().remove(post_id, title)
         flash('文章已成功删除。', 'success')
     except Exception:
         db.session.rollback()
@@ -91,3 +232,101 @@ def delete_post(post_id):
 
     return redirect(url_for('index'))
 
+
+@blog_bp.route('/post/<int:post_id>/revisions')
+@login_required
+def post_revisions(post_id):
+    """修订历史列表（仅作者）。"""
+    post = Post.query.get_or_404(post_id)
+    if post.user_id != current_user.id:
+        abort(403)
+
+    revisions = (
+        PostRevision.query.options(db.defer(PostRevision.data))
+        .filter_by(post_id=post.id)
+        .order_by(PostRevision.number.desc())
+        .all()
+    )
+    return render_template('post_revisions.html', post=post, revisions=revisions, title='修订历史')
+
+
+@blog_bp.route('/post/<int:post_id>/revisions/<int:number>')
+@login_required
+def revision_detail(post_id, number):
+    """查看指定修订版本（仅作者）。"""
+    post = Post.query.get_or_404(post_id)
+    if post.user_id != current_user.id:
+        abort(403)
+
+    revision, body = reconstruct(post.id, number)
+    if revision is None:
+        abort(404)
+    return render_template('revision_detail.html', post=post, revision=revision, body=body, title=revision.title)
+
+
+@blog_bp.route('/user/<username>')
+def user_profile(username):
+    """作者主页：按时间倒序键集分页列出该作者的文章。"""
+    user = User.query.filter_by(username=username).first_or_404()
+    page = keyset_paginate(
+        Post.query.filter_by(user_id=user.id),
+        Post.timestamp,
+        Post.id,
+        request.args.get('before'),
+        current_app.config['POSTS_PER_PAGE'],
+    )
+    return render_template('user_profile.html', user=user, page=page, title=user.username)
+
+
+@blog_bp.route('/tag/<name>')
+def tag_posts(name):
+    """标签页：由 (tag_id, post_timestamp, post_id) 索引完成过滤、排序与键集分页。"""
+    tag = Tag.query.filter_by(name=name).first_or_404()
+    query = (
+        Post.query.join(PostTag, PostTag.post_id == Post.id)
+        .filter(PostTag.tag_id == tag.id)
+    )
+    page = keyset_paginate(
+        query,
+        PostTag.post_timestamp,
+        PostTag.post_id,
+        request.args.get('before'),
+        current_app.config['POSTS_PER_PAGE'],
+        cursor_key=lambda post: (post.timestamp, post.id),
+    )
+    return render_template('tag_posts.html', tag=tag, page=page, title=tag.name)
+
+
+@blog_bp.route('/archive/<int:year>/<int:month>')
+def archive_month(year, month):
+    """月份归档页：在 timestamp 索引上按 [月初, 下月初) 范围查询并键集分页。"""
+    bounds = month_range(year, month)
+    count = month_post_count(year, month) if bounds else 0
+    if not count:
+        abort(404)
+    start, end = bounds
+    page = keyset_paginate(
+        Post.query.filter(Post.timestamp >= start, Post.timestamp < end),
+        Post.timestamp,
+        Post.id,
+        request.args.get('before'),
+        current_app.config['POSTS_PER_PAGE'],
+    )
+    return render_template(
+        'archive_month.html', year=year, month=month, count=count, page=page,
+        title=f'{year} 年 {month} 月',
+    )
+
+
+@blog_bp.route('/suggest')
+def suggest():
+    """标题自动补全：在进程内前缀索引中查找，不访问数据库。"""
+    query = request.args.get('q', '')[:100]
+    results = get_suggest_service().search(query, current_app.config['SUGGEST_LIMIT'])
+    return jsonify(
+        q=query,
+        results=[
+            {'id': post_id, 'title': title, 'url': url_for('blog.post_detail', post_id=post_id)}
+            for post_id, title in results
+        ],
+    )
@@ -0,0 +1,139 @@
+"""文章阅读计数：内存缓冲 + 批量写回（write-behind）。
+
+每次浏览都执行一条 UPDATE 会让读请求争抢 SQLite 的写锁。这里把浏览次数
+先累加在进程内存中，再按时间间隔或缓冲量阈值，在单个事务里批量写回
+``post.view_count``；进程退出时也会写回一次。因此读请求本身不产生写操作，
+页面上展示的计数为“已落库值 + 本进程尚未写回的增量”，保持近似实时。
+"""
+
+import atexit
+import threading
+import time
+from collections import Counter
+
+from flask import current_app
+
+from extensions import db
+
+
+class ViewCounter:
+    """单个应用实例的阅读计数缓冲区（线程安全）。"""
+
+    def __init__(self, app):
+        self.app = app
+        self.flush_interval = app.config["VIEW_COUNTER_FLUSH_INTERVAL"]
+        self.flush_threshold = app.config["VIEW_COUNTER_FLUSH_THRESHOLD"]
+        self._pending = Counter()
+        self._pending_total = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        # 每次成功写回后在同一应用上下文中调用的回调，用于顺带持久化派生数据
+        self.on_flush = []
+        atexit.register(self.shutdown)
+
+    def record(self, post_id: int) -> None:
+        """记录一次浏览；缓冲量达到阈值时触发写回。"""
+        with self._lock:
+            self._pending[post_id] += 1
+            self._pending_total += 1
+            reached = self._pending_total >= self.flush_threshold
+
+        if self.flush_interval > 0:
+            self._ensure_thread()
+            if reached:
+                # 交给后台线程写回，请求线程不等待写锁
+                self._wakeup.set()
+        elif reached:
+            self.flush()
+
+    def pending(self, post_id: int) -> int:
+        """返回某篇文章尚未写回数据库的浏览增量。"""
+        with self._lock:
+            return self._pending.get(post_id, 0)
+
+    def flush(self) -> int:
+        """把缓冲的增量在一个事务中批量写回，返回写回的文章数。
+
+        写回失败时增量会合并回缓冲区，等待下一次写回。
+        """
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+            self._pending_total = 0
+        if not batch:
+            return 0
+
+        from models import Post
+
+        table = Post.__table__
+        stmt = (
+            table.update()
+            .where(table.c.id == db.bindparam("post_id"))
+            .values(view_count=table.c.view_count + db.bindparam("delta"))
+        )
+        params = [{"post_id": post_id, "delta": delta} for post_id, delta in batch.items()]
+        with self.app.app_context():
+            try:
+                db.session.connection().execute(stmt, params)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                with self._lock:
+                    self._pending.update(batch)
+                    self._pending_total += sum(batch.values())
+                self.app.logger.exception("view counter flush failed")
+                return 0
+
+            for callback in self.on_flush:
+                try:
+                    callback()
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.exception("view counter flush callback failed")
+        return len(batch)
+
+    def shutdown(self) -> None:
+        """停止后台线程并写回剩余增量（进程退出时自动调用）。"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+        atexit.unregister(self.shutdown)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None or self._stopped.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="view-counter-flush", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        next_flush = time.monotonic() + self.flush_interval
+        while not self._stopped.is_set():
+            self._wakeup.wait(max(0.0, next_flush - time.monotonic()))
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            self.flush()
+            next_flush = time.monotonic() + self.flush_interval
+
+
+def init_app(app) -> None:
+    """为应用创建阅读计数缓冲区。"""
+    # 关闭后详情页不记录浏览（如静态导出渲染页面时）
+    app.config.setdefault("VIEW_TRACKING_ENABLED", True)
+    # 后台写回间隔（秒），为 0 时不启动后台线程，仅按阈值和退出时写回
+    app.config.setdefault("VIEW_COUNTER_FLUSH_INTERVAL", 10)
+    # 缓冲的浏览次数达到该值时立即写回
+    app.config.setdefault("VIEW_COUNTER_FLUSH_THRESHOLD", 500)
+    app.extensions["view_counter"] = ViewCounter(app)
+
+
+def get_view_counter() -> ViewCounter:
+    """返回当前应用的阅读计数缓冲区。"""
+    return current_app.extensions["view_counter"]
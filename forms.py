@@ -3,9 +3,13 @@
 本文件包含所有WTForms表单类，用于用户输入验证。
 """
 
+import re
+
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SubmitField, TextAreaField
+from flask_wtf.file import MultipleFileField
+from wtforms import HiddenField, StringField, PasswordField, SubmitField, TextAreaField
 from wtforms.validators import DataRequired, Email, EqualTo, Length, ValidationError
+from media import detect_image_type
 from models import User
 
 
@@ -102,5 +106,70 @@ class PostForm(FlaskForm):
         render_kw={'placeholder': '请输入文章内容', 'class': 'form-control', 'rows': 10}
     )
     
+    tags = StringField(
+        '标签',
+        validators=[Length(max=200, message='标签总长度不能超过200个字符')],
+        render_kw={'placeholder': '多个标签用逗号分隔（可选，最多10个）', 'class': 'form-control'}
+    )
+    
+    images = MultipleFileField(
+        '图片',
+        render_kw={'class': 'form-control', 'accept': 'image/png,image/jpeg,image/gif,image/webp'}
+    )
+    
+    # 编辑时记录表单加载时的文章版本号，用于检测并发修改（创建时为空）
+    version = HiddenField()
+    
     submit = SubmitField('发布文章', render_kw={'class': 'btn btn-primary'})
+    
+    def tag_names(self):
+        """解析标签输入：按中英文逗号分隔，去空白、转小写并去重"""
+        names = (name.strip().lower() for name in re.split(r'[,，]', self.tags.data or ''))
+        return list(dict.fromkeys(name for name in names if name))
+    
+    def loaded_version(self):
+        """表单提交的文章版本号，缺失或非法时返回 None"""
+        try:
+            return int(self.version.data)
+        except (TypeError, ValueError):
+            return None
+    
+    def uploaded_images(self):
+        """实际选择了文件的上传项"""
+        return [file for file in self.images.data or [] if file and file.filename]
+    
+    def validate_images(self, images):
+        """验证图片数量与格式（按文件头识别，不信任扩展名）"""
+        files = self.uploaded_images()
+        if len(files) > 10:
+            raise ValidationError('一次最多上传10张图片。')
+        for file in files:
+            header = file.stream.read(16)
+            file.stream.seek(0)
+            if detect_image_type(header) is None:
+                raise ValidationError(f'{file.filename} 不是支持的图片格式（PNG、JPEG、GIF、WebP）。')
+    
+    def validate_tags(self, tags):
+        """验证标签数量与单个标签长度"""
+        names = self.tag_names()
+        if len(names) > 10:
+            raise ValidationError('最多只能添加10个标签。')
+        if any(len(name) > 32 for name in names):
+            raise ValidationError('单个标签长度不能超过32个字符。')
+        if any(re.search(r'[/?#%]', name) for name in names):
+            raise ValidationError('标签不能包含 / ? # % 字符。')
+
 
+class CommentForm(FlaskForm):
+    """评论表单"""
+    
+    body = TextAreaField(
+        '评论',
+        validators=[
+            DataRequired(message='请输入评论内容'),
+            Length(max=2000, message='评论不能超过2000个字符')
+        ],
+        render_kw={'placeholder': '写下你的评论', 'class': 'form-control', 'rows': 3}
+    )
+    
+    submit = SubmitField('发表评论', render_kw={'class': 'btn btn-primary'})
@@ -0,0 +1,281 @@
+"""后台任务队列：持久化在 SQLite 中，由进程内的工作线程池执行。
+
+写操作（发布、编辑、删除文章）只需在自己的事务里插入一条 ``job`` 记录，
+派生工作（相关文章更新、缓存失效等）由后台线程异步完成，不增加写请求的延迟；
+任务与业务数据同事务提交，回滚时任务也不会产生。
+
+- 任务处理函数用 ``@handler("name")`` 注册，以 payload 中的字段为关键字参数调用
+- 工作线程在应用处理第一个请求时启动（``JOBS_AUTOSTART``；``JOBS_WORKERS`` 为 0 时不启动），
+  因此 ``flask init-db`` 等命令与测试不会启动后台线程；也可以用 ``flask jobs work``
+  在独立进程中执行任务
+- 失败的任务按指数退避重新排队，超过 ``max_attempts`` 次后标记为 failed
+- ``flask jobs list`` 查看队列，``flask jobs drain`` 在当前进程中执行全部待办任务，
+  ``flask jobs retry`` 把失败的任务重新排队
+"""
+
+import atexit
+import json
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app, request
+from flask.cli import AppGroup
+
+from extensions import db
+from models import Job
+from warmup import is_warmup_request
+
+# 任务名 -> 处理函数
+_handlers = {}
+
+
+def handler(name: str):
+    """注册任务处理函数的装饰器。"""
+
+    def decorator(func):
+        _handlers[name] = func
+        return func
+
+    return decorator
+
+
+def enqueue(name: str, max_attempts: int = None, **payload) -> Job:
+    """把任务加入当前会话，随调用方的事务一起提交。"""
+    if name not in _handlers:
+        raise ValueError(f"unknown job: {name}")
+    job = Job(
+        name=name,
+        payload=json.dumps(payload),
+        max_attempts=max_attempts or current_app.config["JOBS_MAX_ATTEMPTS"],
+    )
+    db.session.add(job)
+    return job
+
+
+class JobQueue:
+    """单个应用实例的任务执行器。"""
+
+    def __init__(self, app):
+        self.app = app
+        self.workers = app.config["JOBS_WORKERS"]
+        self.poll_interval = app.config["JOBS_POLL_INTERVAL"]
+        self._threads = []
+        self._stopped = threading.Event()
+        self._starting = threading.Lock()
+
+    def start(self, workers: int = None) -> None:
+        """启动工作线程，并把上次异常退出时遗留的 running 任务重新排队。"""
+        workers = self.workers if workers is None else workers
+        if self._threads or workers <= 0:
+            return
+        with self._starting:
+            if self._threads:
+                return
+            with self.app.app_context():
+                try:
+                    self.recover_stale()
+                except Exception:
+                    # 数据库尚未初始化，交给工作线程稍后重试
+                    db.session.rollback()
+            self._stopped.clear()
+            for i in range(workers):
+                thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            atexit.register(self.shutdown)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """停止工作线程（等待正在执行的任务完成，最多 timeout 秒）。"""
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        atexit.unregister(self.shutdown)
+
+    def _run(self) -> None:
+        failing = False
+        while not self._stopped.is_set():
+            with self.app.app_context():
+                try:
+                    while not self._stopped.is_set() and self.run_one():
+                        pass
+                    failing = False
+                except Exception:
+                    db.session.rollback()
+                    # 数据库不可用（如尚未建表）时每次轮询都会失败，只记录第一次
+                    if not failing:
+                        self.app.logger.exception("job worker error")
+                    failing = True
+                finally:
+                    db.session.remove()
+            self._stopped.wait(self.poll_interval)
+
+    def recover_stale(self) -> int:
+        """把执行超时（进程崩溃遗留）的 running 任务重新排队，返回任务数。"""
+        cutoff = datetime.now() - timedelta(seconds=self.app.config["JOBS_STALE_TIMEOUT"])
+        result = db.session.execute(
+            db.update(Job)
+            .where(Job.status == "running", Job.started < cutoff)
+            .values(status="pending", run_at=datetime.now())
+        )
+        db.session.commit()
+        return result.rowcount
+
+    def _claim(self, include_delayed: bool = False):
+        """领取一个到期任务；多个线程或进程并发领取时由条件 UPDATE 保证只有一个成功。"""
+        while True:
+            query = db.select(Job.id).where(Job.status == "pending")
+            if not include_delayed:
+                query = query.where(Job.run_at <= datetime.now())
+            job_id = db.session.scalar(query.order_by(Job.run_at, Job.id).limit(1))
+            if job_id is None:
+                return None
+            claimed = db.session.execute(
+                db.update(Job)
+                .where(Job.id == job_id, Job.status == "pending")
+                .values(status="running", attempts=Job.attempts + 1, started=datetime.now())
+            ).rowcount
+            db.session.commit()
+            if claimed:
+                return db.session.get(Job, job_id)
+
+    def run_one(self, include_delayed: bool = False) -> bool:
+        """执行一个任务，没有可执行任务时返回 False。需在应用上下文中调用。"""
+        job = self._claim(include_delayed)
+        if job is None:
+            return False
+
+        job_id, name, attempts = job.id, job.name, job.attempts
+        try:
+            func = _handlers.get(name)
+            if func is None:
+                raise LookupError(f"no handler registered for job {name!r}")
+            func(**json.loads(job.payload))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            error = traceback.format_exc(limit=5)
+            job = db.session.get(Job, job_id)
+            if attempts >= job.max_attempts:
+                job.status = "failed"
+                self.app.logger.error("job %s (%s) failed permanently", job_id, name)
+            else:
+                job.status = "pending"
+                job.run_at = datetime.now() + timedelta(seconds=self.backoff(attempts))
+            job.last_error = error
+            db.session.commit()
+            return True
+
+        db.session.execute(db.delete(Job).where(Job.id == job_id))
+        db.session.commit()
+        return True
+
+    def backoff(self, attempts: int) -> float:
+        """第 attempts 次失败后的重试等待秒数（指数退避，有上限）。"""
+        base = self.app.config["JOBS_RETRY_BACKOFF"]
+        return min(base * 2 ** (attempts - 1), self.app.config["JOBS_RETRY_MAX_DELAY"])
+
+    def drain(self, include_delayed: bool = False) -> int:
+        """在当前线程中执行全部可执行任务，返回执行的任务数。"""
+        count = 0
+        while self.run_one(include_delayed):
+            count += 1
+        return count
+
+
+jobs_cli = AppGroup("jobs", help="后台任务队列相关命令。")
+
+
+@jobs_cli.command("list")
+@click.option("--status", type=click.Choice(["pending", "running", "failed"]), help="只显示该状态的任务。")
+@click.option("--limit", default=50, show_default=True, help="最多显示的任务数。")
+def list_command(status, limit):
+    """查看队列中的任务。"""
+    counts = dict(db.session.execute(db.select(Job.status, db.func.count(Job.id)).group_by(Job.status)).all())
+    print(" ".join(f"{name}={counts.get(name, 0)}" for name in ("pending", "running", "failed")))
+
+    query = Job.query.order_by(Job.run_at, Job.id)
+    if status:
+        query = query.filter(Job.status == status)
+    for job in query.limit(limit):
+        line = (
+            f"#{job.id} {job.name} {job.payload} status={job.status} "
+            f"attempts={job.attempts}/{job.max_attempts} run_at={job.run_at:%Y-%m-%d %H:%M:%S}"
+        )
+        if job.last_error:
+            line += f" error={job.last_error.strip().splitlines()[-1]}"
+        print(line)
+
+
+@jobs_cli.command("drain")
+@click.option("--all", "include_delayed", is_flag=True, help="同时执行尚未到重试时间的任务。")
+def drain_command(include_delayed):
+    """在当前进程中执行全部待办任务。"""
+    queue = get_job_queue()
+    queue.recover_stale()
+    count = queue.drain(include_delayed)
+    failed = db.session.scalar(db.select(db.func.count(Job.id)).where(Job.status == "failed"))
+    print(f"Ran {count} jobs ({failed} failed jobs in queue).")
+
+
+@jobs_cli.command("work")
+@click.option("--workers", type=int, help="工作线程数，默认取 JOBS_WORKERS。")
+def work_command(workers):
+    """在前台持续执行任务，直到收到中断信号（适合作为独立的任务进程运行）。"""
+    queue = get_job_queue()
+    workers = workers or queue.workers or 1
+    queue.start(workers)
+    print(f"Started {workers} job workers, press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        queue.shutdown()
+
+
+@jobs_cli.command("retry")
+def retry_command():
+    """把失败的任务重新排队（重置重试次数）。"""
+    result = db.session.execute(
+        db.update(Job)
+        .where(Job.status == "failed")
+        .values(status="pending", attempts=0, run_at=datetime.now())
+    )
+    db.session.commit()
+    print(f"Requeued {result.rowcount} failed jobs.")
+
+
+def init_app(app) -> None:
+    """设置默认配置、创建任务执行器并注册命令；工作线程在处理第一个请求时启动。"""
+    # 工作线程数，为 0 时不在本进程执行任务（可用 flask jobs work / drain 执行）
+    app.config.setdefault("JOBS_WORKERS", 2)
+    # 为 False 时 Web 进程不启动工作线程，任务交给 flask jobs work 进程执行
+    app.config.setdefault("JOBS_AUTOSTART", True)
+    # 队列为空时的轮询间隔（秒）
+    app.config.setdefault("JOBS_POLL_INTERVAL", 1.0)
+    app.config.setdefault("JOBS_MAX_ATTEMPTS", 5)
+    # 第 n 次失败后等待 JOBS_RETRY_BACKOFF * 2^(n-1) 秒，最多 JOBS_RETRY_MAX_DELAY 秒
+    app.config.setdefault("JOBS_RETRY_BACKOFF", 5)
+    app.config.setdefault("JOBS_RETRY_MAX_DELAY", 600)
+    # running 状态超过该秒数的任务视为执行进程已崩溃
+    app.config.setdefault("JOBS_STALE_TIMEOUT", 300)
+    queue = app.extensions["jobs"] = JobQueue(app)
+    app.cli.add_command(jobs_cli)
+
+    # 只在真正处理请求的进程中启动，CLI 命令与预热请求不启动工作线程
+    @app.before_request
+    def _start_job_workers():
+        if queue._threads or not app.config["JOBS_AUTOSTART"]:
+            return
+        if not is_warmup_request(request.environ):
+            queue.start()
+
+
+def get_job_queue() -> JobQueue:
+    """返回当前应用的任务执行器。"""
+    return current_app.extensions["jobs"]
@@ -0,0 +1,284 @@
+"""图片附件：流式上传、内容哈希去重、进程池生成缩略图与长缓存分发。
+
+- 上传文件按块（``MEDIA_CHUNK_SIZE``）写入 MEDIA_DIR 下的临时文件并同时计算
+  SHA-256，全程不把整个文件读入内存；哈希已存在时丢弃临时文件，复用已有附件
+- 新文件先暂存为临时文件，所在事务提交后才移动到正式位置；事务回滚时删除，
+  不会留下没有附件记录的文件
+- 新附件在同一事务中加入 ``media.variants`` 后台任务；任务把缩放交给进程池
+  （CPU 密集，不占用请求线程与 GIL），生成 ``MEDIA_VARIANT_WIDTHS`` 中各宽度的
+  缩略图。Pillow 为可选依赖：未安装时只提供原图
+- ``/media/<sha256>[-<宽度>].<ext>`` 按内容寻址、内容永不改变，
+  响应带一年的 ``Cache-Control: immutable``
+- 正文中的 ``![说明](/media/...)`` 由 ``render_body`` 过滤器渲染为带 srcset 的
+  ``<img>``，其余内容照常转义
+"""
+
+import atexit
+import hashlib
+import importlib.util
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import abort, current_app, send_from_directory
+from markupsafe import Markup, escape
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import jobs
+from extensions import db
+from models import Attachment
+
+# 文件头魔数 -> 扩展名
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+_FILENAME_RE = re.compile(r"^([0-9a-f]{64})(?:-(\d+))?\.(png|jpg|gif|webp)$")
+_REFERENCE_RE = re.compile(r"!\[([^\]\n]*)\]\(/media/([0-9a-f]{64})\.(png|jpg|gif|webp)\)")
+# 动图缩放会丢帧，只为静态格式生成缩略图
+_RESIZABLE = {"png", "jpg", "webp"}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class UploadTooLarge(ValueError):
+    """单个上传文件超过 MEDIA_MAX_FILE_SIZE。"""
+
+
+def detect_image_type(header: bytes):
+    """根据文件头识别图片格式，返回扩展名；不是支持的图片时返回 None。"""
+    for signature, ext in _SIGNATURES:
+        if header.startswith(signature):
+            return ext
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def media_path(filename: str) -> str:
+    """附件文件在磁盘上的路径：按哈希前两位分目录，避免单目录文件过多。"""
+    return os.path.join(current_app.config["MEDIA_DIR"], filename[:2], filename)
+
+
+def save_upload(file, user_id: int = None) -> Attachment:
+    """
+    流式保存上传的图片并按内容去重
+
+    Args:
+        file: werkzeug FileStorage
+        user_id: 上传者 ID（仅在首次上传该内容时记录）
+
+    Returns:
+        Attachment: 新建或已存在的附件（新建时已加入当前会话）
+
+    Raises:
+        ValueError: 不是支持的图片格式
+        UploadTooLarge: 文件超过大小上限
+    """
+    chunk_size = current_app.config["MEDIA_CHUNK_SIZE"]
+    max_size = current_app.config["MEDIA_MAX_FILE_SIZE"]
+    media_dir = current_app.config["MEDIA_DIR"]
+    os.makedirs(media_dir, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    ext = None
+    fd, tmp_path = tempfile.mkstemp(dir=media_dir, suffix=".upload")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = file.stream.read(chunk_size)
+                if not chunk:
+                    break
+                if ext is None:
+                    ext = detect_image_type(chunk)
+                    if ext is None:
+                        raise ValueError("只支持 PNG、JPEG、GIF、WebP 格式的图片。")
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge(f"单张图片不能超过 {max_size // (1024 * 1024)}MB。")
+                digest.update(chunk)
+                out.write(chunk)
+        if ext is None:
+            raise ValueError("上传的图片为空。")
+
+        sha256 = digest.hexdigest()
+        attachment = Attachment.query.filter_by(sha256=sha256).first()
+        if attachment is not None and os.path.exists(media_path(attachment.filename)):
+            return attachment
+
+        _stage(tmp_path, media_path(f"{sha256}.{ext}"))
+        tmp_path = None
+        if attachment is None:
+            attachment = Attachment(sha256=sha256, ext=ext, size=size, user_id=user_id)
+            db.session.add(attachment)
+            db.session.flush()
+            jobs.enqueue("media.variants", attachment_id=attachment.id)
+        return attachment
+    finally:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def _stage(tmp_path: str, target: str) -> None:
+    """登记暂存文件，由当前会话的事务提交后移动到 target。"""
+    db.session.info.setdefault("media_staged", []).append((tmp_path, target))
+
+
+@event.listens_for(Session, "after_commit")
+def _move_staged_files(session) -> None:
+    for tmp_path, target in session.info.pop("media_staged", ()):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(tmp_path, target)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_staged_files(session, transaction) -> None:
+    # 顶层事务结束而未提交（回滚或关闭会话）时删除暂存文件
+    if transaction.parent is not None:
+        return
+    for tmp_path, _ in session.info.pop("media_staged", ()):
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def attach_images(post, files, user_id: int = None) -> list:
+    """保存上传的图片，并在文章正文末尾追加对它们的引用。返回附件列表。"""
+    attachments = []
+    for file in files or ():
+        if not file or not file.filename:
+            continue
+        attachment = save_upload(file, user_id)
+        # 文件名作为图片说明，去掉会破坏引用语法的字符
+        alt = re.sub(r"[\[\]()\r\n]", "", os.path.splitext(file.filename)[0])
+        attachments.append((alt, attachment))
+    if attachments:
+        references = "\n".join(f"![{alt}](/media/{attachment.filename})" for alt, attachment in attachments)
+        post.body = post.body.rstrip("\n") + "\n\n" + references
+    return [attachment for _, attachment in attachments]
+
+
+def _make_variants(src: str, ext: str, widths: list):
+    """在子进程中生成缩略图，返回 (原图宽, 原图高, 已生成的宽度列表)。"""
+    from PIL import Image, ImageOps
+
+    with Image.open(src) as image:
+        image = ImageOps.exif_transpose(image)
+        width, height = image.size
+        made = []
+        base = os.path.splitext(src)[0]
+        for target in sorted(widths):
+            # 不放大小图
+            if target >= width:
+                continue
+            variant = image.resize((target, max(1, round(height * target / width))), Image.LANCZOS)
+            options = {"optimize": True}
+            if ext == "jpg":
+                variant = variant.convert("RGB")
+                options["quality"] = 85
+            variant.save(f"{base}-{target}.{ext}", **options)
+            made.append(target)
+    return width, height, made
+
+
+def _get_pool(processes: int):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # 进程内已有任务线程与请求线程，fork 出的子进程可能继承被持有的锁，使用 spawn
+            _pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+@jobs.handler("media.variants")
+def generate_variants(attachment_id: int) -> None:
+    """后台任务：为附件生成缩略图并记录原图尺寸。"""
+    attachment = db.session.get(Attachment, attachment_id)
+    if attachment is None or attachment.ext not in _RESIZABLE:
+        return
+    if importlib.util.find_spec("PIL") is None:
+        current_app.logger.warning("Pillow is not installed; skipping thumbnails for %s", attachment.filename)
+        return
+
+    src = media_path(attachment.filename)
+    widths = current_app.config["MEDIA_VARIANT_WIDTHS"]
+    processes = current_app.config["MEDIA_THUMBNAIL_PROCESSES"]
+    if processes > 0:
+        width, height, made = _get_pool(processes).submit(_make_variants, src, attachment.ext, widths).result()
+    else:
+        width, height, made = _make_variants(src, attachment.ext, widths)
+    attachment.width, attachment.height = width, height
+    attachment.variants = ",".join(str(w) for w in made)
+
+
+def serve_media(filename):
+    """分发附件原图或缩略图（内容寻址，可永久缓存）。"""
+    if not _FILENAME_RE.match(filename):
+        abort(404)
+    response = send_from_directory(
+        os.path.join(current_app.config["MEDIA_DIR"], filename[:2]),
+        filename,
+        max_age=current_app.config["MEDIA_CACHE_MAX_AGE"],
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def referenced_hashes(body: str) -> set:
+    """正文中引用的本站附件的 sha256 集合。"""
+    return {match.group(2) for match in _REFERENCE_RE.finditer(body)}
+
+
+def render_body(body: str) -> Markup:
+    """转义正文，并把对本站附件的引用渲染为 ``<img>``（有缩略图时带 srcset）。"""
+    escaped = str(escape(body))
+    hashes = referenced_hashes(escaped)
+    if not hashes:
+        return Markup(escaped)
+    attachments = {
+        attachment.sha256: attachment
+        for attachment in Attachment.query.filter(Attachment.sha256.in_(hashes))
+    }
+
+    def replace(match):
+        alt, sha256, ext = match.groups()
+        attachment = attachments.get(sha256)
+        src = f"/media/{sha256}.{ext}"
+        if attachment is None:
+            return match.group(0)
+        attrs = f'src="{src}" alt="{alt}" class="img-fluid" loading="lazy"'
+        widths = attachment.variant_widths()
+        if widths and attachment.width:
+            candidates = [f"/media/{sha256}-{w}.{ext} {w}w" for w in widths]
+            candidates.append(f"{src} {attachment.width}w")
+            attrs += f' srcset="{", ".join(candidates)}" sizes="(max-width: {widths[-1]}px) 100vw, {widths[-1]}px"'
+        if attachment.width and attachment.height:
+            attrs += f' width="{attachment.width}" height="{attachment.height}"'
+        return f"<img {attrs}>"
+
+    return Markup(_REFERENCE_RE.sub(replace, escaped))
+
+
+def init_app(app) -> None:
+    """设置默认配置，注册附件分发路由与正文渲染过滤器。"""
+    app.config.setdefault("MEDIA_DIR", os.path.join(app.instance_path, "media"))
+    # 流式写盘的块大小
+    app.config.setdefault("MEDIA_CHUNK_SIZE", 64 * 1024)
+    app.config.setdefault("MEDIA_MAX_FILE_SIZE", 10 * 1024 * 1024)
+    # 整个请求体的上限（可一次上传多张图片）
+    app.config.setdefault("MAX_CONTENT_LENGTH", 50 * 1024 * 1024)
+    app.config.setdefault("MEDIA_VARIANT_WIDTHS", [320, 960])
+    # 生成缩略图的进程数，为 0 时在任务线程内直接生成
+    app.config.setdefault("MEDIA_THUMBNAIL_PROCESSES", min(4, os.cpu_count() or 1))
+    app.config.setdefault("MEDIA_CACHE_MAX_AGE", 365 * 24 * 3600)
+    app.add_url_rule("/media/<filename>", "media_file", serve_media)
+    app.add_template_filter(render_body, "render_body")
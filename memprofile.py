@@ -0,0 +1,306 @@
+"""按端点统计请求的内存分配（基于 tracemalloc，默认关闭）。
+
+worker 内存持续增长时，需要知道是哪个路由造成的（例如首页一次性物化全部
+``Post`` 对象）。开启 ``MEMORY_PROFILE`` 后，首个请求到来时启动 tracemalloc，
+之后每个请求记录：
+
+- 峰值：请求期间已分配内存的最高点减去请求开始时的值（``tracemalloc.reset_peak``）
+- 净增：请求结束（teardown）时仍未释放的分配，含尚未关闭的数据库会话持有的对象
+
+每个端点保留累计次数、最大峰值、净增总量，以及最近 ``MEMORY_PROFILE_WINDOW``
+个请求的滑动窗口（平均值与 p95）。每个端点每 ``MEMORY_PROFILE_SNAPSHOT_EVERY``
+个请求（含第一个）在请求前后各取一次快照并比较，把新增分配归到调用栈中最内层的
+应用代码行，累计为该端点的主要分配位置。快照与整个堆的大小成正比，因此只抽样。
+
+tracemalloc 是进程级的：多线程并发处理请求时，请求之间会互相计入对方的分配，
+被其他请求重叠的样本单独计数（``overlapped``）。需要准确数字时以单线程 worker 运行。
+
+统计每 ``MEMORY_PROFILE_DUMP_INTERVAL`` 秒写入 ``MEMORY_PROFILE_DIR/<pid>.json``，
+``flask memory report`` 汇总各 worker 的文件；``/admin/memory`` 向
+``ADMIN_USERNAMES`` 中的用户返回当前进程的统计（JSON）。
+"""
+
+import glob
+import json
+import linecache
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+
+import click
+from flask import abort, current_app, g, jsonify, request
+from flask.cli import AppGroup
+from flask_login import current_user, login_required
+
+# 快照比较时忽略的分配：tracemalloc 自身与本模块（Snapshot.filter_traces 逐帧匹配，
+# 在大堆上过慢，这里只检查分配发生的位置）
+_IGNORED_FILES = frozenset({tracemalloc.__file__, __file__})
+# 每个端点保留的分配位置数上限
+_MAX_SITES = 100
+
+
+def _percentile(values, q: float) -> int:
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class EndpointStats:
+    """单个端点的累计统计与滑动窗口。"""
+
+    def __init__(self, window: int):
+        self.count = 0
+        self.sampled = 0
+        self.overlapped = 0
+        self.peak_max = 0
+        self.net_total = 0
+        self.peaks = deque(maxlen=window)
+        self.nets = deque(maxlen=window)
+        self.sites = Counter()
+
+    def record(self, peak: int, net: int, overlapped: bool) -> None:
+        self.count += 1
+        self.overlapped += overlapped
+        self.peak_max = max(self.peak_max, peak)
+        self.net_total += net
+        self.peaks.append(peak)
+        self.nets.append(net)
+
+    def add_sites(self, sites: Counter) -> None:
+        self.sampled += 1
+        self.sites.update(sites)
+        if len(self.sites) > _MAX_SITES:
+            self.sites = Counter(dict(self.sites.most_common(_MAX_SITES)))
+
+    def summary(self, top: int) -> dict:
+        window = len(self.peaks) or 1
+        return {
+            "count": self.count,
+            "sampled": self.sampled,
+            "overlapped": self.overlapped,
+            "peak_avg": sum(self.peaks) // window,
+            "peak_p95": _percentile(self.peaks, 0.95),
+            "peak_max": self.peak_max,
+            "net_avg": sum(self.nets) // window,
+            "net_total": self.net_total,
+            "sites": [[site, size] for site, size in self.sites.most_common(top)],
+        }
+
+
+class MemoryProfiler:
+    """单个应用实例的按端点内存统计（线程安全）。"""
+
+    def __init__(self, app):
+        self.app = app
+        self.root = os.path.abspath(app.root_path) + os.sep
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._active = 0
+        self._started = 0
+        self._last_dump = time.monotonic()
+
+    def start_request(self) -> None:
+        config = self.app.config
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(config["MEMORY_PROFILE_FRAMES"])
+        endpoint = request.endpoint or "<unmatched>"
+        with self._lock:
+            stats = self._stats(endpoint)
+            sample = stats.count % config["MEMORY_PROFILE_SNAPSHOT_EVERY"] == 0
+            overlapped = self._active > 0
+            self._active += 1
+            self._started += 1
+            started = self._started
+        snapshot = tracemalloc.take_snapshot() if sample else None
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        g.memprofile = (endpoint, current, snapshot, started, overlapped)
+
+    def finish_request(self) -> None:
+        state = g.pop("memprofile", None)
+        if state is None or not tracemalloc.is_tracing():
+            return
+        endpoint, start, snapshot, started, overlapped = state
+        current, peak = tracemalloc.get_traced_memory()
+        sites = self._diff_sites(snapshot) if snapshot is not None else None
+        with self._lock:
+            self._active -= 1
+            # 本请求开始后又有其他请求开始，峰值与净增可能包含它们的分配
+            overlapped = overlapped or self._started != started
+            stats = self._stats(endpoint)
+            stats.record(max(0, peak - start), current - start, overlapped)
+            if sites is not None:
+                stats.add_sites(sites)
+        self._maybe_dump()
+
+    def _stats(self, endpoint: str) -> EndpointStats:
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = self._endpoints[endpoint] = EndpointStats(self.app.config["MEMORY_PROFILE_WINDOW"])
+        return stats
+
+    def _diff_sites(self, before) -> Counter:
+        sites = Counter()
+        for stat in tracemalloc.take_snapshot().compare_to(before, "traceback"):
+            if stat.size_diff > 0 and stat.traceback[-1].filename not in _IGNORED_FILES:
+                sites[self._site(stat.traceback)] += stat.size_diff
+        return sites
+
+    def _site(self, traceback) -> str:
+        """调用栈中最内层的应用代码行（不含第三方包）；找不到时取分配发生的位置。"""
+        for frame in reversed(traceback):
+            if frame.filename.startswith("<"):
+                continue
+            filename = os.path.abspath(frame.filename)
+            if filename.startswith(self.root) and "site-packages" not in filename:
+                return f"{os.path.relpath(filename, self.root)}:{frame.lineno}"
+        frame = traceback[-1]
+        return f"{frame.filename}:{frame.lineno}"
+
+    def report(self, top: int = 10) -> dict:
+        with self._lock:
+            endpoints = {name: stats.summary(top) for name, stats in self._endpoints.items()}
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {"pid": os.getpid(), "traced_current": current, "traced_peak": peak, "endpoints": endpoints}
+
+    def _maybe_dump(self) -> None:
+        interval = self.app.config["MEMORY_PROFILE_DUMP_INTERVAL"]
+        now = time.monotonic()
+        if now - self._last_dump < interval:
+            return
+        self._last_dump = now
+        try:
+            self.dump()
+        except OSError as exc:
+            self.app.logger.warning("memory profile dump failed: %s", exc)
+
+    def dump(self) -> str:
+        """把当前进程的统计原子写入 MEMORY_PROFILE_DIR/<pid>.json，返回文件路径。"""
+        directory = self.app.config["MEMORY_PROFILE_DIR"]
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.report(_MAX_SITES), f)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        return path
+
+
+def merge_reports(reports) -> dict:
+    """汇总多个 worker 的统计：次数与净增相加，峰值取最大，平均值按次数加权。"""
+    merged = {}
+    for report in reports:
+        for name, stats in report["endpoints"].items():
+            total = merged.setdefault(name, {
+                "count": 0, "sampled": 0, "overlapped": 0, "peak_avg": 0, "peak_max": 0,
+                "net_avg": 0, "net_total": 0, "sites": Counter(),
+            })
+            count = total["count"] + stats["count"]
+            for key in ("peak_avg", "net_avg"):
+                total[key] = (total[key] * total["count"] + stats[key] * stats["count"]) // (count or 1)
+            total["count"] = count
+            total["sampled"] += stats["sampled"]
+            total["overlapped"] += stats["overlapped"]
+            total["peak_max"] = max(total["peak_max"], stats["peak_max"])
+            total["net_total"] += stats["net_total"]
+            total["sites"].update(dict(stats["sites"]))
+    return merged
+
+
+def _format_bytes(size: int) -> str:
+    if abs(size) < 1024 * 1024:
+        return f"{size / 1024:.1f} KiB"
+    return f"{size / (1024 * 1024):.1f} MiB"
+
+
+def _source_line(site: str) -> str:
+    filename, _, lineno = site.rpartition(":")
+    if not os.path.isabs(filename):
+        filename = os.path.join(current_app.root_path, filename)
+    return linecache.getline(filename, int(lineno)).strip() if lineno.isdigit() else ""
+
+
+def is_admin(user) -> bool:
+    return user.is_authenticated and user.username in current_app.config["ADMIN_USERNAMES"]
+
+
+@login_required
+def memory_report():
+    """管理员查看当前进程的按端点内存统计。"""
+    if not is_admin(current_user):
+        abort(403)
+    if not current_app.config["MEMORY_PROFILE"]:
+        abort(404)
+    top = request.args.get("top", 10, type=int)
+    return jsonify(get_memory_profiler().report(top))
+
+
+memory_cli = AppGroup("memory", help="按端点的内存分配统计相关命令。")
+
+
+@memory_cli.command("report")
+@click.option("--top", default=10, show_default=True, help="列出的端点数。")
+@click.option("--sites", default=5, show_default=True, help="每个端点列出的分配位置数。")
+@click.option("--sort", "sort_key", type=click.Choice(["net", "peak"]), default="net", show_default=True,
+              help="按净增总量或最大峰值排序。")
+def report_command(top, sites, sort_key):
+    """汇总各 worker 写入 MEMORY_PROFILE_DIR 的统计，列出分配最多的端点与调用位置。"""
+    reports = []
+    for path in sorted(glob.glob(os.path.join(current_app.config["MEMORY_PROFILE_DIR"], "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            reports.append(json.load(f))
+    if not reports:
+        raise click.ClickException("没有统计数据：请开启 MEMORY_PROFILE 并等待 worker 写入统计文件。")
+
+    merged = merge_reports(reports)
+    field = "net_total" if sort_key == "net" else "peak_max"
+    ranked = sorted(merged.items(), key=lambda item: item[1][field], reverse=True)
+    print(f"{len(reports)} workers, {len(merged)} endpoints.")
+    for name, stats in ranked[:top]:
+        print(
+            f"{name}: requests={stats['count']} peak_avg={_format_bytes(stats['peak_avg'])} "
+            f"peak_max={_format_bytes(stats['peak_max'])} net_avg={_format_bytes(stats['net_avg'])} "
+            f"net_total={_format_bytes(stats['net_total'])} overlapped={stats['overlapped']}"
+        )
+        for site, size in stats["sites"].most_common(sites):
+            print(f"    {_format_bytes(size):>12}  {site}  {_source_line(site)}")
+
+
+def init_app(app) -> None:
+    """设置默认配置，注册请求钩子、管理端点与命令；MEMORY_PROFILE 为 False 时钩子直接返回。"""
+    app.config.setdefault("MEMORY_PROFILE", False)
+    # tracemalloc 保存的调用栈深度；需足够深才能越过 ORM 与模板引擎回到应用代码
+    app.config.setdefault("MEMORY_PROFILE_FRAMES", 25)
+    app.config.setdefault("MEMORY_PROFILE_WINDOW", 200)
+    app.config.setdefault("MEMORY_PROFILE_SNAPSHOT_EVERY", 20)
+    app.config.setdefault("MEMORY_PROFILE_DUMP_INTERVAL", 30)
+    app.config.setdefault("MEMORY_PROFILE_DIR", os.path.join(app.instance_path, "memprofile"))
+    # 可访问 /admin/memory 等管理端点的用户名
+    app.config.setdefault("ADMIN_USERNAMES", ())
+    profiler = app.extensions["memprofile"] = MemoryProfiler(app)
+
+    @app.before_request
+    def _start_memory_profile():
+        if app.config["MEMORY_PROFILE"]:
+            profiler.start_request()
+
+    @app.teardown_request
+    def _finish_memory_profile(exc=None):
+        if app.config["MEMORY_PROFILE"]:
+            profiler.finish_request()
+
+    app.add_url_rule("/admin/memory", "memory_report", memory_report)
+    app.cli.add_command(memory_cli)
+
+
+def get_memory_profiler() -> MemoryProfiler:
+    """返回当前应用的内存统计。"""
+    return current_app.extensions["memprofile"]
@@ -4,11 +4,23 @@
 本文件包含博客系统的核心数据模型：
 - User：用户模型
 - Post：文章模型
+- PostBody：压缩存储的长文章正文
+- TrendingScore：热门排行快照
+- Tag / PostTag：标签及文章-标签关联
+- PostRevision：文章修订历史
+- PostTerm / TermStat / RelatedIndexState / RelatedPost：相关文章推荐
+- Job：后台任务队列
+- Attachment：图片附件（按内容哈希去重）
+- Comment：文章评论
+- MonthlyPostCount：按月文章数汇总（归档侧栏）
 """
 
+import zlib
 from datetime import datetime
 
+from flask import current_app, has_app_context
 from flask_login import UserMixin
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from extensions import db
@@ -21,6 +33,8 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(64), unique=True, nullable=False, index=True)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(128), nullable=False)
+    # 反规范化的文章数，在创建/删除文章时维护，避免个人主页对 posts 做 COUNT(*)
+    post_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
     posts = db.relationship("Post", backref="author", lazy="dynamic")
 
     def set_password(self, password: str) -> None:
@@ -44,20 +58,388 @@ class User(UserMixin, db.Model):
         """
         return check_password_hash(self.password_hash, password)
 
+    @staticmethod
+    def adjust_post_count(user_id: int, delta: int) -> None:
+        """
+        在当前事务内原子地调整用户文章数（不加载 User 对象）
+        
+        Args:
+            user_id: 用户 ID
+            delta: 增量，创建文章为 1，删除文章为 -1
+        """
+        db.session.execute(
+            db.update(User)
+            .where(User.id == user_id)
+            .values(post_count=User.post_count + delta)
+        )
+
     def __repr__(self) -> str:
         return f"<User {self.username}>"
 
 
+# 首页等列表页展示的摘要长度（字符）
+EXCERPT_LENGTH = 200
+# 未配置 POST_BODY_COMPRESS_THRESHOLD 时的默认压缩阈值（UTF-8 字节数）
+DEFAULT_COMPRESS_THRESHOLD = 2048
+
+
+def _compress_threshold() -> int:
+    if has_app_context():
+        return current_app.config.get("POST_BODY_COMPRESS_THRESHOLD", DEFAULT_COMPRESS_THRESHOLD)
+    return DEFAULT_COMPRESS_THRESHOLD
+
+
 class Post(db.Model):
-    """文章模型"""
+    """文章模型
+
+    正文通过 ``body`` 属性读写：短正文内联存放在 post.body 列（延迟加载），
+    超过阈值的正文经 zlib 压缩后存入 post_body 表，仅在访问时加载。
+    列表页只需 ``excerpt``，加载文章时不会把整篇正文带入 SQLite 页缓存。
+    """
+
+    # 个人主页按作者筛选并按时间倒序分页，复合索引可直接定位到游标位置
+    __table_args__ = (db.Index("ix_post_user_id_timestamp", "user_id", "timestamp"),)
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
-    body = db.Column(db.Text, nullable=False)
+    _body = db.deferred(db.Column("body", db.Text, nullable=False, default=""))
+    excerpt = db.Column(db.String(EXCERPT_LENGTH), nullable=False, default="", server_default="")
+    body_compressed = db.Column(db.Boolean, nullable=False, default=False, server_default="0")
     timestamp = db.Column(db.DateTime, default=datetime.now, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"))
+    # 由 counters.ViewCounter 批量写回，不含进程内尚未写回的增量
+    view_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # 反规范化的评论数，在发表/删除评论时维护，列表页无需逐篇 COUNT(*)
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # 乐观并发控制版本号：ORM 更新时带上 WHERE version = <加载时的值>，
+    # 不自动生成新值，由编辑流程显式递增
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version, "version_id_generator": False}
+    compressed_body = db.relationship(
+        "PostBody", uselist=False, lazy="select", cascade="all, delete-orphan"
+    )
+    tag_links = db.relationship("PostTag", lazy="select", cascade="all, delete-orphan")
+    tags = db.relationship(
+        "Tag", secondary="post_tag", lazy="select", viewonly=True, order_by="Tag.name"
+    )
+
+    @property
+    def body(self) -> str:
+        """文章正文（压缩存储时在此解压）"""
+        if self.body_compressed:
+            return zlib.decompress(self.compressed_body.data).decode("utf-8")
+        return self._body
+
+    @body.setter
+    def body(self, value: str) -> None:
+        """
+        设置文章正文，并按阈值选择内联或压缩存储
+        
+        Args:
+            value: 正文字符串
+        """
+        self.excerpt = value[:EXCERPT_LENGTH]
+        raw = value.encode("utf-8")
+        compressed = zlib.compress(raw) if len(raw) >= _compress_threshold() else None
+
+        # 压缩后不更小（如已压缩过的内容）时仍内联存放
+        if compressed is not None and len(compressed) < len(raw):
+            self._body = ""
+            self.body_compressed = True
+            if self.compressed_body is None:
+                self.compressed_body = PostBody(data=compressed)
+            else:
+                self.compressed_body.data = compressed
+        else:
+            self._body = value
+            if self.body_compressed:
+                self.compressed_body = None
+            self.body_compressed = False
+
+    def set_tags(self, names) -> None:
+        """
+        设置文章标签，并在当前事务内维护各标签的文章数
+        
+        Args:
+            names: 规范化后的标签名列表（删除文章前传入空列表以释放标签）
+        """
+        if self.timestamp is None:
+            # 关联表冗余存放文章时间，新文章需要先确定时间戳
+            self.timestamp = datetime.now()
+
+        wanted = list(dict.fromkeys(names))
+        current = {link.tag.name: link for link in self.tag_links}
+
+        for name, link in current.items():
+            if name not in wanted:
+                self.tag_links.remove(link)
+                Tag.adjust_post_count(link.tag_id, -1)
+
+        new_names = [name for name in wanted if name not in current]
+        if not new_names:
+            return
+        existing = {tag.name: tag for tag in Tag.query.filter(Tag.name.in_(new_names))}
+        for name in new_names:
+            tag = existing.get(name)
+            if tag is None:
+                tag = Tag(name=name, post_count=1)
+            else:
+                Tag.adjust_post_count(tag.id, 1)
+            self.tag_links.append(PostTag(tag=tag, post_timestamp=self.timestamp))
+
+    @staticmethod
+    def adjust_comment_count(post_id: int, delta: int) -> None:
+        """
+        在当前事务内原子地调整文章评论数（不加载 Post 对象，也不递增版本号）
+        
+        Args:
+            post_id: 文章 ID
+            delta: 增量（发表评论 +1，删除评论 -1）
+        """
+        db.session.execute(
+            db.update(Post)
+            .where(Post.id == post_id)
+            .values(comment_count=Post.comment_count + delta)
+        )
 
     def __repr__(self) -> str:
         return f"<Post {self.title[:20]}>"
 
 
+class PostBody(db.Model):
+    """压缩存储的文章正文（zlib）"""
+
+    __tablename__ = "post_body"
+
+    post_id = db.Column(db.Integer, db.ForeignKey("post.id"), primary_key=True)
+    data = db.Column(db.LargeBinary, nullable=False)
+
+
+class TrendingScore(db.Model):
+    """热门排行快照（各进程的 trending.TrendingTracker 定期合并写入）"""
+
+    __tablename__ = "trending_score"
+
+    post_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    # 对数形式的时间衰减得分，见 trending 模块说明
+    score = db.Column(db.Float, nullable=False)
+
+
+class Tag(db.Model):
+    """标签模型"""
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(32), unique=True, nullable=False, index=True)
+    # 反规范化的文章数，在文章打标/删除时维护，首页标签云无需聚合查询
+    post_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    @staticmethod
+    def adjust_post_count(tag_id: int, delta: int) -> None:
+        """
+        在当前事务内原子地调整标签文章数
+        
+        Args:
+            tag_id: 标签 ID
+            delta: 增量
+        """
+        db.session.execute(
+            db.update(Tag)
+            .where(Tag.id == tag_id)
+            .values(post_count=Tag.post_count + delta)
+        )
+
+    def __repr__(self) -> str:
+        return f"<Tag {self.name}>"
+
+
+class MonthlyPostCount(db.Model):
+    """按月文章数汇总
+
+    在发布/删除文章时维护，归档侧栏直接读取本表，无需按月分组扫描 post 表。
+    """
+
+    __tablename__ = "monthly_post_count"
+
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    post_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    @staticmethod
+    def adjust(timestamp: datetime, delta: int) -> None:
+        """
+        在当前事务内原子地调整文章发布时间所在月份的文章数（该月尚无记录时插入）
+        
+        Args:
+            timestamp: 文章发布时间
+            delta: 增量，创建文章为 1，删除文章为 -1
+        """
+        statement = sqlite_insert(MonthlyPostCount).values(
+            year=timestamp.year, month=timestamp.month, post_count=delta
+        )
+        db.session.execute(
+            statement.on_conflict_do_update(
+                index_elements=["year", "month"],
+                set_={"post_count": MonthlyPostCount.post_count + delta},
+            )
+        )
+
+    def __repr__(self) -> str:
+        return f"<MonthlyPostCount {self.year}-{self.month:02d}: {self.post_count}>"
+
+
+class PostTag(db.Model):
+    """文章-标签关联
+
+    冗余存放文章时间戳，``(tag_id, post_timestamp, post_id)`` 索引覆盖标签页的
+    过滤、排序与键集游标，分页时只需按主键回表取当页文章。
+    """
+
+    __tablename__ = "post_tag"
+    __table_args__ = (
+        db.Index("ix_post_tag_tag_id_post_timestamp", "tag_id", "post_timestamp", "post_id"),
+    )
+
+    post_id = db.Column(db.Integer, db.ForeignKey("post.id"), primary_key=True)
+    tag_id = db.Column(db.Integer, db.ForeignKey("tag.id"), primary_key=True)
+    post_timestamp = db.Column(db.DateTime, nullable=False)
+    tag = db.relationship("Tag")
+
+
+class PostRevision(db.Model):
+    """文章修订版本
+
+    ``data`` 为 zlib 压缩内容：快照版本存完整正文，其余版本存相对上一版本的
+    行级差量（见 revisions 模块）。
+    """
+
+    __tablename__ = "post_revision"
+    __table_args__ = (
+        db.Index("ix_post_revision_post_id_number", "post_id", "number", unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey("post.id"), nullable=False)
+    number = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    is_snapshot = db.Column(db.Boolean, nullable=False, default=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+    created = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<PostRevision {self.post_id}#{self.number}>"
+
+
+class PostTerm(db.Model):
+    """文章词频（TF-IDF 文档-词矩阵，按 (term, post_id) 索引即倒排表）"""
+
+    __tablename__ = "post_term"
+    __table_args__ = (db.Index("ix_post_term_term_post_id", "term", "post_id"),)
+
+    post_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    term = db.Column(db.String(64), primary_key=True)
+    tf = db.Column(db.Integer, nullable=False)
+
+
+class TermStat(db.Model):
+    """词项的文档频率（空词项的 df 为已索引的文章总数）"""
+
+    __tablename__ = "term_stat"
+
+    term = db.Column(db.String(64), primary_key=True)
+    df = db.Column(db.Integer, nullable=False)
+
+
+class RelatedIndexState(db.Model):
+    """文章的索引状态：索引时的文章版本号与向量范数"""
+
+    __tablename__ = "related_index_state"
+
+    post_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    version = db.Column(db.Integer, nullable=False)
+    norm = db.Column(db.Float, nullable=False)
+
+
+class RelatedPost(db.Model):
+    """预先计算的相关文章（每篇文章 Top-N 邻居）"""
+
+    __tablename__ = "related_post"
+    __table_args__ = (db.Index("ix_related_post_post_id_score", "post_id", "score"),)
+
+    post_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    related_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    score = db.Column(db.Float, nullable=False)
+
+
+class Job(db.Model):
+    """
+    后台任务（持久化队列）
+
+    status 取值：pending（等待执行，run_at 之后可被领取）、running（执行中）、
+    failed（重试次数用尽）。执行成功的任务直接删除。
+    """
+
+    __tablename__ = "job"
+    __table_args__ = (db.Index("ix_job_status_run_at", "status", "run_at"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default="{}")
+    status = db.Column(db.String(16), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    started = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    def __repr__(self) -> str:
+        return f"<Job {self.id} {self.name} {self.status}>"
+
+
+class Attachment(db.Model):
+    """
+    图片附件（按内容的 SHA-256 去重）
+
+    文件按哈希命名存放在 MEDIA_DIR 下，文章正文以 ``![说明](/media/<sha256>.<ext>)``
+    引用；缩略图由后台任务生成，``variants`` 记录已生成的宽度（逗号分隔）。
+    """
+
+    __tablename__ = "attachment"
+
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), unique=True, nullable=False)
+    ext = db.Column(db.String(8), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    variants = db.Column(db.String(64), nullable=False, default="")
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"))
+    created = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    @property
+    def filename(self) -> str:
+        return f"{self.sha256}.{self.ext}"
+
+    def variant_widths(self) -> list:
+        return [int(width) for width in self.variants.split(",") if width]
+
+    def __repr__(self) -> str:
+        return f"<Attachment {self.filename}>"
+
+
+class Comment(db.Model):
+    """文章评论"""
+
+    __tablename__ = "comment"
+    # 详情页按文章筛选并按时间倒序键集分页
+    __table_args__ = (db.Index("ix_comment_post_id_created", "post_id", "created"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey("post.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    created = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    author = db.relationship("User", lazy="joined")
+
+    def __repr__(self) -> str:
+        return f"<Comment {self.id} on {self.post_id}>"
@@ -0,0 +1,73 @@
+"""键集（keyset）分页工具。
+
+与 OFFSET 分页不同，键集分页以上一页最后一条记录的 ``(timestamp, id)``
+作为游标，配合 ``(..., timestamp)`` 复合索引直接定位到下一页起点，
+翻页深度不影响查询代价，也不会因为新文章插入而出现重复或遗漏。
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+
+@dataclass
+class KeysetPage:
+    """一页查询结果；``next_cursor`` 为 None 表示已是最后一页。"""
+
+    items: List
+    next_cursor: Optional[str]
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """把排序键编码为 URL 参数，例如 ``2024-01-01T12:00:00.000001_42``。"""
+    return f"{timestamp.isoformat()}_{row_id}"
+
+
+def decode_cursor(raw: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """解析游标参数；缺失或格式非法时返回 None（即从第一页开始）。"""
+    if not raw:
+        return None
+    try:
+        stamp, _, row_id = raw.rpartition("_")
+        return datetime.fromisoformat(stamp), int(row_id)
+    except ValueError:
+        return None
+
+
+def keyset_paginate(query, timestamp_col, id_col, cursor: Optional[str], per_page: int, cursor_key=None) -> KeysetPage:
+    """按 ``(timestamp DESC, id DESC)`` 对查询做键集分页。
+
+    Args:
+        query: 已附加过滤条件的查询对象
+        timestamp_col: 排序用的时间列
+        id_col: 用于打破时间相同情况的主键列
+        cursor: 上一页返回的 ``next_cursor``
+        per_page: 每页条数
+        cursor_key: 可选，从结果项取出 ``(timestamp, id)`` 的函数；
+            排序列不在结果实体上（如按关联表的冗余列排序）时需要提供
+
+    Returns:
+        KeysetPage: 当前页数据与下一页游标
+    """
+    # 时间列可为空（早期数据库中的旧数据），这类行无法编码为游标，不参与分页
+    query = query.filter(timestamp_col.is_not(None))
+    key = decode_cursor(cursor)
+    if key is not None:
+        stamp, row_id = key
+        query = query.filter(
+            or_(timestamp_col < stamp, and_(timestamp_col == stamp, id_col < row_id))
+        )
+
+    # 多取一条用于判断是否还有下一页
+    rows = query.order_by(timestamp_col.desc(), id_col.desc()).limit(per_page + 1).all()
+    items = rows[:per_page]
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        if cursor_key is None:
+            next_cursor = encode_cursor(getattr(last, timestamp_col.key), getattr(last, id_col.key))
+        else:
+            next_cursor = encode_cursor(*cursor_key(last))
+    return KeysetPage(items=items, next_cursor=next_cursor)
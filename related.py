@@ -0,0 +1,339 @@
+"""相关文章推荐：TF-IDF 稀疏向量 + 余弦相似度，离线批量计算、增量更新。
+
+详情页只读取 ``related_post`` 表中预先算好的 Top-N 邻居，请求路径上不做任何
+相似度计算。向量以 ``{term: weight}`` 稀疏字典表示，文档-词矩阵按列存成
+倒排表（``post_term`` 表的 (term, post_id) 索引），相似度计算即稀疏矩阵乘积：
+只累加与查询文档至少共享一个词的文档，不构造稠密矩阵。
+
+- ``flask related build``：全量重建词表、文档频率与全部邻居
+- 文章发布、编辑、删除后由后台任务（``related.update``）增量更新该文章，只按主键
+  查询该文章的状态；文章总数保存在 ``term_stat`` 中，不扫描全表
+- ``flask related update``：只处理新增、编辑（版本号变化）和删除的文章；
+  用当前文档频率计算这些文章的向量，更新它们自己的邻居列表，并把它们
+  插入到相似文章的邻居列表中，而不重算整个矩阵。文档频率的漂移会在下次
+  全量重建时修正。
+
+权重为 ``(1 + ln tf) · idf``，``idf = ln((1 + N) / (1 + df)) + 1``，向量做 L2 归一化。
+分词：英文/数字按单词，中文按相邻两字（bigram）；标题中的词计两次。
+"""
+
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+
+from flask import current_app
+from flask.cli import AppGroup
+
+import jobs
+from extensions import db
+from models import Post, PostTerm, RelatedIndexState, RelatedPost, TermStat
+
+_WORD_RE = re.compile(r"[a-z0-9]{2,}|[一-鿿]+")
+# 每篇文章都视为包含空词项，term_stat 中其 df 即已索引的文章总数，增量更新时不必计数
+_TOTAL_TERM = ""
+
+
+def tokenize(text: str) -> list:
+    """把文本切分为检索词：英文单词、中文相邻两字。"""
+    tokens = []
+    for match in _WORD_RE.finditer(text.lower()):
+        word = match.group()
+        if word[0] < "一":
+            tokens.append(word)
+        elif len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+def term_frequencies(post) -> Counter:
+    """文章的词频（标题权重为正文的两倍）。"""
+    title_terms = tokenize(post.title)
+    return Counter(title_terms * 2 + tokenize(post.body))
+
+
+def _idf(df: int, total: int) -> float:
+    return math.log((1 + total) / (1 + df)) + 1
+
+
+def _weights(tf: dict, df: dict, total: int) -> dict:
+    """计算 L2 归一化的 TF-IDF 稀疏向量。"""
+    vector = {term: (1 + math.log(count)) * _idf(df.get(term, 1), total) for term, count in tf.items()}
+    norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+    return {term: w / norm for term, w in vector.items()}
+
+
+def _is_stop_term(df: int, total: int) -> bool:
+    """文档频率过高的词区分度低，且会让候选集合膨胀，计算相似度时跳过。"""
+    return total >= 20 and df > total * current_app.config["RELATED_MAX_DF_RATIO"]
+
+
+def _load_posts(post_ids=None):
+    query = Post.query.options(db.undefer(Post._body), db.selectinload(Post.compressed_body))
+    if post_ids is not None:
+        query = query.filter(Post.id.in_(post_ids))
+    return query.all()
+
+
+def build_all() -> int:
+    """全量重建，返回参与计算的文章数。"""
+    limit = current_app.config["RELATED_POSTS_COUNT"]
+    posts = _load_posts()
+    frequencies = {post.id: term_frequencies(post) for post in posts}
+    total = len(posts)
+
+    df = Counter()
+    for tf in frequencies.values():
+        df.update(tf.keys())
+
+    vectors = {post_id: _weights(tf, df, total) for post_id, tf in frequencies.items()}
+
+    # 倒排表即文档-词矩阵的按列存储
+    postings = defaultdict(list)
+    for post_id, vector in vectors.items():
+        for term, weight in vector.items():
+            if not _is_stop_term(df[term], total):
+                postings[term].append((post_id, weight))
+
+    related_rows = []
+    for post_id, vector in vectors.items():
+        scores = defaultdict(float)
+        for term, weight in vector.items():
+            for other_id, other_weight in postings.get(term, ()):
+                if other_id != post_id:
+                    scores[other_id] += weight * other_weight
+        related_rows.extend(_neighbor_rows(post_id, scores, limit))
+
+    for model in (RelatedPost, PostTerm, TermStat, RelatedIndexState):
+        db.session.execute(db.delete(model))
+    term_rows = [
+        {"post_id": post_id, "term": term, "tf": count}
+        for post_id, tf in frequencies.items()
+        for term, count in tf.items()
+    ]
+    if term_rows:
+        db.session.execute(db.insert(PostTerm), term_rows)
+    db.session.execute(
+        db.insert(TermStat),
+        [{"term": _TOTAL_TERM, "df": total}] + [{"term": term, "df": count} for term, count in df.items()],
+    )
+    if posts:
+        db.session.execute(
+            db.insert(RelatedIndexState),
+            [{"post_id": post.id, "version": post.version, "norm": _norm(frequencies[post.id], df, total)}
+             for post in posts],
+        )
+    if related_rows:
+        db.session.execute(db.insert(RelatedPost), related_rows)
+    db.session.commit()
+    return total
+
+
+def _norm(tf: dict, df: dict, total: int) -> float:
+    """未归一化向量的 L2 范数，增量更新时用于归一化已索引文章的权重。"""
+    return math.sqrt(
+        sum(((1 + math.log(count)) * _idf(df.get(term, 1), total)) ** 2 for term, count in tf.items())
+    ) or 1.0
+
+
+def _neighbor_rows(post_id: int, scores: dict, limit: int) -> list:
+    best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+    return [
+        {"post_id": post_id, "related_id": other_id, "score": score}
+        for other_id, score in best
+        if score > 0
+    ]
+
+
+def pending_changes(post_ids=None):
+    """返回 (需要重新索引的文章 ID 列表, 已删除文章 ID 列表)。
+
+    Args:
+        post_ids: 只检查这些文章（按主键查找）；为 None 时检查全部文章
+    """
+    changed = (
+        db.select(Post.id)
+        .outerjoin(RelatedIndexState, RelatedIndexState.post_id == Post.id)
+        .where(db.or_(RelatedIndexState.post_id.is_(None), RelatedIndexState.version != Post.version))
+    )
+    removed = (
+        db.select(RelatedIndexState.post_id)
+        .outerjoin(Post, Post.id == RelatedIndexState.post_id)
+        .where(Post.id.is_(None))
+    )
+    if post_ids is not None:
+        changed = changed.where(Post.id.in_(post_ids))
+        removed = removed.where(RelatedIndexState.post_id.in_(post_ids))
+    return db.session.scalars(changed).all(), db.session.scalars(removed).all()
+
+
+def update_incremental(post_ids=None) -> int:
+    """增量更新新增、编辑与删除的文章，返回处理的文章数。
+
+    Args:
+        post_ids: 只处理这些文章；为 None 时处理全部待更新文章
+    """
+    changed, removed = pending_changes(post_ids)
+
+    for post_id in removed:
+        _unindex(post_id)
+        _adjust_total(-1)
+        db.session.execute(db.delete(RelatedIndexState).where(RelatedIndexState.post_id == post_id))
+    for post in _load_posts(changed):
+        _unindex(post.id)
+        _index(post)
+    db.session.commit()
+    return len(changed) + len(removed)
+
+
+def _adjust_df(terms, delta: int) -> None:
+    terms = list(terms)
+    if not terms:
+        return
+    existing = set(db.session.scalars(db.select(TermStat.term).where(TermStat.term.in_(terms))))
+    if delta > 0:
+        missing = [term for term in terms if term not in existing]
+        if missing:
+            db.session.execute(db.insert(TermStat), [{"term": term, "df": 0} for term in missing])
+    db.session.execute(
+        db.update(TermStat).where(TermStat.term.in_(terms)).values(df=TermStat.df + delta)
+    )
+    db.session.execute(db.delete(TermStat).where(TermStat.term.in_(terms), TermStat.df <= 0))
+
+
+def _indexed_total() -> int:
+    """已索引的文章总数；旧索引没有记录时统计一次并保存。"""
+    total = db.session.scalar(db.select(TermStat.df).where(TermStat.term == _TOTAL_TERM))
+    if total is None:
+        total = db.session.scalar(db.select(db.func.count(RelatedIndexState.post_id)))
+        db.session.add(TermStat(term=_TOTAL_TERM, df=total))
+        db.session.flush()
+    return total
+
+
+def _adjust_total(delta: int) -> None:
+    _indexed_total()
+    db.session.execute(
+        db.update(TermStat).where(TermStat.term == _TOTAL_TERM).values(df=TermStat.df + delta)
+    )
+
+
+def _unindex(post_id: int) -> None:
+    """移除文章的词项与邻居记录（并从其他文章的邻居列表中移除）。"""
+    old_terms = db.session.scalars(db.select(PostTerm.term).where(PostTerm.post_id == post_id)).all()
+    _adjust_df(old_terms, -1)
+    db.session.execute(db.delete(PostTerm).where(PostTerm.post_id == post_id))
+    db.session.execute(
+        db.delete(RelatedPost).where(
+            db.or_(RelatedPost.post_id == post_id, RelatedPost.related_id == post_id)
+        )
+    )
+
+
+def _index(post) -> None:
+    """用当前文档频率索引一篇文章，并更新它与相似文章的邻居列表。"""
+    limit = current_app.config["RELATED_POSTS_COUNT"]
+    tf = term_frequencies(post)
+    _adjust_df(tf.keys(), 1)
+    if tf:
+        db.session.execute(
+            db.insert(PostTerm), [{"post_id": post.id, "term": term, "tf": count} for term, count in tf.items()]
+        )
+
+    state = db.session.get(RelatedIndexState, post.id)
+    if state is None:
+        _adjust_total(1)
+    total = _indexed_total()
+    df = dict(db.session.execute(db.select(TermStat.term, TermStat.df).where(TermStat.term.in_(list(tf)))).all())
+    vector = _weights(tf, df, total)
+    norm = _norm(tf, df, total)
+
+    # 稀疏向量与倒排表相乘：只访问共享词项的文章
+    query_terms = [term for term in vector if not _is_stop_term(df.get(term, 1), total)]
+    scores = defaultdict(float)
+    norms = {}
+    for start in range(0, len(query_terms), 500):
+        chunk = query_terms[start:start + 500]
+        rows = db.session.execute(
+            db.select(PostTerm.post_id, PostTerm.term, PostTerm.tf, RelatedIndexState.norm)
+            .join(RelatedIndexState, RelatedIndexState.post_id == PostTerm.post_id)
+            .where(PostTerm.term.in_(chunk), PostTerm.post_id != post.id)
+        ).all()
+        for other_id, term, count, other_norm in rows:
+            other_weight = (1 + math.log(count)) * _idf(df[term], total) / other_norm
+            scores[other_id] += vector[term] * other_weight
+
+    rows = _neighbor_rows(post.id, scores, limit)
+    if rows:
+        db.session.execute(db.insert(RelatedPost), rows)
+
+    # 把新文章插入相似文章的邻居列表，超出 N 个时淘汰得分最低者
+    for row in rows:
+        other_id, score = row["related_id"], row["score"]
+        neighbors = db.session.execute(
+            db.select(RelatedPost.related_id, RelatedPost.score)
+            .where(RelatedPost.post_id == other_id)
+            .order_by(RelatedPost.score)
+        ).all()
+        if len(neighbors) >= limit:
+            weakest_id, weakest_score = neighbors[0]
+            if weakest_score >= score:
+                continue
+            db.session.execute(
+                db.delete(RelatedPost).where(
+                    RelatedPost.post_id == other_id, RelatedPost.related_id == weakest_id
+                )
+            )
+        db.session.execute(
+            db.insert(RelatedPost), [{"post_id": other_id, "related_id": post.id, "score": score}]
+        )
+
+    if state is None:
+        db.session.add(RelatedIndexState(post_id=post.id, version=post.version, norm=norm))
+    else:
+        state.version = post.version
+        state.norm = norm
+
+
+@jobs.handler("related.update")
+def update_post_job(post_id: int) -> None:
+    """文章发布、编辑或删除后由后台任务增量更新其相关文章。"""
+    update_incremental([post_id])
+
+
+def related_posts(post_id: int) -> list:
+    """读取预先计算的相关文章（按相似度降序，一次联表查询）。"""
+    return (
+        Post.query.join(RelatedPost, RelatedPost.related_id == Post.id)
+        .filter(RelatedPost.post_id == post_id)
+        .order_by(RelatedPost.score.desc())
+        .all()
+    )
+
+
+related_cli = AppGroup("related", help="相关文章推荐的批处理命令。")
+
+
+@related_cli.command("build")
+def build_command():
+    """全量重建全部文章的 TF-IDF 向量与相关文章。"""
+    count = build_all()
+    print(f"Built related posts for {count} posts.")
+
+
+@related_cli.command("update")
+def update_command():
+    """增量更新新增、编辑和删除的文章。"""
+    count = update_incremental()
+    print(f"Updated related posts for {count} changed posts.")
+
+
+def init_app(app) -> None:
+    """设置默认配置并注册命令。"""
+    # 每篇文章保存的相关文章数 N
+    app.config.setdefault("RELATED_POSTS_COUNT", 5)
+    # 文档频率超过该比例的词不参与相似度计算
+    app.config.setdefault("RELATED_MAX_DF_RATIO", 0.5)
+    app.cli.add_command(related_cli)
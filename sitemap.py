@@ -0,0 +1,240 @@
+"""站点地图：sitemap 索引 + 按文章 ID 区间分块的 sitemap 文件，缓存在磁盘上。
+
+爬虫通过翻列表页发现文章代价很高。``/sitemap.xml`` 是 sitemap 索引，
+列出 ``/sitemap-N.xml``；第 N 块包含 ID 位于
+``((N-1)·SITEMAP_CHUNK_SIZE, N·SITEMAP_CHUNK_SIZE]`` 的文章（单块最多 5 万条 URL，
+符合 sitemap 协议上限），``lastmod`` 取文章发布时间。
+
+- 分块文件按 ID 区间流式查询、逐行写入临时文件后原子替换，内存占用与文章数无关
+- 文件缓存在 ``SITEMAP_DIR``，多个 worker 共享；请求时缺失才生成
+- 发布、删除文章后由后台任务（``sitemap.invalidate``）只删除该文章所在分块与索引，
+  其余分块继续复用。文章 ID 不变，因此文章不会在分块之间移动
+- 每个缓存文件旁有一个 ``.gen`` 失效标记，失效时先改写标记再删除文件；生成前后比较
+  标记，生成期间发生的失效不会被写回的旧内容覆盖
+- URL 一律以 ``SITEMAP_BASE_URL`` 为根，未配置时 sitemap 返回 404，不使用请求的
+  Host 头，避免伪造的 Host 被写入共享缓存
+- 每个分块文件末尾记录该块的最新 lastmod，生成索引时只读文件尾，不扫描文章表
+"""
+
+import os
+import tempfile
+import uuid
+from xml.sax.saxutils import escape
+
+import click
+from flask import abort, current_app, send_file, url_for
+from flask.cli import AppGroup
+
+import jobs
+from extensions import db
+from models import Post
+
+_XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+_LASTMOD_PREFIX = "<!-- lastmod: "
+
+
+def _cache_dir() -> str:
+    return current_app.config["SITEMAP_DIR"]
+
+
+def chunk_path(number: int) -> str:
+    return os.path.join(_cache_dir(), f"sitemap-{number}.xml")
+
+
+def index_path() -> str:
+    return os.path.join(_cache_dir(), "sitemap.xml")
+
+
+def chunk_for(post_id: int) -> int:
+    """文章所在的分块编号（从 1 开始）。"""
+    return (post_id - 1) // current_app.config["SITEMAP_CHUNK_SIZE"] + 1
+
+
+def chunk_count() -> int:
+    """按最大文章 ID 计算分块数（主键索引上的 max 查询）。"""
+    max_id = db.session.scalar(db.select(db.func.max(Post.id)))
+    return chunk_for(max_id) if max_id else 0
+
+
+def _write_atomic(path: str, lines) -> None:
+    """把逐行产生的内容写入临时文件后原子替换，读者不会看到写了一半的文件。"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def _generation(path: str) -> str:
+    """读取缓存文件的失效标记；从未失效时为空串。"""
+    try:
+        with open(path + ".gen", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return ""
+
+
+def _build(path: str, lines) -> None:
+    """生成缓存文件；生成期间被失效则重新生成。
+
+    lines 为返回逐行内容的可调用对象，每次重新生成都会重新查询。先写入再检查标记：
+    若失效发生在检查之后，其随后的删除会移除刚写入的文件，两种顺序下都不会留下旧内容。
+    """
+    while True:
+        generation = _generation(path)
+        _write_atomic(path, lines())
+        if _generation(path) == generation:
+            return
+
+
+def generate_chunk(number: int, base_url: str) -> str:
+    """生成第 number 块 sitemap 文件，返回文件路径。"""
+    size = current_app.config["SITEMAP_CHUNK_SIZE"]
+    # 由路由规则得出文章 URL 前缀，避免对每一行调用 url_for
+    prefix = escape(base_url.rstrip("/") + url_for("blog.post_detail", post_id=0).rsplit("/", 1)[0] + "/")
+
+    def lines():
+        rows = db.session.execute(
+            db.select(Post.id, Post.timestamp)
+            .where(Post.id > (number - 1) * size, Post.id <= number * size)
+            .order_by(Post.id)
+            .execution_options(yield_per=1000)
+        )
+        lastmod = ""
+        yield _XML_HEADER
+        yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        for post_id, timestamp in rows:
+            entry = f"<url><loc>{prefix}{post_id}</loc>"
+            if timestamp:
+                day = timestamp.strftime("%Y-%m-%d")
+                lastmod = max(lastmod, day)
+                entry += f"<lastmod>{day}</lastmod>"
+            yield entry + "</url>\n"
+        yield "</urlset>\n"
+        # 流式写出后才知道整块的 lastmod，记录在文件末尾供生成索引时读取
+        yield f"{_LASTMOD_PREFIX}{lastmod} -->\n"
+
+    path = chunk_path(number)
+    _build(path, lines)
+    return path
+
+
+def _chunk_lastmod(path: str):
+    """从分块文件末尾读取 lastmod。"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 64))
+        line = f.read().decode("utf-8").rstrip("\n").rsplit("\n", 1)[-1]
+    if line.startswith(_LASTMOD_PREFIX):
+        return line[len(_LASTMOD_PREFIX):].split(" ", 1)[0] or None
+    return None
+
+
+def ensure_chunk(number: int, base_url: str) -> str:
+    """返回分块文件路径，缓存缺失时生成。"""
+    path = chunk_path(number)
+    if not os.path.exists(path):
+        generate_chunk(number, base_url)
+    return path
+
+
+def ensure_index(base_url: str) -> str:
+    """返回 sitemap 索引路径，缓存缺失时生成（同时补齐缺失的分块）。"""
+    path = index_path()
+    if os.path.exists(path):
+        return path
+
+    root = escape(base_url.rstrip("/"))
+
+    def lines():
+        yield _XML_HEADER
+        yield '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        for number in range(1, chunk_count() + 1):
+            lastmod = _chunk_lastmod(ensure_chunk(number, base_url))
+            entry = f"<sitemap><loc>{root}/sitemap-{number}.xml</loc>"
+            if lastmod:
+                entry += f"<lastmod>{lastmod}</lastmod>"
+            yield entry + "</sitemap>\n"
+        yield "</sitemapindex>\n"
+
+    _build(path, lines)
+    return path
+
+
+def invalidate(post_id: int) -> None:
+    """删除文章所在分块与索引的缓存，下次请求时重新生成。
+
+    先改写失效标记再删除文件，正在进行的生成据此发现失效并重新生成。
+    """
+    for path in (chunk_path(chunk_for(post_id)), index_path()):
+        _write_atomic(path + ".gen", [uuid.uuid4().hex])
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+@jobs.handler("sitemap.invalidate")
+def invalidate_job(post_id: int) -> None:
+    """后台任务：文章发布或删除后使对应分块失效。"""
+    invalidate(post_id)
+
+
+def _base_url() -> str:
+    """站点根 URL；未配置时返回 404，不从请求的 Host 头推断。"""
+    base_url = current_app.config["SITEMAP_BASE_URL"]
+    if not base_url:
+        abort(404)
+    return base_url
+
+
+def _send(path: str):
+    return send_file(path, mimetype="application/xml", max_age=current_app.config["SITEMAP_MAX_AGE"])
+
+
+def sitemap_index():
+    return _send(ensure_index(_base_url()))
+
+
+def sitemap_chunk(number: int):
+    base_url = _base_url()
+    if number < 1 or number > chunk_count():
+        abort(404)
+    return _send(ensure_chunk(number, base_url))
+
+
+sitemap_cli = AppGroup("sitemap", help="站点地图相关命令。")
+
+
+@sitemap_cli.command("build")
+@click.option("--base-url", help="站点根 URL，默认取 SITEMAP_BASE_URL。")
+def build_command(base_url):
+    """清空缓存并重新生成全部 sitemap 文件。"""
+    base_url = base_url or current_app.config["SITEMAP_BASE_URL"]
+    if not base_url:
+        raise click.ClickException("请通过 --base-url 或 SITEMAP_BASE_URL 指定站点根 URL。")
+    cache_dir = _cache_dir()
+    if os.path.isdir(cache_dir):
+        for name in os.listdir(cache_dir):
+            if name.startswith("sitemap"):
+                os.unlink(os.path.join(cache_dir, name))
+    with current_app.test_request_context(base_url=base_url):
+        ensure_index(base_url)
+    print(f"Built sitemap index with {chunk_count()} chunks in {cache_dir}.")
+
+
+def init_app(app) -> None:
+    """设置默认配置，注册 sitemap 路由与命令。"""
+    app.config.setdefault("SITEMAP_DIR", os.path.join(app.instance_path, "sitemap"))
+    # 每个分块覆盖的文章 ID 区间长度（sitemap 协议上限为 5 万条 URL）
+    app.config.setdefault("SITEMAP_CHUNK_SIZE", 50000)
+    # 站点根 URL（如 https://example.com）；为空时 sitemap 返回 404
+    app.config.setdefault("SITEMAP_BASE_URL", None)
+    app.config.setdefault("SITEMAP_MAX_AGE", 3600)
+    app.add_url_rule("/sitemap.xml", "sitemap_index", sitemap_index)
+    app.add_url_rule("/sitemap-<int:number>.xml", "sitemap_chunk", sitemap_chunk)
+    app.cli.add_command(sitemap_cli)
@@ -0,0 +1,125 @@
+"""冷启动优化：Jinja 字节码缓存、模板预编译与启动耗时报告。
+
+新 worker 第一次渲染 base.html / index.html 等模板时需要完整编译，
+部署或 worker 回收后的首批请求因此明显变慢。本模块提供：
+
+- 位于 instance/ 下的 Jinja 文件系统字节码缓存（跨进程、跨重启复用）
+- ``flask templates compile`` 命令：部署时预先生成全部模板的字节码
+- 启动耗时统计：按 import / factory / first_request / warmup 各阶段记录，
+  首个请求结束后写入日志，也可通过 ``flask startup-report`` 查看
+"""
+
+import os
+import shutil
+import time
+
+import click
+from flask import current_app, request
+from flask.cli import AppGroup, with_appcontext
+from jinja2 import FileSystemBytecodeCache
+
+
+class StartupTimer:
+    """记录应用冷启动各阶段耗时（单位：秒）。"""
+
+    PHASES = ("import", "factory", "first_request", "warmup")
+
+    def __init__(self, import_seconds: float = 0.0):
+        self.timings = dict.fromkeys(self.PHASES, 0.0)
+        self.timings["import"] = import_seconds
+        self._first_request_started = None
+        self.first_request_done = False
+
+    def add(self, phase: str, seconds: float) -> None:
+        """累加某一阶段的耗时。"""
+        self.timings[phase] += seconds
+
+    def report(self) -> str:
+        """返回形如 ``import=12.3ms factory=4.5ms first_request=30.1ms`` 的摘要。"""
+        return " ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.timings.items())
+
+
+def init_app(app, timer: StartupTimer) -> None:
+    """为应用启用字节码缓存、注册首请求计时钩子与 CLI 命令。
+
+    需要在应用工厂中尽早调用，以便后续所有模板加载都经过字节码缓存。
+    """
+    app.config.setdefault("JINJA_BYTECODE_CACHE", True)
+    app.config.setdefault(
+        "JINJA_BYTECODE_CACHE_DIR", os.path.join(app.instance_path, "jinja_cache")
+    )
+    app.extensions["startup_timer"] = timer
+
+    if app.config["JINJA_BYTECODE_CACHE"]:
+        cache_dir = app.config["JINJA_BYTECODE_CACHE_DIR"]
+        os.makedirs(cache_dir, exist_ok=True)
+        # Environment 创建后仍可替换 bytecode_cache，loader 每次加载模板时读取该属性
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+    # warmup 导入了本模块，这里延迟导入
+    from warmup import is_warmup_request
+
+    # 预热请求由 worker 自身发起，不算作首个真实请求
+    @app.before_request
+    def _start_first_request_timer():
+        if timer._first_request_started is None and not is_warmup_request(request.environ):
+            timer._first_request_started = time.perf_counter()
+
+    @app.teardown_request
+    def _finish_first_request_timer(exc=None):
+        if timer.first_request_done or timer._first_request_started is None:
+            return
+        if is_warmup_request(request.environ):
+            return
+        timer.first_request_done = True
+        timer.add("first_request", time.perf_counter() - timer._first_request_started)
+        app.logger.info("startup timing: %s", timer.report())
+
+    app.cli.add_command(templates_cli)
+    app.cli.add_command(startup_report_command)
+
+
+def compile_templates(app) -> int:
+    """加载（并因此编译）应用可见的全部模板，返回模板数量。
+
+    启用字节码缓存时，编译结果会写入缓存目录，供之后启动的 worker 直接复用。
+    """
+    names = app.jinja_env.list_templates(extensions=["html"])
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+templates_cli = AppGroup("templates", help="模板字节码缓存相关命令。")
+
+
+@templates_cli.command("compile")
+@click.option("--clear", is_flag=True, help="编译前清空已有字节码缓存。")
+def compile_templates_command(clear):
+    """预编译全部模板并写入字节码缓存（建议在部署时执行）。"""
+    app = current_app._get_current_object()
+    if not app.config["JINJA_BYTECODE_CACHE"]:
+        raise click.ClickException("JINJA_BYTECODE_CACHE 未启用，预编译结果无法持久化。")
+
+    cache_dir = app.config["JINJA_BYTECODE_CACHE_DIR"]
+    if clear:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    count = compile_templates(app)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"Compiled {count} templates into {cache_dir} in {elapsed:.1f}ms.")
+
+
+@click.command("startup-report")
+@click.option("--path", default="/", show_default=True, help="用于测量首个请求的路径。")
+@with_appcontext
+def startup_report_command(path):
+    """在当前进程内发起首个请求，并打印各启动阶段耗时。"""
+    app = current_app._get_current_object()
+    timer = app.extensions["startup_timer"]
+    if not timer.first_request_done:
+        app.test_client().get(path)
+    cache = "on" if app.config["JINJA_BYTECODE_CACHE"] else "off"
+    print(f"startup timing: {timer.report()} (bytecode cache: {cache})")
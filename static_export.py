@@ -0,0 +1,286 @@
+"""静态站点导出：把读端页面渲染为纯 HTML 文件，支持增量重建。
+
+``flask static-export OUTDIR`` 会渲染首页、每篇文章的详情页以及作者主页、标签页的首页，
+按 URL 路径写成 ``<path>/index.html``，可直接由 Web 服务器托管以应对流量高峰。
+
+OUTDIR 下的 ``manifest.json`` 记录每篇文章的内容指纹与每个输出文件的 HTML 哈希。
+指纹覆盖详情页上展示的全部源数据，包括相关文章列表（其 ID 与标题）以及正文引用的
+附件的缩略图与尺寸。
+再次导出时只重新渲染指纹变化（新增/编辑）的文章，删除已不存在文章的页面，
+并重新渲染受影响的列表页（首页与相关作者主页、标签页）；HTML 未变的文件不会被重写。
+热门文章、标签云与归档侧栏只出现在首页，首页每次导出都会重新渲染。
+
+页面通过与当前应用配置相同的独立应用实例的测试客户端渲染，输出与线上一致（以匿名
+用户视角，且不计入阅读数）；``--jobs`` 大于 1 时在进程池中并行渲染。
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import unquote
+
+import click
+from flask import current_app, url_for
+from flask.cli import with_appcontext
+
+from extensions import db
+from media import referenced_hashes
+from models import Attachment, Post, RelatedPost
+
+MANIFEST_NAME = "manifest.json"
+
+# 渲染进程内的测试客户端，由 _init_renderer 创建
+_client = None
+
+
+def _init_renderer(config) -> None:
+    """在渲染进程中创建独立的应用实例。"""
+    global _client
+    from app import create_app
+
+    _client = create_app(config).test_client()
+
+
+def _render(path: str):
+    """渲染单个页面，返回 (path, html)；页面不存在时 html 为 None。"""
+    resp = _client.get(path)
+    if resp.status_code != 200:
+        return path, None
+    return path, resp.get_data()
+
+
+def output_file(outdir: str, path: str) -> str:
+    """把 URL 路径映射为导出目录中的文件路径，例如 ``/blog/post/1`` -> ``blog/post/1/index.html``。
+
+    路径按 Web 服务器的方式解码；含空段、``.``、``..`` 或解码后落在 outdir 之外时抛出 ValueError。
+    """
+    decoded = unquote(path).strip("/")
+    segments = decoded.split("/") if decoded else []
+    if any(segment in ("", ".", "..") or "\0" in segment for segment in segments):
+        raise ValueError(f"unsafe export path: {path}")
+    root = os.path.abspath(outdir)
+    target = os.path.normpath(os.path.join(root, *segments, "index.html"))
+    if os.path.commonpath([root, target]) != root:
+        raise ValueError(f"unsafe export path: {path}")
+    return target
+
+
+def post_fingerprint(post, related=(), attachments=()) -> str:
+    """文章内容指纹，覆盖详情页上展示的全部源数据（阅读数除外；评论以评论数近似）。
+
+    Args:
+        post: 文章
+        related: 详情页展示的相关文章 ``[(related_id, title), ...]``（按展示顺序）
+        attachments: 正文引用的附件，其缩略图与尺寸决定 ``<img>`` 的 srcset、width 与 height
+    """
+    author = post.author.username if post.author else ""
+    tags = ",".join(tag.name for tag in post.tags)
+    related_source = "\n".join(f"{related_id}:{title}" for related_id, title in related)
+    attachment_source = "\n".join(
+        f"{attachment.sha256}:{attachment.variants}:{attachment.width}x{attachment.height}"
+        for attachment in sorted(attachments, key=lambda attachment: attachment.sha256)
+    )
+    source = "\0".join(
+        [
+            post.title, post.body, post.timestamp.isoformat() if post.timestamp else "", author, tags,
+            str(post.comment_count), related_source, attachment_source,
+        ]
+    )
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def _attachments_by_hash(hashes) -> dict:
+    """按 sha256 批量取出附件 ``{sha256: Attachment}``。"""
+    hashes = sorted(hashes)
+    attachments = {}
+    # 分批查询，避免 IN 列表超过 SQLite 的参数个数上限
+    for start in range(0, len(hashes), 500):
+        batch = hashes[start:start + 500]
+        for attachment in Attachment.query.filter(Attachment.sha256.in_(batch)):
+            attachments[attachment.sha256] = attachment
+    return attachments
+
+
+def _related_titles() -> dict:
+    """一次查询取出全部文章的相关文章 ``{post_id: [(related_id, title), ...]}``，顺序与详情页一致。"""
+    rows = db.session.execute(
+        db.select(RelatedPost.post_id, Post.id, Post.title)
+        .join(Post, RelatedPost.related_id == Post.id)
+        .order_by(RelatedPost.post_id, RelatedPost.score.desc())
+    )
+    related = {}
+    for post_id, related_id, title in rows:
+        related.setdefault(post_id, []).append((related_id, title))
+    return related
+
+
+def _feed_paths(entry: dict):
+    """文章所在的列表页：作者主页、各标签页与月份归档页（均只导出第一页）。需在请求上下文中调用。"""
+    if entry["author"]:
+        yield url_for("blog.user_profile", username=entry["author"])
+    for name in entry["tags"]:
+        yield url_for("blog.tag_posts", name=name)
+    # 旧清单没有 month 字段
+    if entry.get("month"):
+        year, month = entry["month"].split("/")
+        yield url_for("blog.archive_month", year=int(year), month=int(month))
+
+
+def _renderer_config(app) -> dict:
+    """渲染进程的配置：沿用当前应用的全部（可序列化的）配置，只关闭计数、任务与索引构建。"""
+    config = {}
+    for key, value in app.config.items():
+        try:
+            pickle.dumps(value)
+        except Exception:
+            continue
+        config[key] = value
+    config.update(
+        VIEW_TRACKING_ENABLED=False,
+        VIEW_COUNTER_FLUSH_INTERVAL=0,
+        JOBS_WORKERS=0,
+        SUGGEST_BUILD_ON_START=False,
+    )
+    return config
+
+
+def _load_manifest(outdir: str) -> dict:
+    path = os.path.join(outdir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"posts": {}, "files": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(outdir: str, manifest: dict) -> None:
+    path = os.path.join(outdir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def export_site(app, outdir: str, jobs: int = 1, full: bool = False) -> dict:
+    """导出静态站点，返回本次导出的统计信息。
+
+    Args:
+        app: 当前应用（用于读取数据库与生成渲染进程配置）
+        outdir: 导出目录
+        jobs: 渲染进程数，为 1 时在当前进程内渲染
+        full: 忽略清单，重新渲染全部页面
+    """
+    os.makedirs(outdir, exist_ok=True)
+    manifest = {"posts": {}, "files": {}} if full else _load_manifest(outdir)
+    old_posts = manifest["posts"]
+
+    # 计算文章指纹，找出新增/修改/删除的文章；清单同时记录作者与标签，
+    # 以便定位文章变化前后所在的列表页
+    current_posts = {}
+    changed_ids = []
+    affected_feeds = set()
+    posts = Post.query.options(
+        db.undefer(Post._body),
+        db.selectinload(Post.compressed_body),
+        db.selectinload(Post.tags),
+        db.joinedload(Post.author),
+    ).order_by(Post.id).all()
+    related = _related_titles()
+    references = {post.id: referenced_hashes(post.body) for post in posts}
+    attachments = _attachments_by_hash(set().union(*references.values()))
+    for post in posts:
+        key = str(post.id)
+        post_attachments = [attachments[sha256] for sha256 in references[post.id] if sha256 in attachments]
+        entry = {
+            "hash": post_fingerprint(post, related.get(post.id, ()), post_attachments),
+            "author": post.author.username if post.author else None,
+            "tags": [tag.name for tag in post.tags],
+            "month": f"{post.timestamp.year}/{post.timestamp.month}" if post.timestamp else None,
+        }
+        current_posts[key] = entry
+        old_entry = old_posts.get(key)
+        if old_entry is None or old_entry["hash"] != entry["hash"]:
+            changed_ids.append(post.id)
+            with app.test_request_context():
+                affected_feeds.update(_feed_paths(entry))
+                if old_entry is not None:
+                    affected_feeds.update(_feed_paths(old_entry))
+    removed_ids = [key for key in old_posts if key not in current_posts]
+    with app.test_request_context():
+        for key in removed_ids:
+            affected_feeds.update(_feed_paths(old_posts[key]))
+        post_paths = [url_for("blog.post_detail", post_id=post_id) for post_id in changed_ids]
+
+    targets = {}
+    for path in ["/", *post_paths, *sorted(affected_feeds)]:
+        try:
+            targets[path] = output_file(outdir, path)
+        except ValueError:
+            # 用户名、标签名含 ``..`` 等无法安全映射为文件的页面不导出
+            app.logger.warning("skipping unsafe export path %s", path)
+    paths = list(targets)
+
+    started = time.perf_counter()
+    config = _renderer_config(app)
+    if jobs > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_renderer, initargs=(config,)) as pool:
+            results = list(pool.map(_render, paths, chunksize=max(1, len(paths) // (jobs * 4))))
+    else:
+        _init_renderer(config)
+        results = [_render(path) for path in paths]
+
+    written = 0
+    for path, html in results:
+        target = targets[path]
+        if html is None:
+            # 作者或标签已被删除等情况，移除过期页面
+            if os.path.exists(target):
+                os.unlink(target)
+            manifest["files"].pop(path, None)
+            continue
+        digest = hashlib.sha256(html).hexdigest()
+        if manifest["files"].get(path) == digest and os.path.exists(target):
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(html)
+        manifest["files"][path] = digest
+        written += 1
+
+    for key in removed_ids:
+        path = f"/blog/post/{int(key)}"
+        target = output_file(outdir, path)
+        if os.path.exists(target):
+            os.unlink(target)
+        manifest["files"].pop(path, None)
+
+    manifest["posts"] = current_posts
+    _save_manifest(outdir, manifest)
+    return {
+        "rendered": len(paths),
+        "written": written,
+        "changed": len(changed_ids),
+        "removed": len(removed_ids),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+@click.command("static-export")
+@click.argument("outdir", type=click.Path(file_okay=False))
+@click.option("--jobs", "-j", default=os.cpu_count() or 1, show_default=True, help="并行渲染的进程数。")
+@click.option("--full", is_flag=True, help="忽略清单，重新渲染全部页面。")
+@with_appcontext
+def static_export_command(outdir, jobs, full):
+    """把首页、文章详情页、作者主页和标签页导出为静态 HTML。"""
+    stats = export_site(current_app._get_current_object(), outdir, jobs=jobs, full=full)
+    print(
+        f"Rendered {stats['rendered']} pages ({stats['changed']} posts changed, "
+        f"{stats['removed']} removed), wrote {stats['written']} files in {stats['seconds']:.2f}s."
+    )
+
+
+def init_app(app) -> None:
+    """注册静态导出命令。"""
+    app.cli.add_command(static_export_command)
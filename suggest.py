@@ -0,0 +1,276 @@
+"""标题自动补全：进程内的有序数组前缀索引。
+
+规范化后的标题（NFKC、大小写折叠、合并空白）保存在有序列表中，前缀查询用
+``bisect`` 定位第一个不小于前缀的位置，再向后取至多 limit 个以该前缀开头的项，
+代价为 O(log n + limit)，与标题总数基本无关。文章 ID 存于并行的 ``array``，
+显示用标题仅在与规范化结果不同时另存一份，以控制内存占用。
+
+- 应用创建时从 post 表全量构建（``SUGGEST_BUILD_ON_START``），查询时若尚未构建则补建
+- 本进程内的发布、编辑、删除直接更新索引；其他 worker 的写入由定期重建
+  （``SUGGEST_REBUILD_INTERVAL`` 秒，在后台线程中构建后整体替换）同步；重建期间
+  本进程的写入记入日志，替换时重放到新索引上，不会丢失
+- ``flask suggest stats`` 报告条目数与内存占用，``flask suggest bench`` 以
+  合成标题（默认 100 万条）测量构建耗时、内存与查询延迟
+"""
+
+import random
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from extensions import db
+
+
+def normalize(text: str) -> str:
+    """规范化标题或查询：NFKC、大小写折叠，并把连续空白合并为一个空格。"""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+class TitleIndex:
+    """标题前缀索引（线程安全）。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []
+        self._ids = array("q")
+        # 显示用标题；与规范化结果相同时为 None
+        self._titles = []
+        # 重建期间记录的增删操作，替换时重放到新索引上；未在重建时为 None
+        self._journal = None
+        self.built_at = None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def begin_rebuild(self) -> None:
+        """开始记录增删操作；须在读取数据库之前调用，之后由 load 重放。"""
+        with self._lock:
+            self._journal = []
+
+    def abort_rebuild(self) -> None:
+        """重建失败时停止记录。"""
+        with self._lock:
+            self._journal = None
+
+    def load(self, rows) -> None:
+        """由 (post_id, title) 序列整体重建并替换索引。
+
+        begin_rebuild 之后的增删可能未包含在 rows 中，替换后按顺序重放；
+        重放是幂等的，已包含的写入不会重复生效。
+        """
+        entries = sorted((normalize(title), post_id, title) for post_id, title in rows)
+        keys = [key for key, _, _ in entries]
+        ids = array("q", (post_id for _, post_id, _ in entries))
+        titles = [None if title == key else title for key, _, title in entries]
+        with self._lock:
+            self._keys, self._ids, self._titles = keys, ids, titles
+            for operation, post_id, title in self._journal or ():
+                if operation == "add":
+                    self._add(post_id, title)
+                else:
+                    self._remove(post_id, title)
+            self._journal = None
+            self.built_at = time.monotonic()
+
+    def _locate(self, key: str, post_id: int) -> int:
+        position = bisect_left(self._keys, key)
+        while position < len(self._keys) and self._keys[position] == key:
+            if self._ids[position] == post_id:
+                return position
+            position += 1
+        return -1
+
+    def _add(self, post_id: int, title: str) -> None:
+        key = normalize(title)
+        # 同一规范化标题下按 ID 排序，与 load 的顺序一致
+        position = bisect_left(self._keys, key)
+        while position < len(self._keys) and self._keys[position] == key and self._ids[position] < post_id:
+            position += 1
+        if position < len(self._keys) and self._keys[position] == key and self._ids[position] == post_id:
+            return
+        self._keys.insert(position, key)
+        self._ids.insert(position, post_id)
+        self._titles.insert(position, None if title == key else title)
+
+    def _remove(self, post_id: int, title: str) -> None:
+        position = self._locate(normalize(title), post_id)
+        if position >= 0:
+            del self._keys[position]
+            del self._ids[position]
+            del self._titles[position]
+
+    def add(self, post_id: int, title: str) -> None:
+        with self._lock:
+            self._add(post_id, title)
+            if self._journal is not None:
+                self._journal.append(("add", post_id, title))
+
+    def remove(self, post_id: int, title: str) -> None:
+        with self._lock:
+            self._remove(post_id, title)
+            if self._journal is not None:
+                self._journal.append(("remove", post_id, title))
+
+    def update(self, post_id: int, old_title: str, new_title: str) -> None:
+        if old_title != new_title:
+            self.remove(post_id, old_title)
+            self.add(post_id, new_title)
+
+    def search(self, query: str, limit: int = 10) -> list:
+        """返回规范化标题以 query 开头的前 limit 项 ``[(post_id, title), ...]``（按标题排序）。"""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        results = []
+        with self._lock:
+            keys = self._keys
+            position = bisect_left(keys, prefix)
+            end = min(len(keys), position + limit)
+            while position < end and keys[position].startswith(prefix):
+                results.append((self._ids[position], self._titles[position] or keys[position]))
+                position += 1
+        return results
+
+    def memory_bytes(self) -> int:
+        """估算索引占用的内存（列表、数组与其中的字符串对象）。"""
+        with self._lock:
+            total = sys.getsizeof(self._keys) + sys.getsizeof(self._ids) + sys.getsizeof(self._titles)
+            total += sum(sys.getsizeof(key) for key in self._keys)
+            total += sum(sys.getsizeof(title) for title in self._titles if title is not None)
+        return total
+
+
+def build_index(index: TitleIndex) -> int:
+    """从 post 表全量构建索引，返回条目数。需在应用上下文中调用。"""
+    from models import Post
+
+    index.begin_rebuild()
+    try:
+        rows = db.session.execute(db.select(Post.id, Post.title).execution_options(yield_per=10000))
+        index.load(rows)
+    except Exception:
+        index.abort_rebuild()
+        raise
+    return len(index)
+
+
+class SuggestService:
+    """单个应用实例的标题索引及其定期重建。"""
+
+    def __init__(self, app):
+        self.app = app
+        self.index = TitleIndex()
+        self._rebuilding = threading.Lock()
+
+    def build(self) -> int:
+        with self.app.app_context():
+            return build_index(self.index)
+
+    def search(self, query: str, limit: int) -> list:
+        if self.index.built_at is None:
+            # 启动时未能构建（如数据库尚未初始化），首次查询时同步构建
+            with self._rebuilding:
+                if self.index.built_at is None:
+                    build_index(self.index)
+        elif time.monotonic() - self.index.built_at > self.app.config["SUGGEST_REBUILD_INTERVAL"]:
+            self._rebuild_in_background()
+        return self.index.search(query, limit)
+
+    def _rebuild_in_background(self) -> None:
+        if not self._rebuilding.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self.build()
+            except Exception:
+                self.app.logger.exception("title index rebuild failed")
+            finally:
+                self._rebuilding.release()
+
+        threading.Thread(target=run, name="suggest-rebuild", daemon=True).start()
+
+
+suggest_cli = AppGroup("suggest", help="标题自动补全索引相关命令。")
+
+
+def _format_bytes(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f} MiB"
+
+
+@suggest_cli.command("stats")
+def stats_command():
+    """从数据库构建索引并报告条目数与内存占用。"""
+    index = TitleIndex()
+    started = time.perf_counter()
+    count = build_index(index)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"Indexed {count} titles in {elapsed:.1f}ms, memory {_format_bytes(index.memory_bytes())}.")
+
+
+@suggest_cli.command("bench")
+@click.option("--titles", "count", default=1_000_000, show_default=True, help="合成标题数。")
+@click.option("--queries", default=10_000, show_default=True, help="查询次数。")
+@click.option("--seed", default=0, show_default=True, help="随机种子。")
+def bench_command(count, queries, seed):
+    """用合成标题测量索引的构建耗时、内存占用与前缀查询延迟。"""
+    rng = random.Random(seed)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9))) for _ in range(5000)]
+    titles = [" ".join(rng.choice(words) for _ in range(rng.randint(2, 8))).title() for _ in range(count)]
+
+    index = TitleIndex()
+    started = time.perf_counter()
+    index.load(enumerate(titles, 1))
+    build_seconds = time.perf_counter() - started
+
+    # 查询取真实标题的 1~6 个字符前缀
+    prefixes = [rng.choice(titles)[: rng.randint(1, 6)] for _ in range(queries)]
+    latencies = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        index.search(prefix, 10)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+
+    def micros(q: float) -> float:
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1e6
+
+    print(f"titles={count} build={build_seconds:.2f}s memory={_format_bytes(index.memory_bytes())}")
+    print(f"queries={queries} p50={micros(0.5):.1f}us p99={micros(0.99):.1f}us max={latencies[-1] * 1e6:.1f}us")
+
+
+def init_app(app) -> None:
+    """设置默认配置、创建索引服务并注册命令；启动时构建由 create_app 调用 build_on_start。"""
+    app.config.setdefault("SUGGEST_BUILD_ON_START", True)
+    # 定期从数据库重建的间隔（秒），用于同步其他 worker 的写入
+    app.config.setdefault("SUGGEST_REBUILD_INTERVAL", 300)
+    app.config.setdefault("SUGGEST_LIMIT", 10)
+    app.extensions["suggest"] = SuggestService(app)
+    app.cli.add_command(suggest_cli)
+
+
+def build_on_start(app) -> None:
+    """SUGGEST_BUILD_ON_START 开启时构建索引；数据库不可用时推迟到首次查询。"""
+    if not app.config["SUGGEST_BUILD_ON_START"]:
+        return
+    try:
+        app.extensions["suggest"].build()
+    except Exception as exc:
+        app.logger.warning("title index not built at startup: %s", exc)
+
+
+def get_title_index() -> TitleIndex:
+    """返回当前应用的标题索引。"""
+    return current_app.extensions["suggest"].index
+
+
+def get_suggest_service() -> SuggestService:
+    """返回当前应用的标题索引服务。"""
+    return current_app.extensions["suggest"]
@@ -5,6 +5,7 @@ pytest 测试配置文件
 """
 
 import os
+import shutil
 import tempfile
 
 import pytest
@@ -26,7 +27,17 @@ def app():
     from app import create_app
     
     # 创建应用，并立即覆盖数据库配置
-    app = create_app()
+    # 阅读计数不启动后台写回线程、不启动后台任务线程，由测试显式 flush / drain；
+    # 附件、sitemap 缓存与模板字节码缓存写入临时目录，不触碰 instance/
+    files_dir = tempfile.mkdtemp()
+    app = create_app({
+        "TESTING": True,
+        "VIEW_COUNTER_FLUSH_INTERVAL": 0,
+        "JOBS_WORKERS": 0,
+        "MEDIA_DIR": os.path.join(files_dir, "media"),
+        "SITEMAP_DIR": os.path.join(files_dir, "sitemap"),
+        "JINJA_BYTECODE_CACHE_DIR": os.path.join(files_dir, "jinja_cache"),
+    })
     
     # 强制覆盖数据库 URI（确保使用临时数据库）
     app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
@@ -44,11 +55,14 @@ def app():
 
     yield app
 
-    # 清理：关闭并删除临时数据库
+    # 清理：写回剩余阅读计数，关闭并删除临时数据库
+    app.extensions["view_counter"].shutdown()
+    app.extensions["jobs"].shutdown()
     with app.app_context():
         db.engine.dispose()
     os.close(db_fd)
     os.unlink(db_path)
+    shutil.rmtree(files_dir, ignore_errors=True)
     
     # 清理环境变量
     if 'DATABASE_URL' in os.environ:
@@ -0,0 +1,132 @@
+"""
+月份归档测试模块
+
+覆盖：
+- 发布、删除文章时维护每月文章数，首页归档侧栏展示月份与数量
+- 月份页只列出该月文章并键集分页，空月份与非法月份返回 404
+- flask archive recount 按 post 表重新统计
+"""
+
+import re
+from datetime import datetime
+
+from models import User, Post, MonthlyPostCount
+from extensions import db
+
+
+def _extract_csrf_token(html: str) -> str:
+    """从 HTML 中提取 CSRF token"""
+    m = re.search(r'name="csrf_token".*?value="([^"]+)"', html, re.S)
+    assert m, "CSRF token not found in form"
+    return m.group(1)
+
+
+def _login(client, username, password="123456"):
+    r = client.get("/auth/login")
+    token = _extract_csrf_token(r.get_data(as_text=True))
+    client.post(
+        "/auth/login",
+        data={"csrf_token": token, "username": username, "password": password},
+        follow_redirects=False,
+    )
+
+
+def _create_user(app, username="archive_author"):
+    with app.app_context():
+        user = User(username=username, email=f"{username}@test.com")
+        user.set_password("123456")
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def _add_posts(app, user_id, stamps):
+    with app.app_context():
+        posts = [Post(title=f"Archived {stamp:%Y-%m-%d}", body="body", user_id=user_id, timestamp=stamp) for stamp in stamps]
+        db.session.add_all(posts)
+        for stamp in stamps:
+            MonthlyPostCount.adjust(stamp, 1)
+        db.session.commit()
+        return [post.id for post in posts]
+
+
+def test_create_and_delete_maintain_monthly_counts(client, app):
+    """发布与删除文章在同一事务内调整当月文章数"""
+    _create_user(app)
+    _login(client, "archive_author")
+    for title in ("First", "Second"):
+        token = _extract_csrf_token(client.get("/blog/create").get_data(as_text=True))
+        client.post("/blog/create", data={"csrf_token": token, "title": title, "body": "body"})
+
+    now = datetime.now()
+    with app.app_context():
+        assert db.session.get(MonthlyPostCount, (now.year, now.month)).post_count == 2
+        post_id = Post.query.filter_by(title="First").one().id
+
+    html = client.get("/").get_data(as_text=True)
+    assert "文章归档" in html
+    assert f"{now.year} 年 {now.month} 月 <span class=\"text-muted\">(2)</span>" in html
+
+    token = _extract_csrf_token(client.get(f"/blog/post/{post_id}").get_data(as_text=True))
+    client.post(f"/blog/post/{post_id}/delete", data={"csrf_token": token})
+    with app.app_context():
+        assert db.session.get(MonthlyPostCount, (now.year, now.month)).post_count == 1
+
+
+def test_month_page_lists_only_that_month(client, app):
+    """月份页按时间倒序分页，只包含该月文章"""
+    app.config["POSTS_PER_PAGE"] = 2
+    user_id = _create_user(app)
+    _add_posts(app, user_id, [
+        datetime(2024, 2, 29, 23, 59),
+        datetime(2024, 3, 1, 0, 0),
+        datetime(2024, 3, 15, 12, 0),
+        datetime(2024, 3, 31, 23, 59, 59),
+        datetime(2024, 4, 1, 0, 0),
+    ])
+
+    html = client.get("/blog/archive/2024/3").get_data(as_text=True)
+    assert "共 3 篇文章" in html
+    assert "Archived 2024-03-31" in html and "Archived 2024-03-15" in html
+    assert "Archived 2024-03-01" not in html
+    assert "Archived 2024-02-29" not in html and "Archived 2024-04-01" not in html
+
+    m = re.search(r'href="([^"]*before=[^"]+)"', html)
+    assert m, "next page link not found"
+    html = client.get(m.group(1).replace("&amp;", "&")).get_data(as_text=True)
+    assert "Archived 2024-03-01" in html
+    assert "Archived 2024-03-15" not in html
+    assert "before=" not in html
+
+    index = client.get("/").get_data(as_text=True)
+    months = re.findall(r"/blog/archive/(\d+)/(\d+)", index)
+    assert months == [("2024", "4"), ("2024", "3"), ("2024", "2")]
+
+
+def test_empty_or_invalid_month_returns_404(client, app):
+    """没有文章的月份与非法月份返回 404"""
+    user_id = _create_user(app)
+    _add_posts(app, user_id, [datetime(2024, 12, 31, 23, 0)])
+    assert client.get("/blog/archive/2024/12").status_code == 200
+    assert client.get("/blog/archive/2024/11").status_code == 404
+    assert client.get("/blog/archive/2024/13").status_code == 404
+    assert client.get("/blog/archive/0/1").status_code == 404
+
+
+def test_recount_command(app):
+    """recount 按 post 表重建汇总"""
+    user_id = _create_user(app)
+    with app.app_context():
+        db.session.add_all([
+            Post(title="a", body="b", user_id=user_id, timestamp=datetime(2023, 1, 5)),
+            Post(title="c", body="d", user_id=user_id, timestamp=datetime(2023, 1, 20)),
+            Post(title="e", body="f", user_id=user_id, timestamp=datetime(2023, 7, 1)),
+        ])
+        db.session.add(MonthlyPostCount(year=2022, month=5, post_count=9))
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=["archive", "recount"])
+    assert "Recounted posts for 2 months." in result.output
+    with app.app_context():
+        rows = MonthlyPostCount.query.order_by(MonthlyPostCount.year, MonthlyPostCount.month).all()
+        assert [(r.year, r.month, r.post_count) for r in rows] == [(2023, 1, 2), (2023, 7, 1)]
@@ -0,0 +1,153 @@
+"""
+正文压缩存储测试模块
+
+覆盖：
+- 超过阈值的正文压缩存入 post_body 表，短正文内联存放
+- 详情页解压展示完整正文，列表页只使用摘要
+- flask compress-bodies 迁移已有内联长正文
+- 从初始版本的数据库结构升级（flask upgrade-db）后可直接迁移
+"""
+
+from datetime import datetime
+
+from models import User, Post, PostBody, MonthlyPostCount, EXCERPT_LENGTH
+from extensions import db
+
+LONG_BODY = "长文章内容 long article body. " * 400
+
+
+def _create_user(app):
+    with app.app_context():
+        user = User(username="writer", email="writer@test.com")
+        user.set_password("123456")
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def test_long_body_stored_compressed(client, app):
+    """长正文压缩存储，详情页完整展示，列表页展示摘要"""
+    user_id = _create_user(app)
+    with app.app_context():
+        post = Post(title="Long", body=LONG_BODY, user_id=user_id)
+        short = Post(title="Short", body="short body", user_id=user_id)
+        db.session.add_all([post, short])
+        db.session.commit()
+        post_id = post.id
+
+        assert post.body_compressed
+        assert post.excerpt == LONG_BODY[:EXCERPT_LENGTH]
+        stored = db.session.get(PostBody, post_id)
+        assert len(stored.data) < len(LONG_BODY.encode("utf-8"))
+        assert not short.body_compressed
+        assert db.session.get(PostBody, short.id) is None
+
+    html = client.get(f"/blog/post/{post_id}").get_data(as_text=True)
+    assert LONG_BODY.strip() in html
+
+    html = client.get("/").get_data(as_text=True)
+    assert LONG_BODY[:EXCERPT_LENGTH].strip() in html
+    assert LONG_BODY.strip() not in html
+
+
+def test_shrinking_body_moves_back_inline(app):
+    """正文缩短到阈值以下后改回内联存放并删除压缩行"""
+    user_id = _create_user(app)
+    with app.app_context():
+        post = Post(title="Shrink", body=LONG_BODY, user_id=user_id)
+        db.session.add(post)
+        db.session.commit()
+        post_id = post.id
+
+    with app.app_context():
+        post = db.session.get(Post, post_id)
+        post.body = "now short"
+        db.session.commit()
+
+    with app.app_context():
+        post = db.session.get(Post, post_id)
+        assert not post.body_compressed
+        assert post.body == "now short"
+        assert db.session.get(PostBody, post_id) is None
+
+
+def test_compress_bodies_migrates_inline_rows(app):
+    """迁移命令压缩已有的内联长正文并报告节省空间"""
+    user_id = _create_user(app)
+    with app.app_context():
+        db.session.execute(
+            db.text("INSERT INTO post (title, body, user_id) VALUES ('Legacy', :body, :uid)"),
+            {"body": LONG_BODY, "uid": user_id},
+        )
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=["compress-bodies"])
+    assert result.exit_code == 0, result.output
+    assert "Compressed 1 post bodies" in result.output
+    assert "saved" in result.output
+
+    with app.app_context():
+        post = Post.query.filter_by(title="Legacy").first()
+        assert post.body_compressed
+        assert post.body == LONG_BODY
+        assert post.excerpt == LONG_BODY[:EXCERPT_LENGTH]
+
+
+# 初始版本（引入反规范化计数、压缩正文等之前）的数据库结构
+BASELINE_SCHEMA = [
+    """CREATE TABLE user (
+        id INTEGER NOT NULL, username VARCHAR(64) NOT NULL, email VARCHAR(120) NOT NULL,
+        password_hash VARCHAR(128) NOT NULL, PRIMARY KEY (id))""",
+    "CREATE UNIQUE INDEX ix_user_username ON user (username)",
+    "CREATE UNIQUE INDEX ix_user_email ON user (email)",
+    """CREATE TABLE post (
+        id INTEGER NOT NULL, title VARCHAR(200) NOT NULL, body TEXT NOT NULL, timestamp DATETIME,
+        user_id INTEGER, PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES user (id))""",
+    "CREATE INDEX ix_post_timestamp ON post (timestamp)",
+]
+
+
+def test_upgrade_from_baseline_schema(client, app):
+    """初始版本的数据库经 upgrade-db 补齐表与列、重算计数后，compress-bodies 与页面均可用"""
+    with app.app_context():
+        db.drop_all()
+        for statement in BASELINE_SCHEMA:
+            db.session.execute(db.text(statement))
+        db.session.execute(db.text(
+            "INSERT INTO user (id, username, email, password_hash) VALUES (1, 'old', 'old@test.com', 'x')"
+        ))
+        db.session.execute(
+            db.text("INSERT INTO post (title, body, timestamp, user_id) VALUES (:title, :body, :ts, 1)"),
+            [
+                {"title": "Old long", "body": LONG_BODY, "ts": "2023-05-01 10:00:00.000000"},
+                {"title": "Old short", "body": "short", "ts": "2023-05-02 10:00:00.000000"},
+            ],
+        )
+        db.session.commit()
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["upgrade-db"])
+    assert result.exit_code == 0, result.output
+    assert "Added column post.view_count" in result.output
+    assert "Added column user.post_count" in result.output
+    assert "Created table comment" in result.output
+
+    result = runner.invoke(args=["compress-bodies"])
+    assert result.exit_code == 0, result.output
+    assert "Compressed 1 post bodies" in result.output
+
+    with app.app_context():
+        user = db.session.get(User, 1)
+        assert user.post_count == 2
+        assert db.session.get(MonthlyPostCount, (2023, 5)).post_count == 2
+        post = Post.query.filter_by(title="Old long").one()
+        assert (post.version, post.view_count, post.comment_count) == (1, 0, 0)
+        assert post.body == LONG_BODY
+        assert post.timestamp == datetime(2023, 5, 1, 10)
+
+    assert client.get("/").status_code == 200
+    assert client.get(f"/blog/post/{post.id}").status_code == 200
+    assert client.get("/blog/user/old").status_code == 200
+
+    # 再次执行不做任何变更
+    assert "(0 changes)" in runner.invoke(args=["upgrade-db"]).output
@@ -0,0 +1,140 @@
+"""
+评论测试模块
+
+覆盖：
+- 发表评论并维护文章评论数，首页展示评论数
+- 详情页评论按时间倒序键集分页
+- 删除评论的权限（评论作者或文章作者）与评论数回退
+- 删除文章时一并删除评论
+"""
+
+import re
+
+from models import User, Post, Comment
+from extensions import db
+
+
+def _extract_csrf_token(html: str) -> str:
+    """从 HTML 中提取 CSRF token"""
+    m = re.search(r'name="csrf_token".*?value="([^"]+)"', html, re.S)
+    assert m, "CSRF token not found in form"
+    return m.group(1)
+
+
+def _login(client, username, password="123456"):
+    r = client.get("/auth/login")
+    token = _extract_csrf_token(r.get_data(as_text=True))
+    client.post(
+        "/auth/login",
+        data={"csrf_token": token, "username": username, "password": password},
+        follow_redirects=False,
+    )
+
+
+def _logout(client):
+    client.get("/auth/logout")
+
+
+def _comment(client, post_id, body):
+    r = client.get(f"/blog/post/{post_id}")
+    token = _extract_csrf_token(r.get_data(as_text=True))
+    return client.post(f"/blog/post/{post_id}/comment", data={"csrf_token": token, "body": body})
+
+
+def _setup(app):
+    with app.app_context():
+        users = []
+        for name in ("comment_author", "commenter", "stranger"):
+            user = User(username=name, email=f"{name}@test.com")
+            user.set_password("123456")
+            db.session.add(user)
+            users.append(user)
+        db.session.flush()
+        post = Post(title="Commented", body="body", user_id=users[0].id)
+        db.session.add(post)
+        db.session.commit()
+        return post.id
+
+
+def test_comment_updates_count_and_paginates(client, app):
+    """评论数随评论增加，详情页分页展示评论"""
+    app.config["COMMENTS_PER_PAGE"] = 2
+    post_id = _setup(app)
+    _login(client, "commenter")
+    for i in range(3):
+        r = _comment(client, post_id, f"comment {i}")
+        assert r.status_code == 302
+        assert r.headers["Location"].endswith(f"/blog/post/{post_id}#comments")
+
+    with app.app_context():
+        assert db.session.get(Post, post_id).comment_count == 3
+
+    html = client.get("/").get_data(as_text=True)
+    assert "3 条评论" in html
+
+    html = client.get(f"/blog/post/{post_id}").get_data(as_text=True)
+    assert "评论（3）" in html
+    assert "comment 2" in html and "comment 1" in html
+    assert "comment 0" not in html
+    m = re.search(r'href="([^"]*comments_before=[^"]+)"', html)
+    assert m, "next page link not found"
+
+    html = client.get(m.group(1).replace("&amp;", "&")).get_data(as_text=True)
+    assert "comment 0" in html
+    assert "comment 2" not in html
+
+
+def test_empty_comment_rejected(client, app):
+    """空评论不会保存"""
+    post_id = _setup(app)
+    _login(client, "commenter")
+    r = _comment(client, post_id, "")
+    assert r.status_code == 302
+    with app.app_context():
+        assert Comment.query.count() == 0
+        assert db.session.get(Post, post_id).comment_count == 0
+
+
+def test_delete_comment_permissions(client, app):
+    """只有评论作者或文章作者可以删除评论"""
+    post_id = _setup(app)
+    _login(client, "commenter")
+    _comment(client, post_id, "first")
+    _comment(client, post_id, "second")
+    _logout(client)
+    with app.app_context():
+        first_id, second_id = [c.id for c in Comment.query.order_by(Comment.id)]
+
+    _login(client, "stranger")
+    token = _extract_csrf_token(client.get(f"/blog/post/{post_id}").get_data(as_text=True))
+    r = client.post(f"/blog/comment/{first_id}/delete", data={"csrf_token": token})
+    assert r.status_code == 403
+    _logout(client)
+
+    _login(client, "commenter")
+    token = _extract_csrf_token(client.get(f"/blog/post/{post_id}").get_data(as_text=True))
+    assert client.post(f"/blog/comment/{first_id}/delete", data={"csrf_token": token}).status_code == 302
+    _logout(client)
+
+    _login(client, "comment_author")
+    token = _extract_csrf_token(client.get(f"/blog/post/{post_id}").get_data(as_text=True))
+    assert client.post(f"/blog/comment/{second_id}/delete", data={"csrf_token": token}).status_code == 302
+
+    with app.app_context():
+        assert Comment.query.count() == 0
+        assert db.session.get(Post, post_id).comment_count == 0
+
+
+def test_delete_post_removes_comments(client, app):
+    """删除文章时一并删除其评论"""
+    post_id = _setup(app)
+    _login(client, "commenter")
+    _comment(client, post_id, "bye")
+    _logout(client)
+
+    _login(client, "comment_author")
+    token = _extract_csrf_token(client.get(f"/blog/post/{post_id}").get_data(as_text=True))
+    client.post(f"/blog/post/{post_id}/delete", data={"csrf_token": token})
+    with app.app_context():
+        assert db.session.get(Post, post_id) is None
+        assert Comment.query.count() == 0
@@ -0,0 +1,109 @@
+"""
+编辑乐观并发控制测试模块
+
+覆盖：
+- 两个标签页基于同一版本编辑，后提交者得到 409 冲突页并看到最新内容
+- 读取版本号后、提交前被其他写入抢先（UPDATE ... WHERE version = ? 未命中）
+"""
+
+import re
+
+from models import User, Post
+from extensions import db
+
+
+def _extract_csrf_token(html: str) -> str:
+    """从 HTML 中提取 CSRF token"""
+    m = re.search(r'name="csrf_token".*?value="([^"]+)"', html, re.S)
+    assert m, "CSRF token not found in form"
+    return m.group(1)
+
+
+def _extract_version(html: str) -> str:
+    m = re.search(r'name="version" type="hidden" value="(\d+)"', html)
+    assert m, "version field not found in form"
+    return m.group(1)
+
+
+def _setup(client, app):
+    with app.app_context():
+        user = User(username="occ", email="occ@test.com")
+        user.set_password("123456")
+        db.session.add(user)
+        db.session.commit()
+        post = Post(title="Original", body="Original body", user_id=user.id)
+        db.session.add(post)
+        db.session.commit()
+        post_id = post.id
+
+    r = client.get("/auth/login")
+    token = _extract_csrf_token(r.get_data(as_text=True))
+    client.post(
+        "/auth/login",
+        data={"csrf_token": token, "username": "occ", "password": "123456"},
+        follow_redirects=False,
+    )
+    return post_id
+
+
+def _submit(client, post_id, form_html, title, body):
+    return client.post(
+        f"/blog/post/{post_id}/edit",
+        data={
+            "csrf_token": _extract_csrf_token(form_html),
+            "version": _extract_version(form_html),
+            "title": title,
+            "body": body,
+        },
+        follow_redirects=False,
+    )
+
+
+def test_stale_form_gets_conflict(client, app):
+    """基于旧版本的提交返回 409 并展示最新内容，不覆盖数据"""
+    post_id = _setup(client, app)
+    tab_a = client.get(f"/blog/post/{post_id}/edit").get_data(as_text=True)
+    tab_b = client.get(f"/blog/post/{post_id}/edit").get_data(as_text=True)
+
+    assert _submit(client, post_id, tab_a, "From A", "Body A").status_code == 302
+
+    resp = _submit(client, post_id, tab_b, "From B", "Body B")
+    assert resp.status_code == 409
+    html = resp.get_data(as_text=True)
+    assert "Body A" in html  # 最新内容
+    assert "Body B" in html  # 保留用户提交的内容
+    with app.app_context():
+        post = db.session.get(Post, post_id)
+        assert (post.title, post.body, post.version) == ("From A", "Body A", 2)
+
+    # 确认后基于冲突页再次提交即可覆盖
+    assert _submit(client, post_id, html, "From B", "Body B").status_code == 302
+    with app.app_context():
+        post = db.session.get(Post, post_id)
+        assert (post.title, post.body, post.version) == ("From B", "Body B", 3)
+
+
+def test_concurrent_update_detected_at_commit(client, app, monkeypatch):
+    """版本检查通过后被并发写入抢先时，UPDATE 不命中并返回 409"""
+    post_id = _setup(client, app)
+    form_html = client.get(f"/blog/post/{post_id}/edit").get_data(as_text=True)
+
+    original = Post.set_tags
+
+    def racing_set_tags(post, names):
+        # 模拟另一个请求在本请求写入前完成了编辑
+        with db.engine.begin() as conn:
+            conn.execute(
+                db.text("UPDATE post SET title = 'Racer', version = version + 1 WHERE id = :id"),
+                {"id": post_id},
+            )
+        return original(post, names)
+
+    monkeypatch.setattr(Post, "set_tags", racing_set_tags)
+    resp = _submit(client, post_id, form_html, "Mine", "Mine body")
+    assert resp.status_code == 409
+    assert "Racer" in resp.get_data(as_text=True)
+
+    with app.app_context():
+        post = db.session.get(Post, post_id)
+        assert (post.title, post.version) == ("Racer", 2)
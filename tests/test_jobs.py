@@ -0,0 +1,139 @@
+"""
+后台任务队列测试模块
+
+覆盖：
+- 发布文章时任务与文章同事务入队，drain 后完成派生工作
+- 失败任务按指数退避重试，次数用尽后标记为 failed
+- flask jobs 命令
+- 工作线程只在处理第一个真实请求时启动，CLI 命令与预热请求不启动
+"""
+
+import json
+import os
+import re
+
+import jobs
+from models import User, Job, RelatedPost
+from extensions import db
+
+
+def _extract_csrf_token(html: str) -> str:
+    """从 HTML 中提取 CSRF token"""
+    m = re.search(r'name="csrf_token".*?value="([^"]+)"', html, re.S)
+    assert m, "CSRF token not found in form"
+    return m.group(1)
+
+
+def _login(client, username, password="123456"):
+    r = client.get("/auth/login")
+    token = _extract_csrf_token(r.get_data(as_text=True))
+    client.post(
+        "/auth/login",
+        data={"csrf_token": token, "username": username, "password": password},
+        follow_redirects=False,
+    )
+
+
+def _create_post(client, title, body):
+    r = client.get("/blog/create")
+    token = _extract_csrf_token(r.get_data(as_text=True))
+    client.post("/blog/create", data={"csrf_token": token, "title": title, "body": body})
+
+
+def test_post_write_enqueues_related_update(client, app):
+    """发布文章只入队任务，相关文章由任务执行后更新"""
+    with app.app_context():
+        user = User(username="job_author", email="job_author@test.com")
+        user.set_password("123456")
+        db.session.add(user)
+        db.session.commit()
+
+    _login(client, "job_author")
+    _create_post(client, "Sourdough bread", "flour water starter dough bread")
+    _create_post(client, "Rye bread", "rye flour starter dough bread")
+
+    with app.app_context():
+        names = [name for name, in db.session.execute(db.select(Job.name).order_by(Job.name))]
+        assert names == ["related.update"] * 2 + ["sitemap.invalidate"] * 2
+        # 入队前已 flush，payload 中带有文章 ID
+        post_ids = {json.loads(job.payload)["post_id"] for job in Job.query}
+        assert None not in post_ids and len(post_ids) == 2
+        assert RelatedPost.query.count() == 0
+
+        assert jobs.get_job_queue().drain() == 4
+        assert Job.query.count() == 0
+        assert RelatedPost.query.count() == 2
+        # sitemap.invalidate 已执行：分块与索引的失效标记已写入
+        cache_dir = app.config["SITEMAP_DIR"]
+        assert os.path.exists(os.path.join(cache_dir, "sitemap-1.xml.gen"))
+        assert os.path.exists(os.path.join(cache_dir, "sitemap.xml.gen"))
+
+
+def test_failed_job_retries_with_backoff(app):
+    """失败的任务延后重试，超过最大次数后标记为 failed"""
+    calls = []
+
+    @jobs.handler("test.flaky")
+    def flaky(value):
+        calls.append(value)
+        raise RuntimeError("boom")
+
+    app.config["JOBS_RETRY_BACKOFF"] = 10
+    with app.app_context():
+        queue = jobs.get_job_queue()
+        jobs.enqueue("test.flaky", max_attempts=3, value=7)
+        db.session.commit()
+
+        assert queue.drain() == 1
+        job = Job.query.one()
+        assert (job.status, job.attempts) == ("pending", 1)
+        assert "boom" in job.last_error
+        # 尚未到重试时间
+        assert queue.drain() == 0
+        assert [queue.backoff(n) for n in (1, 2, 3)] == [10, 20, 40]
+
+        assert queue.drain(include_delayed=True) == 2
+        job = Job.query.one()
+        assert (job.status, job.attempts) == ("failed", 3)
+        assert calls == [7, 7, 7]
+
+
+def test_jobs_cli(app):
+    """jobs list / retry / drain 命令"""
+
+    @jobs.handler("test.noop")
+    def noop():
+        pass
+
+    with app.app_context():
+        db.session.add(Job(name="test.noop", status="failed", attempts=5, last_error="Error: old"))
+        db.session.commit()
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["jobs", "list"])
+    assert "failed=1" in result.output
+    assert "error=Error: old" in result.output
+
+    assert "Requeued 1 failed jobs." in runner.invoke(args=["jobs", "retry"]).output
+    assert "Ran 1 jobs (0 failed jobs in queue)." in runner.invoke(args=["jobs", "drain"]).output
+    with app.app_context():
+        assert Job.query.count() == 0
+
+
+def test_workers_start_on_first_request_only(client, app):
+    """CLI 命令与预热请求不启动工作线程，第一个真实请求才启动"""
+    queue = app.extensions["jobs"]
+    queue.workers = 1
+
+    app.test_cli_runner().invoke(args=["jobs", "list"])
+    client.get("/", environ_base={"blog.warmup": True})
+    assert queue._threads == []
+
+    app.config["JOBS_AUTOSTART"] = False
+    client.get("/")
+    assert queue._threads == []
+
+    app.config["JOBS_AUTOSTART"] = True
+    client.get("/")
+    assert len(queue._threads) == 1
+    assert queue._threads[0].is_alive()
@@ -0,0 +1,145 @@
+"""
+图片附件测试模块
+
+覆盖：
+- 发布文章时上传图片：流式写盘、正文追加引用、按内容哈希去重
+- 非图片文件被拒绝
+- 发布失败回滚时不留下图片文件
+- /media 分发带长期缓存头，详情页渲染为 <img>
+- 后台任务在进程池中生成缩略图（需要 Pillow）
+"""
+
+import io
+import os
+import re
+
+import pytest
+
+import blog
+import jobs
+from models import User, Post, Attachment, Job
+from extensions import db
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"\x00" * 200
+
+
+def _extract_csrf_token(html: str) -> str:
+    """从 HTML 中提取 CSRF token"""
+    m = re.search(r'name="csrf_token".*?value="([^"]+)"', html, re.S)
+    assert m, "CSRF token not found in form"
+    return m.group(1)
+
+
+def _login(client, username, password="123456"):
+    r = client.get("/auth/login")
+    token = _extract_csrf_token(r.get_data(as_text=True))
+    client.post(
+        "/auth/login",
+        data={"csrf_token": token, "username": username, "password": password},
+        follow_redirects=False,
+    )
+
+
+def _create_post(client, title, images):
+    r = client.get("/blog/create")
+    token = _extract_csrf_token(r.get_data(as_text=True))
+    return client.post(
+        "/blog/create",
+        data={
+            "csrf_token": token,
+            "title": title,
+            "body": "看图",
+            "images": [(io.BytesIO(data), name) for name, data in images],
+        },
+        content_type="multipart/form-data",
+    )
+
+
+@pytest.fixture
+def author(app, tmp_path):
+    app.config["MEDIA_DIR"] = str(tmp_path / "media")
+    with app.app_context():
+        user = User(username="media_author", email="media_author@test.com")
+        user.set_password("123456")
+        db.session.add(user)
+        db.session.commit()
+
+
+def test_upload_streams_to_disk_and_dedupes(client, app, author):
+    """上传的图片按哈希存盘并追加到正文；相同内容只存一份"""
+    app.config["MEDIA_CHUNK_SIZE"] = 64
+    _login(client, "media_author")
+    r = _create_post(client, "Pic 1", [("cat.png", PNG_BYTES)])
+    assert r.status_code == 302
+    _create_post(client, "Pic 2", [("same cat.png", PNG_BYTES)])
+
+    with app.app_context():
+        attachment = Attachment.query.one()
+        assert attachment.size == len(PNG_BYTES)
+        path = os.path.join(app.config["MEDIA_DIR"], attachment.sha256[:2], attachment.filename)
+        with open(path, "rb") as f:
+            assert f.read() == PNG_BYTES
+        # 只有首次上传生成缩略图任务
+        assert Job.query.filter_by(name="media.variants").count() == 1
+
+        post = Post.query.filter_by(title="Pic 2").one()
+        assert post.body == f"看图\n\n![same cat](/media/{attachment.filename})"
+        post_id, filename = post.id, attachment.filename
+
+    r = client.get(f"/media/{filename}")
+    assert r.status_code == 200
+    assert r.data == PNG_BYTES
+    assert "max-age=31536000" in r.headers["Cache-Control"]
+    assert "immutable" in r.headers["Cache-Control"]
+
+    html = client.get(f"/blog/post/{post_id}").get_data(as_text=True)
+    assert f'<img src="/media/{filename}" alt="same cat"' in html
+
+
+def test_non_image_upload_rejected(client, app, author):
+    """按文件头识别格式，伪装成图片的文件被拒绝"""
+    _login(client, "media_author")
+    r = _create_post(client, "Not a pic", [("evil.png", b"<script>alert(1)</script>")])
+    assert r.status_code == 200
+    assert "不是支持的图片格式" in r.get_data(as_text=True)
+    with app.app_context():
+        assert Post.query.count() == 0
+        assert Attachment.query.count() == 0
+
+
+def test_rollback_leaves_no_files(client, app, author, monkeypatch):
+    """文章保存失败回滚时删除已暂存的图片，只在提交后写入正式位置"""
+    def fail(post, previous_body=None):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(blog, "record_revision", fail)
+    _login(client, "media_author")
+    _create_post(client, "Broken", [("cat.png", PNG_BYTES), ("dog.png", PNG_BYTES + b"dog")])
+
+    with app.app_context():
+        assert Attachment.query.count() == 0
+    leftovers = [name for _, _, files in os.walk(app.config["MEDIA_DIR"]) for name in files]
+    assert leftovers == []
+
+
+def test_variants_generated_in_process_pool(client, app, author):
+    """后台任务生成各宽度缩略图，详情页输出 srcset"""
+    Image = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    Image.new("RGB", (1200, 600), "red").save(buffer, "PNG")
+
+    _login(client, "media_author")
+    _create_post(client, "Big pic", [("big.png", buffer.getvalue())])
+
+    with app.app_context():
+        assert jobs.get_job_queue().drain() >= 1
+        attachment = Attachment.query.one()
+        assert (attachment.width, attachment.height) == (1200, 600)
+        assert attachment.variant_widths() == [320, 960]
+        with Image.open(os.path.join(app.config["MEDIA_DIR"], attachment.sha256[:2], f"{attachment.sha256}-320.png")) as thumb:
+            assert thumb.size == (320, 160)
+        post_id, sha256 = Post.query.one().id, attachment.sha256
+
+    html = client.get(f"/blog/post/{post_id}").get_data(as_text=True)
+    assert f"/media/{sha256}-320.png 320w" in html
+    assert client.get(f"/media/{sha256}-960.png").status_code == 200
@@ -0,0 +1,119 @@
+"""
+按端点内存统计测试模块
+
+覆盖：
+- 开启后按端点记录峰值、净增与抽样的分配位置
+- /admin/memory 仅管理员可访问，未开启时返回 404
+- flask memory report 汇总 worker 写入的统计文件
+"""
+
+import re
+import tracemalloc
+
+import pytest
+
+from memprofile import get_memory_profiler
+from models import User, Post
+from extensions import db
+
+
+def _extract_csrf_token(html: str) -> str:
+    """从 HTML 中提取 CSRF token"""
+    m = re.search(r'name="csrf_token".*?value="([^"]+)"', html, re.S)
+    assert m, "CSRF token not found in form"
+    return m.group(1)
+
+
+def _login(client, username, password="123456"):
+    r = client.get("/auth/login")
+    token = _extract_csrf_token(r.get_data(as_text=True))
+    client.post(
+        "/auth/login",
+        data={"csrf_token": token, "username": username, "password": password},
+        follow_redirects=False,
+    )
+
+
+@pytest.fixture
+def profiled_app(app, tmp_path):
+    """开启内存统计；结束时停止 tracemalloc"""
+    app.config.update(
+        MEMORY_PROFILE=True,
+        MEMORY_PROFILE_DUMP_INTERVAL=3600,
+        MEMORY_PROFILE_DIR=str(tmp_path / "memprofile"),
+        ADMIN_USERNAMES=("mem_admin",),
+    )
+    with app.app_context():
+        for name in ("mem_admin", "mem_user"):
+            user = User(username=name, email=f"{name}@test.com")
+            user.set_password("123456")
+            db.session.add(user)
+        db.session.flush()
+        db.session.add_all(Post(title=f"Mem {i}", body="x" * 500, user_id=user.id) for i in range(50))
+        db.session.commit()
+    yield app
+    tracemalloc.stop()
+
+
+def test_records_per_endpoint_stats(profiled_app):
+    """按端点累计请求数与峰值，分配位置归到应用代码行"""
+    profiled_app.config["MEMORY_PROFILE_SNAPSHOT_EVERY"] = 1
+    client = profiled_app.test_client()
+    for _ in range(3):
+        assert client.get("/").status_code == 200
+
+    with profiled_app.app_context():
+        report = get_memory_profiler().report(top=20)
+    index = report["endpoints"]["index"]
+    assert (index["count"], index["sampled"], index["overlapped"]) == (3, 3, 0)
+    assert index["peak_max"] >= index["peak_avg"] > 0
+    assert report["traced_peak"] > 0
+    assert index["sites"], "no allocation sites recorded"
+    assert all(size > 0 for _, size in index["sites"])
+    assert any(site.startswith(("app.py:", "models.py:")) for site, _ in index["sites"])
+
+
+def test_admin_endpoint_requires_admin(profiled_app):
+    """/admin/memory 需要登录且用户在 ADMIN_USERNAMES 中"""
+    client = profiled_app.test_client()
+    assert client.get("/admin/memory").status_code == 302
+
+    _login(client, "mem_user")
+    assert client.get("/admin/memory").status_code == 403
+    client.get("/auth/logout")
+
+    _login(client, "mem_admin")
+    client.get("/")
+    data = client.get("/admin/memory?top=3").get_json()
+    assert data["endpoints"]["index"]["count"] == 1
+    assert len(data["endpoints"]["index"]["sites"]) <= 3
+
+    profiled_app.config["MEMORY_PROFILE"] = False
+    assert client.get("/admin/memory").status_code == 404
+
+
+def test_disabled_by_default(client, app):
+    """默认不开启，不记录统计"""
+    assert app.config["MEMORY_PROFILE"] is False
+    client.get("/")
+    with app.app_context():
+        assert get_memory_profiler().report()["endpoints"] == {}
+
+
+def test_report_command_merges_dumps(profiled_app):
+    """report 命令汇总各 worker 的统计文件并按端点输出"""
+    runner = profiled_app.test_cli_runner()
+    result = runner.invoke(args=["memory", "report"])
+    assert result.exit_code != 0
+    assert "没有统计数据" in result.output
+
+    profiled_app.config["MEMORY_PROFILE_DUMP_INTERVAL"] = 0
+    client = profiled_app.test_client()
+    client.get("/")
+    client.get("/blog/post/1")
+
+    result = runner.invoke(args=["memory", "report", "--sort", "peak"])
+    assert result.exit_code == 0, result.output
+    assert "1 workers" in result.output
+    assert re.search(r"^index: requests=1 ", result.output, re.M)
+    assert re.search(r"^blog\.post_detail: requests=1 ", result.output, re.M)
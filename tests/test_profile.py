@@ -0,0 +1,123 @@
+"""
+作者主页测试模块
+
+覆盖：
+- /blog/user/<username> 键集分页
+- User.post_count 在创建/删除文章时的维护
+- 没有发布时间的旧文章不会导致分页出错
+"""
+
+import re
+from datetime import datetime, timedelta
+
+from models import User, Post
+from extensions import db
+
+
+def _extract_csrf_token(html: str) -> str:
+    """从 HTML 中提取 CSRF token"""
+    m = re.search(r'name="csrf_token".*?value="([^"]+)"', html, re.S)
+    assert m, "CSRF token not found in form"
+    return m.group(1)
+
+
+def _login(client, username, password="123456"):
+    r = client.get("/auth/login")
+    token = _extract_csrf_token(r.get_data(as_text=True))
+    client.post(
+        "/auth/login",
+        data={"csrf_token": token, "username": username, "password": password},
+        follow_redirects=False,
+    )
+
+
+def test_profile_keyset_pagination(client, app):
+    """作者主页按时间倒序分页，游标翻页不重复不遗漏"""
+    app.config["POSTS_PER_PAGE"] = 2
+    with app.app_context():
+        author = User(username="pager", email="pager@test.com")
+        author.set_password("123456")
+        other = User(username="someone", email="someone@test.com")
+        other.set_password("123456")
+        db.session.add_all([author, other])
+        db.session.commit()
+
+        base = datetime(2024, 1, 1)
+        # 两篇文章时间相同，验证 id 作为次级排序键
+        stamps = [base, base + timedelta(hours=1), base + timedelta(hours=1), base + timedelta(hours=2)]
+        for i, stamp in enumerate(stamps):
+            db.session.add(Post(title=f"Pager {i}", body="b", user_id=author.id, timestamp=stamp))
+        db.session.add(Post(title="Not Mine", body="b", user_id=other.id))
+        db.session.commit()
+
+    seen = []
+    url = "/blog/user/pager"
+    while url:
+        resp = client.get(url)
+        assert resp.status_code == 200
+        html = resp.get_data(as_text=True)
+        seen += re.findall(r"Pager \d", html)
+        assert "Not Mine" not in html
+        m = re.search(r'href="(/blog/user/pager\?before=[^"]+)"', html)
+        url = m.group(1).replace("&amp;", "&") if m else None
+
+    assert seen == ["Pager 3", "Pager 2", "Pager 1", "Pager 0"]
+
+
+def test_profile_unknown_user_returns_404(client):
+    """不存在的作者返回 404"""
+    resp = client.get("/blog/user/nobody")
+    assert resp.status_code == 404
+
+
+def test_post_count_maintained_on_create_and_delete(client, app):
+    """创建/删除文章时维护 post_count"""
+    with app.app_context():
+        user = User(username="counter", email="counter@test.com")
+        user.set_password("123456")
+        db.session.add(user)
+        db.session.commit()
+
+    _login(client, "counter")
+
+    for title in ("c1", "c2"):
+        r = client.get("/blog/create")
+        token = _extract_csrf_token(r.get_data(as_text=True))
+        client.post("/blog/create", data={"csrf_token": token, "title": title, "body": "x"})
+
+    with app.app_context():
+        assert User.query.filter_by(username="counter").first().post_count == 2
+        post_id = Post.query.filter_by(title="c1").first().id
+
+    r = client.get(f"/blog/post/{post_id}")
+    token = _extract_csrf_token(r.get_data(as_text=True))
+    client.post(f"/blog/post/{post_id}/delete", data={"csrf_token": token})
+
+    with app.app_context():
+        assert User.query.filter_by(username="counter").first().post_count == 1
+
+    resp = client.get("/blog/user/counter")
+    assert "共 1 篇文章" in resp.get_data(as_text=True)
+
+
+def test_profile_skips_posts_without_timestamp(client, app):
+    """旧数据中 timestamp 为空的文章不参与分页，页尾落在这类文章上也不报错"""
+    app.config["POSTS_PER_PAGE"] = 2
+    with app.app_context():
+        author = User(username="legacy", email="legacy@test.com")
+        author.set_password("123456")
+        db.session.add(author)
+        db.session.flush()
+        posts = [Post(title=f"Legacy {i}", body="b", user_id=author.id) for i in range(3)]
+        db.session.add_all(posts)
+        db.session.flush()
+        legacy_ids = [posts[0].id, posts[1].id]
+        db.session.execute(db.update(Post).where(Post.id.in_(legacy_ids)).values(timestamp=None))
+        db.session.commit()
+
+    resp = client.get("/blog/user/legacy")
+    assert resp.status_code == 200
+    html = resp.get_data(as_text=True)
+    assert "Legacy 2" in html
+    assert "Legacy 0" not in html and "Legacy 1" not in html
+    assert "before=" not in html
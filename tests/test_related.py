@@ -0,0 +1,119 @@
+"""
+相关文章测试模块
+
+覆盖：
+- 全量构建：内容相近的文章排在邻居列表首位
+- 增量更新：新文章被索引并插入相似文章的邻居列表；删除的文章被移除
+- 按文章更新只查询该文章的状态，并维护已索引文章总数
+- 详情页展示相关文章
+"""
+
+from models import User, Post, RelatedPost, RelatedIndexState, TermStat
+from extensions import db
+from related import build_all, pending_changes, related_posts, update_incremental
+
+
+def _create_posts(specs):
+    user = User(username="related_author", email="related_author@test.com")
+    user.set_password("123456")
+    db.session.add(user)
+    db.session.flush()
+    posts = [Post(title=title, body=body, user_id=user.id) for title, body in specs]
+    db.session.add_all(posts)
+    db.session.commit()
+    return [post.id for post in posts]
+
+
+SPECS = [
+    ("Python asyncio tutorial", "event loop coroutines asyncio await tasks python"),
+    ("Asyncio event loop internals", "asyncio event loop selectors coroutines python await"),
+    ("Baking sourdough bread", "flour water starter dough oven bread baking"),
+    ("Rye bread recipe", "rye flour dough oven starter bread"),
+]
+
+
+def test_build_ranks_similar_posts_first(app):
+    """全量构建后，每篇文章最相似的是同主题文章"""
+    with app.app_context():
+        python_a, python_b, bread_a, bread_b = _create_posts(SPECS)
+        assert build_all() == 4
+
+        assert related_posts(python_a)[0].id == python_b
+        assert related_posts(bread_a)[0].id == bread_b
+        assert pending_changes() == ([], [])
+
+
+def test_incremental_update_indexes_new_and_removes_deleted(app):
+    """增量更新只处理变化的文章，并维护其他文章的邻居列表"""
+    app.config["RELATED_POSTS_COUNT"] = 1
+    with app.app_context():
+        python_a, python_b, bread_a, bread_b = _create_posts(SPECS)
+        build_all()
+
+        user_id = db.session.get(Post, python_a).user_id
+        new_post = Post(
+            title="Rye sourdough bread baking",
+            body="rye sourdough starter flour dough oven bread baking",
+            user_id=user_id,
+        )
+        db.session.add(new_post)
+        db.session.commit()
+        new_id = new_post.id
+
+        assert pending_changes() == ([new_id], [])
+        assert update_incremental() == 1
+        assert related_posts(new_id)[0].id in (bread_a, bread_b)
+        # 新文章比原有邻居更相似时，替换掉原邻居（N = 1）
+        assert [p.id for p in related_posts(bread_a)] == [new_id]
+        assert [p.id for p in related_posts(python_a)] == [python_b]
+
+        db.session.delete(db.session.get(Post, new_id))
+        db.session.commit()
+        assert pending_changes() == ([], [new_id])
+        update_incremental()
+        assert db.session.get(RelatedIndexState, new_id) is None
+        assert RelatedPost.query.filter(
+            db.or_(RelatedPost.post_id == new_id, RelatedPost.related_id == new_id)
+        ).count() == 0
+
+
+def _indexed_total():
+    return db.session.get(TermStat, "").df
+
+
+def test_update_for_given_posts_maintains_total(app):
+    """只检查给定文章的变化；文章总数随增删维护，旧索引缺少记录时补齐"""
+    with app.app_context():
+        python_a, python_b, bread_a, bread_b = _create_posts(SPECS)
+        build_all()
+        assert _indexed_total() == 4
+
+        user_id = db.session.get(Post, python_a).user_id
+        first = Post(title="Asyncio queues", body="asyncio queue python await", user_id=user_id)
+        second = Post(title="Bread flour", body="flour bread dough", user_id=user_id)
+        db.session.add_all([first, second])
+        db.session.delete(db.session.get(Post, bread_b))
+        db.session.commit()
+
+        assert pending_changes([first.id, bread_b]) == ([first.id], [bread_b])
+        assert update_incremental([first.id]) == 1
+        assert pending_changes() == ([second.id], [bread_b])
+        assert _indexed_total() == 5
+
+        # 旧索引没有文章总数记录时统计一次
+        db.session.delete(db.session.get(TermStat, ""))
+        db.session.commit()
+        assert update_incremental() == 2
+        assert _indexed_total() == RelatedIndexState.query.count() == 5
+
+
+def test_post_detail_shows_related_posts(client, app):
+    """详情页展示预先计算的相关文章"""
+    with app.app_context():
+        python_a, python_b, _, _ = _create_posts(SPECS)
+        build_all()
+
+    r = client.get(f"/blog/post/{python_a}")
+    html = r.get_data(as_text=True)
+    assert "相关文章" in html
+    assert "Asyncio event loop internals" in html
@@ -0,0 +1,109 @@
+"""
+修订历史测试模块
+
+覆盖：
+- 差量生成与应用
+- 编辑时记录修订、定期保存快照、重建任意版本
+- 修订历史仅作者可见
+"""
+
+import re
+
+from models import User, Post, PostRevision
+from extensions import db
+from revisions import apply_delta, make_delta, reconstruct
+
+
+def _extract_csrf_token(html: str) -> str:
+    """从 HTML 中提取 CSRF token"""
+    m = re.search(r'name="csrf_token".*?value="([^"]+)"', html, re.S)
+    assert m, "CSRF token not found in form"
+    return m.group(1)
+
+
+def _login(client, username, password="123456"):
+    r = client.get("/auth/login")
+    token = _extract_csrf_token(r.get_data(as_text=True))
+    client.post(
+        "/auth/login",
+        data={"csrf_token": token, "username": username, "password": password},
+        follow_redirects=False,
+    )
+
+
+def test_delta_roundtrip():
+    """差量应用后还原出新版本（含末尾无换行的情况）"""
+    old = "line 1\nline 2\nline 3\nline 4"
+    new = "line 1\nline 2 changed\nline 3\nline 5\nline 6"
+    assert apply_delta(old, make_delta(old, new)) == new
+    assert apply_delta("", make_delta("", new)) == new
+    assert apply_delta(old, make_delta(old, "")) == ""
+
+
+def test_edits_recorded_as_deltas_with_snapshots(client, app):
+    """每次编辑记录一个版本，按间隔保存快照，任意版本可重建"""
+    app.config["REVISION_SNAPSHOT_INTERVAL"] = 3
+    with app.app_context():
+        user = User(username="reviser", email="reviser@test.com")
+        user.set_password("123456")
+        db.session.add(user)
+        db.session.commit()
+
+    _login(client, "reviser")
+    paragraphs = [f"第 {i} 段内容，long paragraph {i}. " * 5 for i in range(30)]
+    body = "\n".join(paragraphs)
+
+    r = client.get("/blog/create")
+    token = _extract_csrf_token(r.get_data(as_text=True))
+    client.post("/blog/create", data={"csrf_token": token, "title": "Rev 1", "body": body})
+    with app.app_context():
+        post_id = Post.query.filter_by(title="Rev 1").first().id
+
+    versions = [body]
+    for i in range(2, 8):
+        paragraphs[i] = f"edited paragraph {i}"
+        body = "\n".join(paragraphs)
+        versions.append(body)
+        r = client.get(f"/blog/post/{post_id}/edit")
+        token = _extract_csrf_token(r.get_data(as_text=True))
+        client.post(
+            f"/blog/post/{post_id}/edit",
+            data={"csrf_token": token, "title": f"Rev {i}", "body": body},
+        )
+
+    with app.app_context():
+        revisions = PostRevision.query.filter_by(post_id=post_id).order_by(PostRevision.number).all()
+        assert [r.number for r in revisions] == list(range(1, 8))
+        assert [r.number for r in revisions if r.is_snapshot] == [1, 4, 7]
+        delta = next(r for r in revisions if not r.is_snapshot)
+        snapshot = next(r for r in revisions if r.is_snapshot)
+        assert len(delta.data) < len(snapshot.data) / 2
+
+        for number, expected in enumerate(versions, start=1):
+            revision, rebuilt = reconstruct(post_id, number)
+            assert rebuilt == expected
+            assert revision.title == f"Rev {number}"
+
+    html = client.get(f"/blog/post/{post_id}/revisions/3").get_data(as_text=True)
+    assert "edited paragraph 3" in html
+    assert "edited paragraph 4" not in html
+    assert client.get(f"/blog/post/{post_id}/revisions/99").status_code == 404
+
+
+def test_revisions_forbidden_for_non_author(client, app):
+    """非作者访问修订历史返回 403"""
+    with app.app_context():
+        author = User(username="revauthor", email="revauthor@test.com")
+        author.set_password("123456")
+        other = User(username="revother", email="revother@test.com")
+        other.set_password("123456")
+        db.session.add_all([author, other])
+        db.session.commit()
+        post = Post(title="t", body="b", user_id=author.id)
+        db.session.add(post)
+        db.session.commit()
+        post_id = post.id
+
+    _login(client, "revother")
+    assert client.get(f"/blog/post/{post_id}/revisions").status_code == 403
+    assert client.get(f"/blog/post/{post_id}/revisions/1").status_code == 403
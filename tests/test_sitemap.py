@@ -0,0 +1,147 @@
+"""
+站点地图测试模块
+
+覆盖：
+- sitemap 索引与按 ID 区间分块的 sitemap 文件
+- 发布/删除文章后只有受影响的分块被重新生成，生成期间的失效不会丢失
+- 未配置 SITEMAP_BASE_URL 时返回 404，请求的 Host 头不会写入缓存
+- flask sitemap build 命令
+"""
+
+import os
+import re
+from datetime import datetime
+
+import pytest
+
+import jobs
+import sitemap
+from models import User, Post
+from extensions import db
+
+
+def _extract_csrf_token(html: str) -> str:
+    """从 HTML 中提取 CSRF token"""
+    m = re.search(r'name="csrf_token".*?value="([^"]+)"', html, re.S)
+    assert m, "CSRF token not found in form"
+    return m.group(1)
+
+
+def _login(client, username, password="123456"):
+    r = client.get("/auth/login")
+    token = _extract_csrf_token(r.get_data(as_text=True))
+    client.post(
+        "/auth/login",
+        data={"csrf_token": token, "username": username, "password": password},
+        follow_redirects=False,
+    )
+
+
+@pytest.fixture
+def posts(app, tmp_path):
+    """5 篇文章，每块 2 篇，共 3 块"""
+    app.config["SITEMAP_DIR"] = str(tmp_path / "sitemap")
+    app.config["SITEMAP_CHUNK_SIZE"] = 2
+    app.config["SITEMAP_BASE_URL"] = "https://blog.example.com"
+    with app.app_context():
+        user = User(username="sitemap_author", email="sitemap_author@test.com")
+        user.set_password("123456")
+        db.session.add(user)
+        db.session.flush()
+        for day in range(1, 6):
+            db.session.add(Post(title=f"S{day}", body="b", user_id=user.id, timestamp=datetime(2024, 1, day)))
+        db.session.commit()
+
+
+def test_sitemap_index_and_chunks(client, posts):
+    """索引列出全部分块，分块按 ID 区间包含文章与 lastmod"""
+    r = client.get("/sitemap.xml")
+    assert r.status_code == 200
+    assert r.mimetype == "application/xml"
+    index = r.get_data(as_text=True)
+    assert index.count("<sitemap>") == 3
+    assert "<loc>https://blog.example.com/sitemap-2.xml</loc><lastmod>2024-01-04</lastmod>" in index
+
+    chunk = client.get("/sitemap-2.xml").get_data(as_text=True)
+    assert re.findall(r"<loc>([^<]+)</loc>", chunk) == [
+        "https://blog.example.com/blog/post/3",
+        "https://blog.example.com/blog/post/4",
+    ]
+    assert "<lastmod>2024-01-03</lastmod>" in chunk
+    assert client.get("/sitemap-4.xml").status_code == 404
+
+
+def test_writes_invalidate_only_touched_chunk(client, app, posts):
+    """删除文章后只有其所在分块与索引重新生成"""
+    client.get("/sitemap.xml")
+    cache_dir = app.config["SITEMAP_DIR"]
+    untouched = os.path.join(cache_dir, "sitemap-1.xml")
+    os.utime(untouched, (0, 0))
+
+    _login(client, "sitemap_author")
+    token = _extract_csrf_token(client.get("/blog/post/3").get_data(as_text=True))
+    client.post("/blog/post/3/delete", data={"csrf_token": token})
+    with app.app_context():
+        jobs.get_job_queue().drain()
+    assert not os.path.exists(os.path.join(cache_dir, "sitemap-2.xml"))
+    assert not os.path.exists(os.path.join(cache_dir, "sitemap.xml"))
+
+    chunk = client.get("/sitemap-2.xml").get_data(as_text=True)
+    assert "/blog/post/3<" not in chunk
+    assert "/blog/post/4<" in chunk
+    client.get("/sitemap.xml")
+    assert os.path.getmtime(untouched) == 0
+
+
+def test_requires_base_url(client, app, posts):
+    """未配置站点根 URL 时返回 404，不生成缓存"""
+    app.config["SITEMAP_BASE_URL"] = None
+    assert client.get("/sitemap.xml").status_code == 404
+    assert client.get("/sitemap-1.xml").status_code == 404
+    assert not os.path.exists(app.config["SITEMAP_DIR"])
+
+
+def test_host_header_not_cached(client, posts):
+    """伪造的 Host 头不影响生成的 URL"""
+    client.get("/sitemap.xml", headers={"Host": "evil.example"})
+    client.get("/sitemap-1.xml", headers={"Host": "evil.example"})
+    for path in ("/sitemap.xml", "/sitemap-1.xml"):
+        body = client.get(path).get_data(as_text=True)
+        assert "evil.example" not in body
+        assert "https://blog.example.com/" in body
+
+
+def test_invalidate_during_generation_is_not_lost(app, posts):
+    """生成期间发生失效时重新生成，不写回旧内容"""
+    with app.test_request_context():
+        user_id = db.session.get(Post, 1).user_id
+        real_write = sitemap._write_atomic
+        calls = []
+
+        def write_then_invalidate(path, lines):
+            real_write(path, lines)
+            if path == sitemap.chunk_path(3) and not calls:
+                # 模拟另一 worker：在分块查询之后发布新文章并使分块失效
+                calls.append(path)
+                post = Post(title="S6", body="b", user_id=user_id, timestamp=datetime(2024, 1, 6))
+                db.session.add(post)
+                db.session.commit()
+                sitemap.invalidate(post.id)
+
+        sitemap._write_atomic = write_then_invalidate
+        try:
+            path = sitemap.ensure_chunk(3, "https://blog.example.com")
+        finally:
+            sitemap._write_atomic = real_write
+        assert calls
+        with open(path, encoding="utf-8") as f:
+            assert "/blog/post/6<" in f.read()
+
+
+def test_sitemap_build_command(app, posts):
+    """build 命令按给定根 URL 重新生成全部文件"""
+    result = app.test_cli_runner().invoke(args=["sitemap", "build", "--base-url", "https://blog.example.com"])
+    assert result.exit_code == 0, result.output
+    assert "3 chunks" in result.output
+    with open(os.path.join(app.config["SITEMAP_DIR"], "sitemap-3.xml"), encoding="utf-8") as f:
+        assert "<loc>https://blog.example.com/blog/post/5</loc>" in f.read()
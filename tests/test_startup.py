@@ -0,0 +1,50 @@
+"""
+冷启动优化测试模块
+
+覆盖：
+- Jinja 字节码缓存写入配置的缓存目录（测试中为临时目录）
+- flask templates compile 预编译全部模板
+- 启动耗时报告
+"""
+
+import os
+
+
+def test_templates_compile_populates_bytecode_cache(app):
+    """预编译命令应为每个模板生成字节码缓存文件"""
+    cache_dir = app.config["JINJA_BYTECODE_CACHE_DIR"]
+    assert not cache_dir.startswith(app.instance_path)
+    for name in os.listdir(cache_dir):
+        os.unlink(os.path.join(cache_dir, name))
+
+    result = app.test_cli_runner().invoke(args=["templates", "compile"])
+    assert result.exit_code == 0, result.output
+
+    templates = app.jinja_env.list_templates(extensions=["html"])
+    assert "index.html" in templates
+    assert len(os.listdir(cache_dir)) == len(templates)
+
+
+def test_startup_report_includes_all_phases(app):
+    """启动报告应包含 import / factory / first_request 三个阶段"""
+    result = app.test_cli_runner().invoke(args=["startup-report"])
+    assert result.exit_code == 0, result.output
+    for phase in ("import=", "factory=", "first_request="):
+        assert phase in result.output
+
+    timer = app.extensions["startup_timer"]
+    assert timer.first_request_done
+    assert timer.timings["first_request"] > 0
+
+
+def test_warmup_request_does_not_count_as_first_request(app):
+    """预热请求不触发 first_request 计时，首个真实请求才计入"""
+    timer = app.extensions["startup_timer"]
+    client = app.test_client()
+    client.get("/", environ_base={"blog.warmup": True})
+    assert not timer.first_request_done
+    assert timer.timings["first_request"] == 0
+
+    client.get("/")
+    assert timer.first_request_done
+    assert timer.timings["first_request"] > 0
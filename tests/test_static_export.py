@@ -0,0 +1,167 @@
+"""
+静态站点导出测试模块
+
+覆盖：
+- 首次导出渲染首页、文章详情页、作者主页并写入清单
+- 增量导出只重新渲染变化的文章，删除已删除文章的页面
+- 导出渲染不计入阅读数
+- 相关文章变化（含相关文章改名）时重新渲染详情页
+- 附件生成缩略图后重新渲染引用它的详情页
+- 渲染实例沿用当前应用的配置
+- 用户名中的特殊字符按 URL 编码，无法安全映射为文件的页面不导出
+"""
+
+import json
+import os
+
+import static_export
+from related import build_all
+from models import Attachment, User, Post
+from extensions import db
+
+
+def _export(app, outdir, *args):
+    result = app.test_cli_runner().invoke(args=["static-export", str(outdir), "--jobs", "1", *args])
+    assert result.exit_code == 0, result.output
+    return result.output
+
+
+def test_static_export_incremental(app, tmp_path):
+    """首次全量导出，之后只重新渲染变化部分"""
+    with app.app_context():
+        user = User(username="exporter", email="exporter@test.com")
+        user.set_password("123456")
+        db.session.add(user)
+        db.session.commit()
+        first = Post(title="First Export", body="one", user_id=user.id)
+        second = Post(title="Second Export", body="two", user_id=user.id)
+        db.session.add_all([first, second])
+        db.session.commit()
+        first_id, second_id = first.id, second.id
+
+    output = _export(app, tmp_path)
+    assert "2 posts changed" in output
+    assert "First Export" in (tmp_path / "index.html").read_text(encoding="utf-8")
+    detail = tmp_path / "blog" / "post" / str(first_id) / "index.html"
+    assert "one" in detail.read_text(encoding="utf-8")
+    assert (tmp_path / "blog" / "user" / "exporter" / "index.html").exists()
+
+    manifest = json.loads((tmp_path / "manifest.json").read_text(encoding="utf-8"))
+    assert set(manifest["posts"]) == {str(first_id), str(second_id)}
+
+    # 无变化时不重新渲染任何文章，HTML 未变的文件也不重写
+    second_page = tmp_path / "blog" / "post" / str(second_id) / "index.html"
+    mtime = os.stat(second_page).st_mtime_ns
+    assert "0 posts changed" in _export(app, tmp_path)
+    assert os.stat(second_page).st_mtime_ns == mtime
+
+    # 编辑一篇、删除一篇
+    with app.app_context():
+        db.session.get(Post, first_id).body = "one edited"
+        db.session.delete(db.session.get(Post, second_id))
+        db.session.commit()
+
+    output = _export(app, tmp_path)
+    assert "1 posts changed, 1 removed" in output
+    assert "one edited" in detail.read_text(encoding="utf-8")
+    assert not second_page.exists()
+    assert "Second Export" not in (tmp_path / "index.html").read_text(encoding="utf-8")
+
+    # 导出渲染不计入阅读数
+    renderer = static_export._client.application
+    assert renderer.extensions["view_counter"].pending(first_id) == 0
+    with app.app_context():
+        assert db.session.get(Post, first_id).view_count == 0
+
+
+def test_static_export_rerenders_when_related_posts_change(app, tmp_path):
+    """相关文章列表或其标题变化时，即使文章本身未变也重新渲染详情页"""
+    with app.app_context():
+        user = User(username="related_exporter", email="related_exporter@test.com")
+        user.set_password("123456")
+        db.session.add(user)
+        db.session.flush()
+        bread = Post(title="Sourdough bread", body="flour water starter dough bread", user_id=user.id)
+        rye = Post(title="Rye bread", body="rye flour starter dough bread", user_id=user.id)
+        db.session.add_all([bread, rye])
+        db.session.commit()
+        bread_id, rye_id = bread.id, rye.id
+
+    assert "2 posts changed" in _export(app, tmp_path)
+    detail = tmp_path / "blog" / "post" / str(bread_id) / "index.html"
+    assert "Rye bread" not in detail.read_text(encoding="utf-8")
+
+    with app.app_context():
+        build_all()
+    assert "2 posts changed" in _export(app, tmp_path)
+    assert "Rye bread" in detail.read_text(encoding="utf-8")
+
+    # 相关文章改名：两篇都要重新渲染（一篇内容变化，一篇的相关文章标题变化）
+    with app.app_context():
+        db.session.get(Post, rye_id).title = "Dark rye bread"
+        db.session.commit()
+    assert "2 posts changed" in _export(app, tmp_path)
+    assert "Dark rye bread" in detail.read_text(encoding="utf-8")
+
+
+def test_static_export_rerenders_when_attachment_variants_change(app, tmp_path):
+    """引用的附件生成缩略图后，详情页带上 srcset 与尺寸"""
+    sha256 = "a" * 64
+    with app.app_context():
+        user = User(username="media_exporter", email="media_exporter@test.com")
+        user.set_password("123456")
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Attachment(sha256=sha256, ext="png", size=10, user_id=user.id))
+        post = Post(title="Photo", body=f"![cat](/media/{sha256}.png)", user_id=user.id)
+        db.session.add(post)
+        db.session.commit()
+        post_id = post.id
+
+    _export(app, tmp_path)
+    detail = tmp_path / "blog" / "post" / str(post_id) / "index.html"
+    assert "srcset" not in detail.read_text(encoding="utf-8")
+
+    with app.app_context():
+        attachment = Attachment.query.filter_by(sha256=sha256).one()
+        attachment.variants, attachment.width, attachment.height = "320", 640, 480
+        db.session.commit()
+    assert "1 posts changed" in _export(app, tmp_path)
+    html = detail.read_text(encoding="utf-8")
+    assert f"/media/{sha256}-320.png 320w" in html
+    assert 'width="640" height="480"' in html
+
+
+def test_static_export_uses_app_config(app, tmp_path):
+    """渲染实例沿用当前应用的配置，只关闭阅读计数与后台任务"""
+    app.config["TAG_CLOUD_SIZE"] = 3
+    _export(app, tmp_path)
+    renderer = static_export._client.application
+    for key in ("TAG_CLOUD_SIZE", "MEDIA_DIR", "JINJA_BYTECODE_CACHE_DIR", "SITEMAP_DIR"):
+        assert renderer.config[key] == app.config[key]
+    assert renderer.config["VIEW_TRACKING_ENABLED"] is False
+    assert renderer.config["JOBS_WORKERS"] == 0
+
+
+def test_static_export_quotes_and_confines_paths(app, tmp_path):
+    """用户名按 URL 编码请求；含 ``..`` 的路径不导出，也不删除导出目录中的其他文件"""
+    with app.app_context():
+        for username in ("what?#%", "../../victim"):
+            user = User(username=username, email=f"{len(username)}@test.com")
+            user.set_password("123456")
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Post(title=f"By {username}", body="body", user_id=user.id))
+        db.session.commit()
+
+    sentinel = tmp_path / "victim" / "index.html"
+    sentinel.parent.mkdir()
+    sentinel.write_text("keep", encoding="utf-8")
+    _export(app, tmp_path)
+
+    page = tmp_path / "blog" / "user" / "what?#%" / "index.html"
+    assert "By what?#%" in page.read_text(encoding="utf-8")
+    assert sentinel.read_text(encoding="utf-8") == "keep"
+    manifest = json.loads((tmp_path / "manifest.json").read_text(encoding="utf-8"))
+    assert "/blog/user/what%3F%23%25" in manifest["files"]
+    assert not any("victim" in path for path in manifest["files"])
@@ -0,0 +1,99 @@
+"""
+标题自动补全测试模块
+
+覆盖：
+- 前缀索引：规范化、排序、增删改
+- 重建期间的增删在替换索引后不会丢失
+- /blog/suggest 接口随文章发布、编辑、删除更新
+"""
+
+import re
+
+from suggest import TitleIndex, normalize
+from models import User
+
+
+def _extract_csrf_token(html: str) -> str:
+    """从 HTML 中提取 CSRF token"""
+    m = re.search(r'name="csrf_token".*?value="([^"]+)"', html, re.S)
+    assert m, "CSRF token not found in form"
+    return m.group(1)
+
+
+def _login(client, username, password="123456"):
+    r = client.get("/auth/login")
+    token = _extract_csrf_token(r.get_data(as_text=True))
+    client.post(
+        "/auth/login",
+        data={"csrf_token": token, "username": username, "password": password},
+        follow_redirects=False,
+    )
+
+
+def test_title_index_prefix_search():
+    """按规范化前缀查找，结果按标题排序并受 limit 限制"""
+    assert normalize("  Ｆｌａｓｋ   Tips ") == "flask tips"
+
+    index = TitleIndex()
+    index.load([(1, "Flask Tips"), (2, "flask routing"), (3, "Django ORM"), (4, "Flask tips")])
+    assert index.search("FLASK") == [(2, "flask routing"), (1, "Flask Tips"), (4, "Flask tips")]
+    assert index.search("flask t", limit=1) == [(1, "Flask Tips")]
+    assert index.search("") == []
+    assert index.search("zzz") == []
+
+    index.add(5, "Flask Blueprints")
+    index.update(3, "Django ORM", "Flask ORM")
+    index.remove(4, "Flask tips")
+    assert [post_id for post_id, _ in index.search("flask")] == [5, 3, 2, 1]
+    assert len(index) == 4
+    assert index.memory_bytes() > 0
+
+
+def test_writes_during_rebuild_are_replayed():
+    """重建读取的快照早于期间的写入时，替换后重放这些写入"""
+    index = TitleIndex()
+    index.load([(1, "Flask Tips"), (2, "Flask ORM")])
+
+    index.begin_rebuild()
+    # 快照已读取：包含文章 3，不包含之后的写入
+    snapshot = [(1, "Flask Tips"), (2, "Flask ORM"), (3, "Flask Testing")]
+    index.add(4, "Flask Blueprints")
+    index.update(1, "Flask Tips", "Flask Tricks")
+    index.remove(2, "Flask ORM")
+    index.add(3, "Flask Testing")
+    index.load(snapshot)
+
+    assert index.search("flask") == [(4, "Flask Blueprints"), (3, "Flask Testing"), (1, "Flask Tricks")]
+
+    # 重建结束后不再记录
+    index.add(5, "Flask CLI")
+    index.load([])
+    assert index.search("flask") == []
+
+
+def test_suggest_endpoint_tracks_writes(client, app):
+    """发布、编辑、删除文章后补全结果立即更新"""
+    with app.app_context():
+        from extensions import db
+
+        user = User(username="suggest_author", email="suggest_author@test.com")
+        user.set_password("123456")
+        db.session.add(user)
+        db.session.commit()
+
+    _login(client, "suggest_author")
+    token = _extract_csrf_token(client.get("/blog/create").get_data(as_text=True))
+    client.post("/blog/create", data={"csrf_token": token, "title": "Python 并发编程", "body": "b"})
+
+    data = client.get("/blog/suggest?q=python").get_json()
+    assert [item["title"] for item in data["results"]] == ["Python 并发编程"]
+    post_id = data["results"][0]["id"]
+    assert data["results"][0]["url"] == f"/blog/post/{post_id}"
+
+    token = _extract_csrf_token(client.get(f"/blog/post/{post_id}/edit").get_data(as_text=True))
+    client.post(f"/blog/post/{post_id}/edit", data={"csrf_token": token, "title": "Rust 并发编程", "body": "b"})
+    assert client.get("/blog/suggest?q=python").get_json()["results"] == []
+    assert client.get("/blog/suggest?q=rust").get_json()["results"][0]["id"] == post_id
+
+    client.post(f"/blog/post/{post_id}/delete", data={"csrf_token": token})
+    assert client.get("/blog/suggest?q=rust").get_json()["results"] == []
@@ -0,0 +1,124 @@
+"""
+标签功能测试模块
+
+覆盖：
+- 创建/编辑/删除文章时维护标签关联与标签文章数
+- /blog/tag/<name> 键集分页
+- 首页标签云
+"""
+
+import re
+from datetime import datetime, timedelta
+
+from models import User, Post, Tag
+from extensions import db
+
+
+def _extract_csrf_token(html: str) -> str:
+    """从 HTML 中提取 CSRF token"""
+    m = re.search(r'name="csrf_token".*?value="([^"]+)"', html, re.S)
+    assert m, "CSRF token not found in form"
+    return m.group(1)
+
+
+def _create_and_login(client, app, username="tagger"):
+    with app.app_context():
+        user = User(username=username, email=f"{username}@test.com")
+        user.set_password("123456")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    r = client.get("/auth/login")
+    token = _extract_csrf_token(r.get_data(as_text=True))
+    client.post(
+        "/auth/login",
+        data={"csrf_token": token, "username": username, "password": "123456"},
+        follow_redirects=False,
+    )
+    return user_id
+
+
+def _tag_counts(app):
+    with app.app_context():
+        return {tag.name: tag.post_count for tag in Tag.query}
+
+
+def test_tag_counts_maintained_on_write(client, app):
+    """创建、编辑、删除文章时维护标签文章数"""
+    _create_and_login(client, app)
+
+    r = client.get("/blog/create")
+    token = _extract_csrf_token(r.get_data(as_text=True))
+    client.post(
+        "/blog/create",
+        data={"csrf_token": token, "title": "Tagged", "body": "b", "tags": "Python, flask，python"},
+    )
+    r = client.get("/blog/create")
+    token = _extract_csrf_token(r.get_data(as_text=True))
+    client.post(
+        "/blog/create",
+        data={"csrf_token": token, "title": "Tagged 2", "body": "b", "tags": "python"},
+    )
+    assert _tag_counts(app) == {"python": 2, "flask": 1}
+
+    with app.app_context():
+        post_id = Post.query.filter_by(title="Tagged").first().id
+
+    r = client.get(f"/blog/post/{post_id}/edit")
+    html = r.get_data(as_text=True)
+    assert 'value="flask, python"' in html
+    token = _extract_csrf_token(html)
+    client.post(
+        f"/blog/post/{post_id}/edit",
+        data={"csrf_token": token, "title": "Tagged", "body": "b", "tags": "flask, 测试"},
+    )
+    assert _tag_counts(app) == {"python": 1, "flask": 1, "测试": 1}
+
+    r = client.get(f"/blog/post/{post_id}")
+    token = _extract_csrf_token(r.get_data(as_text=True))
+    client.post(f"/blog/post/{post_id}/delete", data={"csrf_token": token})
+    assert _tag_counts(app) == {"python": 1, "flask": 0, "测试": 0}
+
+    # 标签云只展示仍有文章的标签
+    html = client.get("/").get_data(as_text=True)
+    assert "/blog/tag/python" in html
+    assert "/blog/tag/flask" not in html
+
+
+def test_tag_page_keyset_pagination(client, app):
+    """标签页按时间倒序分页"""
+    app.config["POSTS_PER_PAGE"] = 2
+    user_id = _create_and_login(client, app)
+    with app.app_context():
+        base = datetime(2024, 1, 1)
+        for i in range(5):
+            post = Post(title=f"Paged {i}", body="b", user_id=user_id, timestamp=base + timedelta(hours=i))
+            db.session.add(post)
+            post.set_tags(["paged"] if i != 2 else ["other"])
+        db.session.commit()
+
+    seen = []
+    url = "/blog/tag/paged"
+    while url:
+        html = client.get(url).get_data(as_text=True)
+        seen += re.findall(r"Paged \d", html)
+        m = re.search(r'href="(/blog/tag/paged\?before=[^"]+)"', html)
+        url = m.group(1) if m else None
+
+    assert seen == ["Paged 4", "Paged 3", "Paged 1", "Paged 0"]
+    assert client.get("/blog/tag/missing").status_code == 404
+
+
+def test_invalid_tags_rejected(client, app):
+    """标签数量或字符不合法时不创建文章"""
+    _create_and_login(client, app)
+    r = client.get("/blog/create")
+    token = _extract_csrf_token(r.get_data(as_text=True))
+    resp = client.post(
+        "/blog/create",
+        data={"csrf_token": token, "title": "Bad", "body": "b", "tags": "a/b"},
+    )
+    assert resp.status_code == 200
+    with app.app_context():
+        assert Post.query.filter_by(title="Bad").first() is None
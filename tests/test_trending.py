@@ -0,0 +1,104 @@
+"""
+热门文章排行测试模块
+
+覆盖：
+- 时间衰减：近期浏览权重高于早期浏览
+- 候选集合有界
+- 首页展示热门文章、排行随阅读计数写回持久化
+- 多个 worker 写回时合并得分，不覆盖彼此的浏览
+"""
+
+from models import User, Post, TrendingScore
+from extensions import db
+from trending import EPOCH, TrendingTracker, _logaddexp
+
+
+def test_recent_views_outweigh_old_views(app):
+    """半衰期之后的浏览权重约为之前的两倍"""
+    app.config["TRENDING_HALF_LIFE"] = 3600
+    tracker = TrendingTracker(app)
+    tracker._loaded = True
+
+    now = 1_800_000_000
+    # 文章 1：两小时前 3 次；文章 2：刚刚 1 次（3 * 1/4 < 1）
+    for _ in range(3):
+        tracker.record(1, now=now - 7200)
+    tracker.record(2, now=now)
+    assert tracker.top()[:2] == [2, 1]
+
+    # 文章 1 再获得一次近期浏览后反超
+    tracker.record(1, now=now)
+    assert tracker.top()[:2] == [1, 2]
+
+
+def test_candidate_set_is_bounded(app):
+    """候选集合不超过容量的两倍，且保留得分最高的文章"""
+    app.config["TRENDING_SIZE"] = 2
+    app.config["TRENDING_CAPACITY_FACTOR"] = 2
+    tracker = TrendingTracker(app)
+    tracker._loaded = True
+
+    for post_id in range(100):
+        tracker.record(post_id, now=1_800_000_000 + post_id)
+    assert len(tracker._scores) < 2 * tracker.capacity
+    assert tracker.top() == [99, 98]
+
+
+def test_index_shows_popular_posts_and_persists(client, app):
+    """首页展示热门文章，排行随阅读计数写回持久化"""
+    with app.app_context():
+        user = User(username="hot", email="hot@test.com")
+        user.set_password("123456")
+        db.session.add(user)
+        db.session.commit()
+        hot = Post(title="Hot Post", body="b", user_id=user.id)
+        cold = Post(title="Cold Post", body="b", user_id=user.id)
+        db.session.add_all([hot, cold])
+        db.session.commit()
+        hot_id, cold_id = hot.id, cold.id
+
+    client.get(f"/blog/post/{hot_id}")
+    client.get(f"/blog/post/{hot_id}")
+    client.get(f"/blog/post/{cold_id}")
+
+    html = client.get("/").get_data(as_text=True)
+    assert "热门文章" in html
+    assert html.index("Hot Post") < html.index("Cold Post")
+
+    app.extensions["view_counter"].flush()
+    with app.app_context():
+        assert {row.post_id for row in TrendingScore.query} == {hot_id, cold_id}
+
+    # 新的排行实例从快照恢复
+    restored = TrendingTracker(app)
+    assert restored.top() == [hot_id, cold_id]
+
+
+def test_persist_merges_scores_from_multiple_workers(app):
+    """各 worker 只写入自己新增的得分并在表中合并，删除只影响被删除的文章"""
+    now = 1_800_000_000
+    first, second = TrendingTracker(app), TrendingTracker(app)
+    with app.app_context():
+        first.record(1, now=now)
+        first.record(1, now=now)
+        first.record(3, now=now)
+        second.record(1, now=now)
+        second.record(2, now=now)
+        first.persist()
+        second.persist()
+        # 第二次写回不应重复计入已写回的得分
+        first.persist()
+
+        scores = {row.post_id: row.score for row in TrendingScore.query}
+        contribution = first.decay * (now - EPOCH)
+        expected = _logaddexp(_logaddexp(contribution, contribution), contribution)
+        assert scores.keys() == {1, 2, 3}
+        assert abs(scores[1] - expected) < 1e-9
+
+        # 写回后从表中刷新，能看到其他 worker 的浏览
+        assert second.top()[0] == 1
+        assert 3 in second.top()
+
+        second.discard(3)
+        second.persist()
+        assert {row.post_id for row in TrendingScore.query} == {1, 2}
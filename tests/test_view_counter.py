@@ -0,0 +1,59 @@
+"""
+阅读计数测试模块
+
+覆盖：
+- 浏览只累加在内存中，flush 时批量写回
+- 缓冲量达到阈值时自动写回
+- 详情页展示的计数包含尚未写回的增量
+"""
+
+from models import User, Post
+from extensions import db
+
+
+def _create_post(app, title="Viewed"):
+    with app.app_context():
+        user = User(username="viewer", email="viewer@test.com")
+        user.set_password("123456")
+        db.session.add(user)
+        db.session.commit()
+
+        post = Post(title=title, body="Content", user_id=user.id)
+        db.session.add(post)
+        db.session.commit()
+        return post.id
+
+
+def _stored_views(app, post_id):
+    with app.app_context():
+        return db.session.get(Post, post_id).view_count
+
+
+def test_views_buffered_until_flush(client, app):
+    """浏览不立即写库，flush 后批量写回"""
+    post_id = _create_post(app)
+
+    for _ in range(3):
+        resp = client.get(f"/blog/post/{post_id}")
+        assert resp.status_code == 200
+    assert "阅读：3" in resp.get_data(as_text=True)
+    assert _stored_views(app, post_id) == 0
+
+    counter = app.extensions["view_counter"]
+    assert counter.flush() == 1
+    assert counter.pending(post_id) == 0
+    assert _stored_views(app, post_id) == 3
+
+    resp = client.get(f"/blog/post/{post_id}")
+    assert "阅读：4" in resp.get_data(as_text=True)
+
+
+def test_views_flushed_when_threshold_reached(client, app):
+    """缓冲量达到阈值时自动写回"""
+    post_id = _create_post(app)
+    app.extensions["view_counter"].flush_threshold = 2
+
+    client.get(f"/blog/post/{post_id}")
+    assert _stored_views(app, post_id) == 0
+    client.get(f"/blog/post/{post_id}")
+    assert _stored_views(app, post_id) == 2
@@ -0,0 +1,77 @@
+"""
+缓存预热测试模块
+
+覆盖：
+- flask warmup 预热模板、热点索引与页面，并报告耗时
+- 预热请求不计入阅读数
+- 超出时间预算时跳过剩余步骤
+- 单个步骤很慢时也在预算内返回
+"""
+
+import time
+
+import warmup
+from models import User, Post
+from extensions import db
+from counters import get_view_counter
+from warmup import run_warmup
+
+
+def _create_posts(count):
+    user = User(username="warm_author", email="warm_author@test.com")
+    user.set_password("123456")
+    db.session.add(user)
+    db.session.flush()
+    posts = [Post(title=f"Warm {i}", body=f"body {i}", user_id=user.id, view_count=i) for i in range(count)]
+    db.session.add_all(posts)
+    db.session.commit()
+    return [post.id for post in posts]
+
+
+def test_warmup_command_renders_top_posts(app):
+    """预热首页与阅读量最高的文章，且不计入阅读数"""
+    app.config["WARMUP_TOP_POSTS"] = 2
+    with app.app_context():
+        _create_posts(3)
+
+    result = app.test_cli_runner().invoke(args=["warmup"])
+    assert result.exit_code == 0, result.output
+    indexes = len(app.config["WARMUP_INDEXES"])
+    assert f"{indexes} indexes, 3 pages." in result.output
+
+    with app.app_context():
+        counter = get_view_counter()
+        assert all(counter.pending(post.id) == 0 for post in Post.query.all())
+        assert app.extensions["startup_timer"].timings["warmup"] > 0
+
+
+def test_warmup_respects_budget(app):
+    """预算耗尽后跳过剩余步骤"""
+    with app.app_context():
+        _create_posts(3)
+        report = run_warmup(app, budget=0)
+
+    assert (report.templates, report.indexes, report.pages) == (0, 0, 0)
+    # 模板、各热点索引、首页与 3 篇文章
+    steps = 1 + len(app.config["WARMUP_INDEXES"]) + 1 + 3
+    assert report.skipped == steps
+    assert f"{steps} steps skipped" in report.summary()
+
+
+def test_warmup_returns_within_budget_when_step_is_slow(app, monkeypatch):
+    """慢步骤在后台继续执行，调用方按预算返回，之后的步骤不再开始"""
+    def slow_compile(app):
+        time.sleep(0.5)
+        return 1
+
+    monkeypatch.setattr(warmup, "compile_templates", slow_compile)
+    with app.app_context():
+        _create_posts(1)
+        started = time.perf_counter()
+        report = run_warmup(app, budget=0.1)
+        elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.4
+    assert (report.templates, report.indexes, report.pages) == (0, 0, 0)
+    assert report.skipped == 1 + len(app.config["WARMUP_INDEXES"]) + 1 + 1
+    assert "budget 0.1s exceeded" in report.summary()
@@ -0,0 +1,187 @@
+"""热门文章排行：按时间衰减的浏览得分增量维护。
+
+每次浏览的贡献随时间指数衰减（半衰期可配置）。为避免随时间重算所有得分，
+得分以对数形式存储 ``log Σ exp(λ·(t_i - EPOCH))``：衰减因子对所有文章相同，
+因此无需更新旧得分即可直接比较大小，新增一次浏览只需一次 logaddexp。
+
+候选集合有上限（``TRENDING_SIZE`` 的若干倍），超出时淘汰得分最低的文章；
+排名结果缓存为长度为 K 的列表，首页读取为 O(K)。排行随阅读计数的批量
+写回一并持久化到 ``trending_score`` 表，新进程启动时从表中恢复。
+
+多个 worker 共享 ``trending_score`` 表：每个进程只写入上次写回以来本进程新增的
+浏览得分，按文章逐行 upsert，并在数据库中以 ``logaddexp`` 与已有得分合并（得分
+相对同一个 ``EPOCH``，可直接相加）；之后从表中重新读取，得到所有 worker 的合并排行。
+本进程删除的文章只删除对应的行。
+"""
+
+import heapq
+import math
+import threading
+import time
+from typing import List
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from extensions import db
+from models import Post, TrendingScore
+
+# 对数得分的时间基准，仅用于让数值保持在较小范围
+EPOCH = 1_700_000_000
+
+
+def _logaddexp(a: float, b: float) -> float:
+    """数值稳定地计算 log(exp(a) + exp(b))。"""
+    if a < b:
+        a, b = b, a
+    return a + math.log1p(math.exp(b - a))
+
+
+def _register_sql_functions(dbapi_connection, connection_record) -> None:
+    dbapi_connection.create_function("logaddexp", 2, _logaddexp, deterministic=True)
+
+
+class TrendingTracker:
+    """有界的 Top-K 热门文章排行（线程安全）。"""
+
+    def __init__(self, app):
+        self.app = app
+        self.size = app.config["TRENDING_SIZE"]
+        self.capacity = self.size * app.config["TRENDING_CAPACITY_FACTOR"]
+        self.decay = math.log(2) / app.config["TRENDING_HALF_LIFE"]
+        # 合并后的得分（数据库快照 + 本进程新增），用于排名
+        self._scores = {}
+        # 上次写回以来本进程新增的得分与删除的文章，写回时合并进数据库
+        self._pending = {}
+        self._discarded = set()
+        self._ranking = []
+        self._dirty = False
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def record(self, post_id: int, now: float = None) -> None:
+        """记录一次浏览。"""
+        self._ensure_loaded()
+        now = time.time() if now is None else now
+        contribution = self.decay * (now - EPOCH)
+        with self._lock:
+            for scores in (self._scores, self._pending):
+                current = scores.get(post_id)
+                scores[post_id] = contribution if current is None else _logaddexp(current, contribution)
+            # 摊还淘汰：候选数达到容量两倍时一次性裁剪回容量
+            if len(self._scores) >= 2 * self.capacity:
+                self._scores = dict(
+                    heapq.nlargest(self.capacity, self._scores.items(), key=lambda item: item[1])
+                )
+            self._dirty = True
+
+    def discard(self, post_id: int) -> None:
+        """移除已删除的文章。"""
+        with self._lock:
+            self._pending.pop(post_id, None)
+            self._discarded.add(post_id)
+            if self._scores.pop(post_id, None) is not None:
+                self._dirty = True
+
+    def top(self) -> List[int]:
+        """返回按热度降序排列的文章 ID（最多 K 个）。"""
+        self._ensure_loaded()
+        with self._lock:
+            if self._dirty:
+                self._ranking = [
+                    post_id
+                    for post_id, _ in heapq.nlargest(
+                        self.size, self._scores.items(), key=lambda item: item[1]
+                    )
+                ]
+                self._dirty = False
+            return list(self._ranking)
+
+    def top_posts(self):
+        """返回热门文章对象列表（一次 IN 查询，按排名排序）。"""
+        ids = self.top()
+        if not ids:
+            return []
+        posts = {post.id: post for post in Post.query.filter(Post.id.in_(ids))}
+        return [posts[post_id] for post_id in ids if post_id in posts]
+
+    def persist(self) -> None:
+        """把本进程新增的得分合并写入 ``trending_score`` 表，并从表中刷新排行（需在应用上下文中调用）。"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            discarded, self._discarded = self._discarded, set()
+        table = TrendingScore.__table__
+        try:
+            if pending:
+                statement = sqlite_insert(table)
+                db.session.execute(
+                    statement.on_conflict_do_update(
+                        index_elements=[table.c.post_id],
+                        set_={"score": db.func.logaddexp(table.c.score, statement.excluded.score)},
+                    ),
+                    [{"post_id": post_id, "score": score} for post_id, score in pending.items()],
+                )
+            if discarded:
+                db.session.execute(table.delete().where(table.c.post_id.in_(discarded)))
+            # 表中只保留得分最高的 capacity 篇，与进程内候选集合的上限一致
+            keep = db.select(table.c.post_id).order_by(table.c.score.desc()).limit(self.capacity)
+            db.session.execute(table.delete().where(table.c.post_id.not_in(keep.scalar_subquery())))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            with self._lock:
+                for post_id, score in pending.items():
+                    current = self._pending.get(post_id)
+                    self._pending[post_id] = score if current is None else _logaddexp(current, score)
+                self._discarded |= discarded
+            raise
+
+        rows = db.session.execute(db.select(table.c.post_id, table.c.score)).all()
+        with self._lock:
+            # 以合并后的表为准，再叠加写回期间本进程新增的得分
+            scores = dict(rows)
+            for post_id, score in self._pending.items():
+                current = scores.get(post_id)
+                scores[post_id] = score if current is None else _logaddexp(current, score)
+            for post_id in self._discarded:
+                scores.pop(post_id, None)
+            self._scores = scores
+            self._dirty = True
+            self._loaded = True
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self.app.app_context():
+            rows = db.session.execute(db.select(TrendingScore.post_id, TrendingScore.score)).all()
+        with self._lock:
+            if not self._loaded:
+                for post_id, score in rows:
+                    current = self._scores.get(post_id)
+                    self._scores[post_id] = score if current is None else _logaddexp(current, score)
+                self._dirty = True
+                self._loaded = True
+
+
+def init_app(app) -> None:
+    """为应用创建热门排行，并随阅读计数写回定期持久化。"""
+    # 首页展示的热门文章数 K
+    app.config.setdefault("TRENDING_SIZE", 5)
+    # 候选集合容量为 K 的倍数，越大排名越精确
+    app.config.setdefault("TRENDING_CAPACITY_FACTOR", 4)
+    # 浏览贡献的半衰期（秒）
+    app.config.setdefault("TRENDING_HALF_LIFE", 6 * 3600)
+
+    # 写回时在 SQL 中合并得分
+    with app.app_context():
+        event.listen(db.engine, "connect", _register_sql_functions)
+
+    tracker = TrendingTracker(app)
+    app.extensions["trending"] = tracker
+    app.extensions["view_counter"].on_flush.append(tracker.persist)
+
+
+def get_trending() -> TrendingTracker:
+    """返回当前应用的热门排行。"""
+    return current_app.extensions["trending"]
@@ -0,0 +1,184 @@
+"""缓存预热：部署或 worker 启动后，在真实读者到来之前预先走一遍热点路径。
+
+重启后的首批请求需要编译模板、编译 SQL 语句并从磁盘读取 SQLite 页，
+首页与阅读量最高的文章因此明显变慢。预热依次执行：
+
+1. 编译全部模板（启用字节码缓存时直接从缓存加载）
+2. 以覆盖索引扫描读取热点索引（``WARMUP_INDEXES``），把索引页载入
+   SQLite 页缓存与操作系统文件缓存
+3. 通过测试客户端渲染首页与阅读量最高的 ``WARMUP_TOP_POSTS`` 篇文章，
+   顺带预热 SQLAlchemy 语句缓存与热门排行（预热请求不计入阅读数）
+
+整个过程受 ``WARMUP_BUDGET`` 秒的预算约束：各步骤在后台线程中执行，调用方最多
+等待预算时间即返回，因此单个慢步骤（如渲染很大的页面）也不会把 worker 就绪时间
+推迟到预算之外；超时时正在执行的步骤在后台完成，之后的步骤不再开始。
+``flask warmup`` 手动执行；``WARMUP_ON_START`` 为真时 ``create_app`` 末尾自动执行。
+"""
+
+import threading
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from extensions import db
+from startup import compile_templates
+
+# 预热请求在 WSGI environ 中携带的标记，详情页据此跳过阅读计数
+WARMUP_ENVIRON_KEY = "blog.warmup"
+
+
+class WarmupReport:
+    """一次预热的执行结果。"""
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.templates = 0
+        self.indexes = 0
+        self.pages = 0
+        self.skipped = 0
+        # 已完成的步骤数（由预热线程更新）
+        self.completed = 0
+        self.seconds = 0.0
+
+    def summary(self) -> str:
+        text = (
+            f"Warmed up in {self.seconds * 1000:.1f}ms: {self.templates} templates, "
+            f"{self.indexes} indexes, {self.pages} pages"
+        )
+        if self.skipped:
+            text += f" ({self.skipped} steps skipped, budget {self.budget:.1f}s exceeded)"
+        return text + "."
+
+
+def _hot_index_statements(names):
+    """为每个热点索引生成覆盖索引扫描语句。
+
+    ``count(*)`` 会被 SQLite 改用最小的索引，因此统计索引中的最后一列，
+    并用 ``INDEXED BY`` 固定扫描的索引。
+    """
+    indexes = {index.name: index for table in db.metadata.tables.values() for index in table.indexes}
+    for name in names:
+        index = indexes.get(name)
+        if index is None:
+            continue
+        column = list(index.columns)[-1].name
+        yield db.text(f'SELECT count("{column}") FROM "{index.table.name}" INDEXED BY "{name}"')
+
+
+def _warm_paths(app) -> list:
+    """需要预渲染的页面：首页与阅读量最高的文章。"""
+    from models import Post
+
+    top_ids = db.session.scalars(
+        db.select(Post.id).order_by(Post.view_count.desc(), Post.id.desc()).limit(app.config["WARMUP_TOP_POSTS"])
+    ).all()
+    return ["/"] + [f"/blog/post/{post_id}" for post_id in top_ids]
+
+
+def _run_steps(app, steps, report: WarmupReport, deadline: float, stop: threading.Event) -> None:
+    """依次执行预热步骤，到达截止时间或被要求停止时不再开始新的步骤。"""
+    client = app.test_client()
+    with app.app_context():
+        try:
+            for kind, target in steps:
+                if stop.is_set() or time.perf_counter() >= deadline:
+                    break
+                if kind == "templates":
+                    report.templates = compile_templates(app)
+                elif kind == "index":
+                    db.session.execute(target)
+                    report.indexes += 1
+                else:
+                    client.get(target, environ_base={WARMUP_ENVIRON_KEY: True})
+                    report.pages += 1
+                report.completed += 1
+        finally:
+            db.session.rollback()
+
+
+def run_warmup(app, budget: float = None) -> WarmupReport:
+    """在后台线程中执行预热，最多等待 budget 秒，返回届时的执行结果。需在应用上下文中调用。"""
+    budget = app.config["WARMUP_BUDGET"] if budget is None else budget
+    report = WarmupReport(budget)
+    started = time.perf_counter()
+
+    steps = [("templates", None)]
+    steps += [("index", statement) for statement in _hot_index_statements(app.config["WARMUP_INDEXES"])]
+    steps += [("page", path) for path in _warm_paths(app)]
+
+    errors = []
+    stop = threading.Event()
+
+    def run():
+        try:
+            _run_steps(app, steps, report, started + budget, stop)
+        except Exception as exc:
+            errors.append(exc)
+
+    thread = threading.Thread(target=run, name="warmup", daemon=True)
+    thread.start()
+    thread.join(max(0.0, budget - (time.perf_counter() - started)))
+    if thread.is_alive():
+        # 超出预算：不再等待正在执行的步骤，它在后台完成后线程即退出
+        stop.set()
+    elif errors:
+        raise errors[0]
+
+    report.skipped = len(steps) - report.completed
+    report.seconds = time.perf_counter() - started
+    timer = app.extensions.get("startup_timer")
+    if timer is not None:
+        timer.add("warmup", report.seconds)
+    return report
+
+
+def is_warmup_request(environ) -> bool:
+    """当前请求是否为预热请求。"""
+    return bool(environ.get(WARMUP_ENVIRON_KEY))
+
+
+@click.command("warmup")
+@click.option("--budget", type=float, help="预热时间预算（秒），默认取 WARMUP_BUDGET。")
+@with_appcontext
+def warmup_command(budget):
+    """预热模板、热点索引与首页、热门文章页面，并报告耗时。"""
+    report = run_warmup(current_app._get_current_object(), budget)
+    print(report.summary())
+
+
+def init_app(app) -> None:
+    """设置默认配置并注册命令；启动时预热由 create_app 末尾调用 warmup_on_start。"""
+    # 为真时在应用创建后立即预热
+    app.config.setdefault("WARMUP_ON_START", False)
+    # 预热时间预算（秒）
+    app.config.setdefault("WARMUP_BUDGET", 2.0)
+    # 预渲染阅读量最高的文章数
+    app.config.setdefault("WARMUP_TOP_POSTS", 20)
+    # 按优先级排列的热点索引：首页、作者主页、标签页、评论、相关文章
+    app.config.setdefault(
+        "WARMUP_INDEXES",
+        [
+            "ix_post_timestamp",
+            "ix_post_user_id_timestamp",
+            "ix_post_tag_tag_id_post_timestamp",
+            "ix_comment_post_id_created",
+            "ix_related_post_post_id_score",
+        ],
+    )
+    app.cli.add_command(warmup_command)
+
+
+def warmup_on_start(app) -> None:
+    """WARMUP_ON_START 开启时预热；失败（如数据库尚未初始化）只记录日志，不影响启动。"""
+    if not app.config["WARMUP_ON_START"]:
+        return
+    with app.app_context():
+        try:
+            report = run_warmup(app)
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("warm-up failed")
+            return
+    app.logger.info(report.summary())